@@ -110,7 +110,8 @@ class Instance(object):
                     # FIXME: Remove line below before this PR is merged.
                     Q(status__name='active') &
                     (Q(end_date=None) | Q(end_date__gt=start_date)))
-        for history in history_list.order_by('start_date'):
+            history_list = history_list.order_by('start_date')
+        for history in history_list:
             if limit_history and history.id not in limit_history:
                 continue
             alloc_history = InstanceHistory.from_core(history)
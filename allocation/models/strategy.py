@@ -32,20 +32,32 @@ class PythonAllocationStrategy(object):
         self.rule_behaviors = rule_behaviors
 
     def get_instance_list(self, identity, limit_instances=[], limit_history=[]):
+        from core.models.instance_history import timelines_for
         from service.monitoring import _core_instances_for
+        start_date = self.counting_behavior.start_date
         # Retrieve the core that could have an impact..
-        core_instances = _core_instances_for(
-            identity,
-            self.counting_behavior.start_date)
+        core_instances = [
+            inst for inst in _core_instances_for(identity, start_date)
+            if not limit_instances or inst.provider_alias in limit_instances]
+        # All histories are loaded at once
+        timelines = timelines_for(core_instances)
         # Convert Core Models --> Allocation/core Models
         alloc_instances = []
         for inst in core_instances:
-            if limit_instances and inst.provider_alias not in limit_instances:
+            if start_date:
+                history_list = [
+                    history for history in timelines[inst.id].between(
+                        start_date=start_date)
+                    if history.status.name == 'active']
+            else:
+                history_list = list(timelines[inst.id])
+            if not history_list:
                 continue
             try:
                 allocation_instance = AllocInstance.from_core(
                         inst,
-                        self.counting_behavior.start_date,
+                        start_date,
+                        history_list=history_list,
                         limit_history=limit_history
                     )
                 if allocation_instance:
@@ -1,7 +1,16 @@
 """
 custom pagination support
 """
-from rest_framework.pagination import PageNumberPagination
+import base64
+from collections import OrderedDict
+
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import replace_query_param
 
 # NOTE: this value is set here for v1 api support
 DEFAULT_PAGINATION_SIZE = 20
@@ -53,3 +62,81 @@ class OptionalPagination(PageNumberPagination):
             return _is_positive(request.query_params[self.page_query_param])
         except (KeyError, ValueError):
             return False
+
+
+class KeysetPagination(BasePagination):
+
+    """
+    Cursor pagination, newest first, keyed on a (date, id) pair
+    (view.cursor_ordering, default: ('start_date', 'id')).
+    No COUNT(*) and no OFFSET, so deep pages cost the same as the first.
+
+    Opt-in by passing '?cursor=' (empty for the first page),
+    see api.v2.views.mixins.KeysetPaginationMixin
+    """
+    cursor_query_param = 'cursor'
+    page_size_query_param = 'page_size'
+    page_size = 100
+    max_page_size = 1000
+    default_ordering = ('start_date', 'id')
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.request = request
+        self.page_size = self.get_page_size(request)
+        self.date_field, self.id_field = getattr(
+            view, 'cursor_ordering', self.default_ordering)
+        queryset = queryset.order_by(
+            '-%s' % self.date_field, '-%s' % self.id_field)
+        position = self.decode_cursor(request)
+        if position:
+            date_value, id_value = position
+            queryset = queryset.filter(
+                Q(**{'%s__lt' % self.date_field: date_value}) |
+                Q(**{self.date_field: date_value,
+                     '%s__lt' % self.id_field: id_value}))
+        results = list(queryset[:self.page_size + 1])
+        self.has_next = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        return self.page
+
+    def get_page_size(self, request):
+        try:
+            page_size = int(request.query_params[self.page_size_query_param])
+            if page_size > 0:
+                return min(page_size, self.max_page_size)
+        except (KeyError, ValueError):
+            pass
+        return self.page_size
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None
+        try:
+            date_string, id_value = base64.urlsafe_b64decode(
+                str(encoded)).split('|', 1)
+            date_value = parse_datetime(date_string)
+        except (TypeError, ValueError):
+            date_value = None
+        if not date_value:
+            raise NotFound("Invalid cursor")
+        return (date_value, id_value)
+
+    def encode_cursor(self, obj):
+        date_value = getattr(obj, self.date_field)
+        id_value = getattr(obj, self.id_field)
+        return base64.urlsafe_b64encode(
+            "%s|%s" % (date_value.isoformat(), id_value))
+
+    def get_next_link(self):
+        if not self.has_next:
+            return None
+        url = self.request.build_absolute_uri()
+        return replace_query_param(
+            url, self.cursor_query_param, self.encode_cursor(self.page[-1]))
+
+    def get_paginated_response(self, data):
+        return Response(OrderedDict([
+            ('next', self.get_next_link()),
+            ('results', data)
+        ]))
@@ -167,8 +167,7 @@ class InMaintenance(permissions.BasePermission):
     """
 
     def has_permission(self, request, view):
-        records = MaintenanceRecord.active()\
-                                   .filter(provider__isnull=True)
+        records = MaintenanceRecord.cached_active()
         if records:
             if not request.user.is_staff:
                 raise ServiceUnavailable(
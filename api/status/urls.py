@@ -9,6 +9,7 @@ from api.status import views
 
 router = routers.DefaultRouter(trailing_slash=False)
 router.register(r'celery', views.CeleryViewSet, base_name='celery')
+router.register(r'queues', views.QueueViewSet, base_name='queues')
 
 api_status_urls = router.urls
 urlpatterns = [url(r'^', include(api_status_urls)), ]
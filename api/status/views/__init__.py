@@ -1,2 +1,3 @@
 # flake8: noqa
 from .celery import CeleryViewSet
+from .queue import QueueViewSet
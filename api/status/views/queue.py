@@ -0,0 +1,32 @@
+import redis
+
+from rest_framework.viewsets import ViewSet
+from rest_framework.response import Response
+
+from api.permissions import CloudAdminRequired
+from service.locks import get_recorded_durations
+from service.throttle import get_queue_depths
+
+
+class QueueViewSet(ViewSet):
+
+    """
+    API endpoint that prints the depth of each celery queue
+    """
+    permission_classes = (CloudAdminRequired,)
+
+    def list(self, request):
+        """
+        Return the number of messages waiting in each queue,
+        broken down by priority step, and the duration of the last
+        run of each periodic '*_for' task.
+        """
+        try:
+            depths = get_queue_depths()
+            durations = get_recorded_durations()
+        except redis.exceptions.ConnectionError:
+            resp = {'status': 503,
+                    'message': "Could not connect to the celery broker"}
+            return Response(resp, status=503)
+        return Response({'status': 200, 'queues': depths,
+                         'durations': durations}, status=200)
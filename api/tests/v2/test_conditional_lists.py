@@ -0,0 +1,104 @@
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from rest_framework.test import APITestCase, APIRequestFactory,\
+    force_authenticate
+
+import mock
+
+from api.v2.views import ProjectViewSet
+from api.tests.factories import ProjectFactory, UserFactory, GroupFactory
+
+
+class FakeRedis(object):
+    """
+    The get/incr subset of redis used for ETag generations
+    """
+
+    def __init__(self):
+        self.values = {}
+
+    def get(self, key):
+        value = self.values.get(key)
+        return str(value) if value is not None else None
+
+    def incr(self, key):
+        self.values[key] = self.values.get(key, 0) + 1
+        return self.values[key]
+
+
+@override_settings(API_ETAG_MAX_AGE=24 * 60 * 60)
+class ConditionalListTests(APITestCase):
+
+    def setUp(self):
+        self.user = UserFactory.create()
+        self.group = GroupFactory.create(name=self.user.username)
+        self.project = ProjectFactory.create(owner=self.group)
+        self.list_view = ProjectViewSet.as_view({'get': 'list'})
+        self.update_view = ProjectViewSet.as_view(
+            {'patch': 'partial_update'})
+        self.redis = FakeRedis()
+        patcher = mock.patch('api.v2.views.mixins.redis_connection',
+                             return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _list(self, etag=None):
+        factory = APIRequestFactory()
+        url = reverse('api:v2:project-list')
+        headers = {'HTTP_IF_NONE_MATCH': etag} if etag else {}
+        request = factory.get(url, **headers)
+        force_authenticate(request, user=self.user)
+        return self.list_view(request)
+
+    def _rename(self, name):
+        factory = APIRequestFactory()
+        url = reverse('api:v2:project-detail', args=(self.project.id,))
+        request = factory.patch(url, {'name': name}, format='json')
+        force_authenticate(request, user=self.user)
+        return self.update_view(request, pk=self.project.id)
+
+    def test_list_has_etag(self):
+        response = self._list()
+        self.assertEquals(response.status_code, 200)
+        self.assertIn('ETag', response)
+
+    def test_matching_etag_is_not_modified(self):
+        etag = self._list()['ETag']
+        response = self._list(etag)
+        self.assertEquals(response.status_code, 304)
+        self.assertEquals(response['ETag'], etag)
+        self.assertFalse(response.data)
+
+    def test_stale_etag_is_ignored(self):
+        response = self._list('"stale"')
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(response.data['count'], 1)
+
+    def test_own_write_changes_etag(self):
+        etag = self._list()['ETag']
+        # A rename changes no timestamp, the user's generation is bumped
+        self.assertEquals(self._rename('renamed').status_code, 200)
+        self.assertEquals(self.redis.values.values(), [1])
+        response = self._list(etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEquals(
+            response.data['results'][0]['name'], 'renamed')
+
+    def test_other_write_changes_etag(self):
+        etag = self._list()['ETag']
+        # Written elsewhere (another user or process), the aggregate
+        # over the list changes.
+        ProjectFactory.create(owner=self.group)
+        response = self._list(etag)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEquals(response.data['count'], 2)
+
+    def test_queryset_is_filtered_once(self):
+        with mock.patch.object(
+                ProjectViewSet, 'filter_queryset', autospec=True,
+                side_effect=ProjectViewSet.filter_queryset) as filter_queryset:
+            response = self._list()
+        self.assertEquals(response.status_code, 200)
+        self.assertEquals(filter_queryset.call_count, 1)
@@ -1,8 +1,13 @@
 from rest_framework.test import APITestCase, APIRequestFactory,\
     force_authenticate
 from api.v2.views import ImageViewSet as ViewSet
-from api.tests.factories import UserFactory, AnonymousUserFactory, ImageFactory
+from api.tests.factories import UserFactory, AnonymousUserFactory,\
+    ImageFactory, GroupFactory, LeadershipFactory, ProviderFactory,\
+    IdentityFactory, IdentityMembershipFactory, QuotaFactory
 from django.core.urlresolvers import reverse
+from core.models import (
+    ApplicationVersion, ApplicationVisibility, InstanceSource,
+    ProviderMachine, ProviderMachineMembership)
 
 from unittest import skip
 
@@ -115,3 +120,60 @@ class DeleteTests(APITestCase):
 
     def test_endpoint_does_not_exist(self):
         self.assertTrue('delete' not in ViewSet.http_method_names)
+
+
+class VisibilityTests(APITestCase):
+
+    def setUp(self):
+        self.view = ViewSet.as_view({'get': 'list'})
+        self.provider = ProviderFactory.create()
+        self.user, self.group = self._create_user()
+        self.other_user, self.other_group = self._create_user()
+        self.image = ImageFactory.create(
+            created_by=self.user, private=True, name='Private Image')
+        version = ApplicationVersion.objects.create(
+            application=self.image, name='1.0', created_by=self.user)
+        source = InstanceSource.objects.create(
+            provider=self.provider, identifier='emi-visible')
+        self.machine = ProviderMachine.objects.create(
+            instance_source=source, application_version=version)
+        ApplicationVisibility.rebuild_for([self.image.id])
+
+    def _create_user(self):
+        user = UserFactory.create()
+        group = GroupFactory.create(name=user.username)
+        LeadershipFactory.create(user=user, group=group)
+        identity = IdentityFactory.create(
+            provider=self.provider, created_by=user)
+        IdentityMembershipFactory.create(
+            member=group, identity=identity, quota=QuotaFactory.create())
+        return user, group
+
+    def _list_ids(self, user, **params):
+        factory = APIRequestFactory()
+        url = reverse('api:v2:application-list')
+        request = factory.get(url, params)
+        force_authenticate(request, user=user)
+        response = self.view(request)
+        self.assertEquals(response.status_code, 200)
+        return [image['id'] for image in response.data['results']]
+
+    def test_private_image_is_visible_to_owner(self):
+        self.assertEquals(self._list_ids(self.user), [self.image.id])
+        self.assertEquals(self._list_ids(self.other_user), [])
+
+    def test_shared_image_is_visible_to_group(self):
+        ProviderMachineMembership.objects.create(
+            provider_machine=self.machine, group=self.other_group)
+        ApplicationVisibility.rebuild_for([self.image.id])
+        self.assertEquals(self._list_ids(self.other_user), [self.image.id])
+
+    def test_search_text(self):
+        self.assertEquals(
+            self._list_ids(self.user, search='EMI-VISIBLE'), [self.image.id])
+        self.assertEquals(
+            self._list_ids(self.user, search='private missing'), [])
+
+    def test_search_matches_prefix(self):
+        self.assertEquals(
+            self._list_ids(self.user, search='priv ima'), [self.image.id])
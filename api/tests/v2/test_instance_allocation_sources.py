@@ -0,0 +1,72 @@
+from django.core.urlresolvers import reverse
+from django.test.utils import override_settings
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+
+from api.v2.views import InstanceAllocationSourceViewSet as ViewSet
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.models import (
+    AllocationSource, EventTable, Instance, InstanceAllocationSourceSnapshot,
+    InstanceSource, UserAllocationSource)
+
+
+@override_settings(USE_ALLOCATION_SOURCE=True)
+class CreateTests(APITestCase):
+
+    def setUp(self):
+        self.view = ViewSet.as_view({'post': 'create'})
+        self.user = UserFactory.create()
+        self.other_user = UserFactory.create()
+        self.provider = ProviderFactory.create()
+        self.old_source = AllocationSource.objects.create(
+            name='old', source_id='1', compute_allowed=100)
+        self.new_source = AllocationSource.objects.create(
+            name='new', source_id='2', compute_allowed=100)
+        UserAllocationSource.objects.create(
+            user=self.user, allocation_source=self.new_source)
+        self.first = self._create_instance(self.user, 'alias-1')
+        self.second = self._create_instance(self.user, 'alias-2')
+        self.other = self._create_instance(self.other_user, 'alias-3')
+        InstanceAllocationSourceSnapshot.objects.create(
+            instance=self.first, allocation_source=self.old_source)
+
+    def _create_instance(self, user, alias):
+        identity = IdentityFactory.create(
+            provider=self.provider, created_by=user)
+        source = InstanceSource.objects.create(
+            provider=self.provider, identifier='machine-%s' % alias)
+        return Instance.objects.create(
+            name=alias, provider_alias=alias, source=source,
+            created_by=user, created_by_identity=identity,
+            start_date=timezone.now())
+
+    def _post(self, data):
+        factory = APIRequestFactory()
+        url = reverse('api:v2:instance-allocation-source-list')
+        request = factory.post(url, data, format='json')
+        force_authenticate(request, user=self.user)
+        return self.view(request)
+
+    def test_change_allocation_sources(self):
+        response = self._post({'allocation_source_id': '2',
+                               'instance_ids': ['alias-1', 'alias-2']})
+        self.assertEquals(response.status_code, 201)
+        self.assertEquals(response.data['instance_ids'],
+                          ['alias-1', 'alias-2'])
+        self.assertEquals(EventTable.objects.filter(
+            name='instance_allocation_source_changed').count(), 2)
+        for instance in (self.first, self.second):
+            self.assertEquals(
+                InstanceAllocationSourceSnapshot.objects.get(
+                    instance=instance).allocation_source, self.new_source)
+
+    def test_instances_of_other_users(self):
+        response = self._post({'allocation_source_id': '2',
+                               'instance_ids': ['alias-1', 'alias-3']})
+        self.assertEquals(response.status_code, 400)
+        self.assertFalse(EventTable.objects.exists())
+
+    def test_allocation_source_of_other_users(self):
+        response = self._post({'allocation_source_id': '1',
+                               'instance_ids': ['alias-1']})
+        self.assertEquals(response.status_code, 400)
@@ -0,0 +1,120 @@
+from django.core.urlresolvers import reverse
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+
+from api.v2.views import InstanceViewSet as ViewSet
+from api.tests.factories import UserFactory, AnonymousUserFactory,\
+    IdentityFactory, ProviderFactory, GroupFactory,\
+    IdentityMembershipFactory, QuotaFactory, LeadershipFactory,\
+    ImageFactory
+from core.models import (
+    ApplicationVersion, Instance, InstanceSource, InstanceStatus,
+    InstanceStatusHistory, ProviderMachine, Size)
+
+
+class GetListTests(APITestCase):
+
+    def setUp(self):
+        self.view = ViewSet.as_view({'get': 'list'})
+        self.anonymous_user = AnonymousUserFactory()
+        self.user = UserFactory.create()
+        self.group = GroupFactory.create(name=self.user.username)
+        self.leadership = LeadershipFactory.create(
+            user=self.user,
+            group=self.group
+            )
+        self.provider = ProviderFactory.create()
+        self.identity = IdentityFactory.create(
+            provider=self.provider,
+            created_by=self.user)
+        IdentityMembershipFactory.create(
+            member=self.group,
+            identity=self.identity,
+            quota=QuotaFactory.create()
+        )
+        self.image = ImageFactory.create(created_by=self.user)
+        self.version = ApplicationVersion.objects.create(
+            application=self.image, name='1.0', created_by=self.user)
+        self.size = Size.objects.create(
+            alias='1', name='tiny', provider=self.provider,
+            cpu=1, mem=1024, disk=0, root=10)
+        self.active = InstanceStatus.objects.create(name='active')
+        self.instance_count = 0
+
+        factory = APIRequestFactory()
+        url = reverse('api:v2:instance-list')
+        self.request = factory.get(url)
+        force_authenticate(self.request, user=self.user)
+
+    def _create_instances(self, count):
+        for _ in range(count):
+            self.instance_count += 1
+            source = InstanceSource.objects.create(
+                provider=self.provider,
+                identifier='machine-%d' % self.instance_count)
+            ProviderMachine.objects.create(
+                instance_source=source, application_version=self.version)
+            instance = Instance.objects.create(
+                name='instance-%d' % self.instance_count,
+                provider_alias='alias-%d' % self.instance_count,
+                source=source,
+                created_by=self.user,
+                created_by_identity=self.identity,
+                start_date=timezone.now())
+            InstanceStatusHistory.objects.create(
+                instance=instance, size=self.size, status=self.active)
+
+    def _count_list_queries(self):
+        with CaptureQueriesContext(connection) as context:
+            response = self.view(self.request)
+            self.assertEquals(response.status_code, 200)
+        return len(context.captured_queries), response
+
+    def test_is_not_public(self):
+        force_authenticate(self.request, user=self.anonymous_user)
+        response = self.view(self.request)
+        self.assertEquals(response.status_code, 403)
+
+    def test_response_contains_latest_history(self):
+        self._create_instances(1)
+        _, response = self._count_list_queries()
+        data = response.data.get('results')[0]
+        self.assertEquals(data['status'], 'active')
+        self.assertEquals(data['size']['id'], self.size.id)
+        self.assertEquals(data['image']['id'], self.image.id)
+        self.assertEquals(data['version']['name'], '1.0')
+        self.assertIsNone(data['allocation_source'])
+
+    def test_query_count_is_constant_per_page(self):
+        self._create_instances(2)
+        small_page_queries, response = self._count_list_queries()
+        self.assertEquals(response.data['count'], 2)
+        self._create_instances(8)
+        large_page_queries, response = self._count_list_queries()
+        self.assertEquals(response.data['count'], 10)
+        self.assertEquals(small_page_queries, large_page_queries)
+
+    def test_cursor_pagination(self):
+        self._create_instances(3)
+        factory = APIRequestFactory()
+        url = reverse('api:v2:instance-list')
+        request = factory.get(url, {'cursor': '', 'page_size': 2})
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        self.assertEquals(response.status_code, 200)
+        self.assertNotIn('count', response.data)
+        first_page = [row['id'] for row in response.data['results']]
+        self.assertEquals(len(first_page), 2)
+        self.assertIsNotNone(response.data['next'])
+
+        request = factory.get(response.data['next'])
+        force_authenticate(request, user=self.user)
+        response = self.view(request)
+        second_page = [row['id'] for row in response.data['results']]
+        self.assertEquals(len(second_page), 1)
+        self.assertIsNone(response.data['next'])
+        self.assertEquals(
+            sorted(first_page + second_page),
+            sorted(Instance.objects.values_list('id', flat=True)))
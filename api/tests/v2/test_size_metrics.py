@@ -0,0 +1,83 @@
+from datetime import timedelta
+
+from django.core.urlresolvers import reverse
+from django.utils import timezone
+from rest_framework.test import APITestCase, APIRequestFactory, force_authenticate
+
+from api.v2.views import InstanceSizeMetricViewSet as ViewSet
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.models import (
+    Instance, InstanceSource, InstanceStatus, InstanceStatusHistory, Size)
+
+
+class GetListTests(APITestCase):
+
+    def setUp(self):
+        self.view = ViewSet.as_view({'get': 'list'})
+        self.user = UserFactory.create()
+        self.staff_user = UserFactory.create(is_staff=True)
+        self.provider = ProviderFactory.create()
+        self.identity = IdentityFactory.create(
+            provider=self.provider, created_by=self.user)
+        self.tiny = Size.objects.create(
+            alias='1', name='tiny', provider=self.provider,
+            cpu=1, mem=1024, disk=0, root=10)
+        self.large = Size.objects.create(
+            alias='2', name='large', provider=self.provider,
+            cpu=4, mem=8192, disk=0, root=10)
+        self.active = InstanceStatus.objects.create(name='active')
+        self.suspended = InstanceStatus.objects.create(name='suspended')
+        self.now = timezone.now()
+        instance = self._create_instance('alias-1')
+        self._create_history(instance, self.tiny, self.active, 10, 5)
+        self._create_history(instance, self.large, self.active, 5, None)
+        instance = self._create_instance('alias-2')
+        self._create_history(instance, self.large, self.suspended, 3, None)
+
+    def _create_instance(self, alias):
+        source = InstanceSource.objects.create(
+            provider=self.provider, identifier='machine-%s' % alias)
+        return Instance.objects.create(
+            name=alias, provider_alias=alias, source=source,
+            created_by=self.user, created_by_identity=self.identity,
+            start_date=self.now - timedelta(hours=10))
+
+    def _create_history(self, instance, size, status, start_hours, end_hours):
+        InstanceStatusHistory.objects.create(
+            instance=instance, size=size, status=status,
+            start_date=self.now - timedelta(hours=start_hours),
+            end_date=self.now - timedelta(hours=end_hours)
+            if end_hours is not None else None)
+
+    def _get(self, user, **params):
+        factory = APIRequestFactory()
+        url = reverse('api:v2:instance-size-metric-list')
+        params.setdefault('provider_id', self.provider.id)
+        params.setdefault('fresh', 'true')
+        request = factory.get(url, params)
+        force_authenticate(request, user=user)
+        return self.view(request)
+
+    def test_requires_cloud_admin(self):
+        response = self._get(self.user)
+        self.assertEquals(response.status_code, 403)
+
+    def test_size_metrics(self):
+        response = self._get(
+            self.staff_user, end_date=self.now.isoformat(), days=1)
+        self.assertEquals(response.status_code, 200)
+        tiny, large = response.data['results']
+        self.assertEquals(tiny['name'], 'tiny')
+        self.assertEquals(tiny['instances'], 1)
+        self.assertEquals(tiny['active_hours'], 5.0)
+        self.assertEquals(large['instances'], 2)
+        self.assertEquals(large['active'], 1)
+        self.assertEquals(large['cpu_hours'], 20.0)
+
+    def test_window_excludes_older_histories(self):
+        response = self._get(
+            self.staff_user, end_date=self.now.isoformat(),
+            start_date=(self.now - timedelta(hours=4)).isoformat())
+        tiny, large = response.data['results']
+        self.assertEquals(tiny['instances'], 0)
+        self.assertEquals(large['active_hours'], 4.0)
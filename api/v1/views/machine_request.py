@@ -13,7 +13,7 @@ from threepio import logger
 from core.models.machine_request import MachineRequest as CoreMachineRequest
 from core.models import Provider
 from core.models import IdentityMembership
-from core.models.status_type import StatusType
+from core.models.status_type import get_status_type
 
 from service.instance import _permission_to_act
 from service.exceptions import ActionNotAllowed
@@ -115,7 +115,7 @@ class MachineRequestList(AuthAPIView):
             serializer.validated_data['membership'] = identity_member
             serializer.validated_data['created_by'] = user
             self._permission_to_image(identity_uuid, instance)
-            pending_status = StatusType.objects.get(name='pending')
+            pending_status = get_status_type("pending")
             machine_request = serializer.save(status=pending_status)
             instance = machine_request.instance
             if hasattr(settings, 'REPLICATION_PROVIDER_LOCATION'):
@@ -5,6 +5,7 @@ Atmosphere service maintenance record rest api.
 import copy
 
 from django.contrib.auth.models import AnonymousUser
+from django.db.models import Q
 from django.utils import timezone
 
 from rest_framework import status
@@ -30,24 +31,16 @@ class MaintenanceRecordList(AuthOptionalAPIView):
         query = request.GET
         user = request.user
         providers = []
-        records = CoreMaintenanceRecord.objects.none()
         active_records = query.get('active', 'false').lower() == "true"
         if user and not isinstance(user, AnonymousUser):
             groups = user.group_set.all()
             for group in groups:
-                providers = group.current_providers.all()
-                for p in providers:
-                    if active_records:
-                        records |= CoreMaintenanceRecord.active(p)
-                    else:
-                        records |= CoreMaintenanceRecord.objects.filter(
-                            provider=p)
+                providers.extend(group.current_providers.all())
         if active_records:
-            global_records = CoreMaintenanceRecord.active()
+            records = CoreMaintenanceRecord.cached_active(providers)
         else:
-            global_records = CoreMaintenanceRecord.objects.filter(
-                provider=None)
-        records |= global_records
+            records = CoreMaintenanceRecord.objects.filter(
+                Q(provider__in=providers) | Q(provider=None))
         return Response(MaintenanceRecordSerializer(records, many=True).data)
 
 
@@ -1,5 +1,8 @@
+from django.utils import timezone
+
 from core.models import Identity
 from rest_framework import serializers
+from service.cache import get_cached_allocation_usage
 from api.v2.serializers.summaries import (
     QuotaSummarySerializer,
     AllocationSummarySerializer,
@@ -19,7 +22,19 @@ class IdentitySerializer(serializers.HyperlinkedModelSerializer):
         view_name='api:v2:identity-detail',
     )
     def get_usage(self, identity):
-        return identity.get_allocation_usage()
+        """
+        Serve the cached allocation usage snapshot,
+        '?fresh=true' recalculates it.
+        """
+        request = self.context.get('request')
+        fresh = request and request.query_params.get(
+            'fresh', '').lower() == 'true'
+        usage, updated = get_cached_allocation_usage(identity, force=fresh)
+        usage = dict(usage)
+        usage['snapshot_date'] = updated
+        usage['snapshot_age'] = int(
+            (timezone.now() - updated).total_seconds())
+        return usage
 
 
     class Meta:
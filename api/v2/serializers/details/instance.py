@@ -1,7 +1,8 @@
-from core.models import (
-    BootScript, Instance, Application as Image,
-    InstanceAllocationSourceSnapshot
-)
+from django.core.exceptions import ObjectDoesNotExist
+from django.db import models
+
+from core.models import BootScript, Instance
+from core.models.instance import prefetch_last_history, prefetch_total_hours
 from rest_framework import serializers
 from api.v2.serializers.fields import ModelRelatedField
 from api.v2.serializers.details import AllocationSourceSerializer
@@ -17,6 +18,21 @@ from api.v2.serializers.summaries import (
 from api.v2.serializers.fields.base import UUIDHyperlinkedIdentityField
 
 
+class InstanceListSerializer(serializers.ListSerializer):
+    """
+    Load the newest history and usage of every instance on the page
+    up-front, so each row can be serialized without further queries.
+    """
+
+    def to_representation(self, data):
+        instances = list(
+            data.all() if isinstance(data, models.Manager) else data)
+        prefetch_last_history(instances)
+        prefetch_total_hours(instances)
+        return super(InstanceListSerializer, self).to_representation(
+            instances)
+
+
 class InstanceSerializer(serializers.HyperlinkedModelSerializer):
     identity = IdentitySummarySerializer(source='created_by_identity')
     user = UserSummarySerializer(source='created_by')
@@ -41,14 +57,22 @@ class InstanceSerializer(serializers.HyperlinkedModelSerializer):
         uuid_field='provider_alias'
     )
 
+    def __init__(self, *args, **kwargs):
+        super(InstanceSerializer, self).__init__(*args, **kwargs)
+        self._allocation_sources = {}
+
     def get_allocation_source(self, instance):
-        snapshot = InstanceAllocationSourceSnapshot.objects.filter(
-            instance=instance).first()
-        if not snapshot:
+        try:
+            snapshot = instance.instanceallocationsourcesnapshot
+        except ObjectDoesNotExist:
             return None
-        serializer = AllocationSourceSerializer(snapshot.allocation_source, context=self.context)
-        return serializer.data
-
+        # Instances on a page share a handful of allocation sources
+        source_id = snapshot.allocation_source_id
+        if source_id not in self._allocation_sources:
+            serializer = AllocationSourceSerializer(
+                snapshot.allocation_source, context=self.context)
+            self._allocation_sources[source_id] = serializer.data
+        return self._allocation_sources[source_id]
 
     def get_usage(self, instance):
         return instance.get_total_hours()
@@ -59,8 +83,10 @@ class InstanceSerializer(serializers.HyperlinkedModelSerializer):
         return serializer.data
 
     def get_image(self, obj):
-        image_uuid = obj.application_uuid()
-        image = Image.objects.get(uuid=image_uuid)
+        machine = obj.provider_machine
+        if not machine:
+            return None
+        image = machine.application_version.application
         serializer = ImageSummarySerializer(image, context=self.context)
         return serializer.data
 
@@ -79,6 +105,7 @@ class InstanceSerializer(serializers.HyperlinkedModelSerializer):
 
     class Meta:
         model = Instance
+        list_serializer_class = InstanceListSerializer
         fields = (
             'id',
             'uuid',
@@ -28,7 +28,11 @@ class ModelRelatedField(serializers.RelatedField):
             % self.___class__.__name__
         )
         queryset = self.get_queryset()
-        obj = queryset.get(pk=value.pk)
+        if isinstance(value, queryset.model):
+            # Already loaded (and possibly prefetched) by the relation
+            obj = value
+        else:
+            obj = queryset.get(pk=value.pk)
         serializer = self.serializer_class(obj, context=self.context)
         return serializer.data
 
@@ -49,10 +49,15 @@ router.register(r'instances', views.InstanceViewSet, base_name='instance')
 router.register(r'instance_actions',
     views.InstanceActionViewSet,
     base_name='instanceaction')
+router.register(r'instance_allocation_sources',
+                views.InstanceAllocationSourceViewSet,
+                base_name='instance-allocation-source')
 router.register(r'instance_histories',
     views.InstanceStatusHistoryViewSet,
     base_name='instancestatushistory')
 router.register(r'instance_tags', views.InstanceTagViewSet)
+router.register(r'instance_size_metrics', views.InstanceSizeMetricViewSet,
+                base_name='instance-size-metric')
 router.register(r'licenses', views.LicenseViewSet)
 router.register(r'links', views.ExternalLinkViewSet)
 router.register(r'machine_requests', views.MachineRequestViewSet)
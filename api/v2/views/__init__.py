@@ -45,4 +45,6 @@ from .token import TokenViewSet
 from .user import UserViewSet
 from .volume import VolumeViewSet
 from .metric import MetricViewSet
+from .size_metric import InstanceSizeMetricViewSet
+from .instance_allocation_source import InstanceAllocationSourceViewSet
 from .ssh_key import SSHKeyViewSet
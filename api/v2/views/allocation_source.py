@@ -17,6 +17,7 @@ class AllocationSourceViewSet(MultipleFieldLookup, AuthViewSet):
     search_fields = ('^title',)
     lookup_fields = ('id', 'uuid')
     http_method_names = ['options','head','get']
+    etag_fields = ('snapshot__updated', 'user_allocation_snapshots__updated')
 
     def get_queryset(self):
         """
@@ -8,13 +8,13 @@ from rest_framework.viewsets import ModelViewSet, ReadOnlyModelViewSet
 
 from core import exceptions as core_exceptions
 from core.models import IdentityMembership, CloudAdministrator
-from core.models.status_type import StatusType
+from core.models.status_type import StatusType, get_status_type
 
 from api.permissions import (
         ApiAuthOptional, ApiAuthRequired, EnabledUserRequired,
         InMaintenance, CloudAdminRequired
     )
-from api.v2.views.mixins import MultipleFieldLookup
+from api.v2.views.mixins import MultipleFieldLookup, ConditionalListMixin
 
 
 def unresolved_requests_only(fn):
@@ -47,7 +47,7 @@ def unresolved_requests_only(fn):
     return wrapper
 
 
-class AuthViewSet(ModelViewSet):
+class AuthViewSet(ConditionalListMixin, ModelViewSet):
     http_method_names = ['get', 'put', 'patch', 'post',
                          'delete', 'head', 'options', 'trace']
     permission_classes = (InMaintenance,
@@ -62,7 +62,7 @@ class AdminAuthViewSet(AuthViewSet):
                           ApiAuthRequired,)
 
 
-class AuthOptionalViewSet(ModelViewSet):
+class AuthOptionalViewSet(ConditionalListMixin, ModelViewSet):
 
     permission_classes = (InMaintenance,
                           ApiAuthOptional,)
@@ -129,7 +129,7 @@ class BaseRequestViewSet(MultipleFieldLookup, AuthViewSet):
         # NOTE: An identity could possible have multiple memberships
         # It may be better to directly take membership rather than an identity
         identity_id = serializer.initial_data.get("identity")
-        status, _ = StatusType.objects.get_or_create(name="pending")
+        status = get_status_type("pending")
         try:
             # NOTE: This is *NOT* going to be a sufficient query when sharing..
             membership = IdentityMembership.objects.get(identity=identity_id)
@@ -180,7 +180,7 @@ class BaseRequestViewSet(MultipleFieldLookup, AuthViewSet):
         """
         Add an end date to a request and take no further action
         """
-        status, _ = StatusType.objects.get_or_create(name="closed")
+        status = get_status_type("closed")
         instance.status = status
         instance.end_date = timezone.now()
         instance.save()
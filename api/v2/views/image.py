@@ -1,12 +1,15 @@
 from rest_framework import filters
+from rest_framework.settings import api_settings
 import django_filters
 
 from api import permissions
 from api.v2.serializers.details import ImageSerializer
 from api.v2.views.base import AuthOptionalViewSet
-from api.v2.views.mixins import MultipleFieldLookup
+from api.v2.views.mixins import MultipleFieldLookup, KeysetPaginationMixin
 
-from core.models import Application as Image
+from core.models import Application as Image, ApplicationVisibility
+
+from service.search import search_queryset
 
 
 class ImageFilter(filters.FilterSet):
@@ -23,6 +26,18 @@ class ImageFilter(filters.FilterSet):
         fields = ['tag_name', 'project_id', 'created_by',
                   'created_by__username', 'tags__name', 'projects__id']
 
+class ImageSearchFilterBackend(filters.BaseFilterBackend):
+    """
+    Full-text search when 'search' is set, best matches first
+    (See service.search)
+    """
+    def filter_queryset(self, request, queryset, view):
+        query = request.query_params.get(api_settings.SEARCH_PARAM)
+        if not query:
+            return queryset
+        return search_queryset(queryset, query)
+
+
 class BookmarkedFilterBackend(filters.BaseFilterBackend):
     """
     Filter bookmarks when 'favorited' is set
@@ -38,7 +53,7 @@ class BookmarkedFilterBackend(filters.BaseFilterBackend):
         return queryset
 
 
-class ImageViewSet(MultipleFieldLookup, AuthOptionalViewSet):
+class ImageViewSet(KeysetPaginationMixin, MultipleFieldLookup, AuthOptionalViewSet):
 
     """
     API endpoint that allows images to be viewed or edited.
@@ -51,13 +66,11 @@ class ImageViewSet(MultipleFieldLookup, AuthOptionalViewSet):
                           permissions.ApplicationMemberOrReadOnly)
 
     serializer_class = ImageSerializer
-    filter_backends = (filters.DjangoFilterBackend, filters.SearchFilter, BookmarkedFilterBackend)
+    etag_fields = ('start_date', 'end_date',
+                   'versions__start_date', 'versions__end_date')
+    filter_backends = (filters.DjangoFilterBackend, ImageSearchFilterBackend, BookmarkedFilterBackend)
     filter_class = ImageFilter
-    search_fields = ('id', 'name', 'versions__change_log', 'tags__name',
-                     'tags__description', 'created_by__username',
-                     'versions__machines__instance_source__identifier',
-                     'versions__machines__instance_source__provider__location')
 
     def get_queryset(self):
         request_user = self.request.user
-        return Image.current_apps(request_user)
+        return ApplicationVisibility.applications_for(request_user)
@@ -1,7 +1,7 @@
 from api.v2.serializers.details import InstanceSerializer, InstanceActionSerializer
 from api.v2.serializers.post import InstanceSerializer as POST_InstanceSerializer
 from api.v2.views.base import AuthViewSet
-from api.v2.views.mixins import MultipleFieldLookup
+from api.v2.views.mixins import MultipleFieldLookup, KeysetPaginationMixin
 from api.v2.views.instance_action import InstanceActionViewSet
 
 from core.exceptions import ProviderNotActive
@@ -36,7 +36,7 @@ from socket import error as socket_error
 from rtwo.exceptions import ConnectionFailure
 
 
-class InstanceViewSet(MultipleFieldLookup, AuthViewSet):
+class InstanceViewSet(KeysetPaginationMixin, MultipleFieldLookup, AuthViewSet):
 
     """
     API endpoint that allows providers to be viewed or edited.
@@ -45,6 +45,9 @@ class InstanceViewSet(MultipleFieldLookup, AuthViewSet):
     queryset = Instance.objects.all()
     serializer_class = InstanceSerializer
     filter_fields = ('created_by__id', 'projects')
+    # Status changes are recorded as new InstanceStatusHistory
+    etag_fields = ('start_date', 'end_date',
+                   'instancestatushistory__start_date')
     lookup_fields = ("id", "provider_alias")
     http_method_names = ['get', 'put', 'patch', 'post',
                          'delete', 'head', 'options', 'trace']
@@ -62,9 +65,19 @@ class InstanceViewSet(MultipleFieldLookup, AuthViewSet):
         """
         user = self.request.user
         qs = Instance.for_user(user)
-        if 'archived' in self.request.query_params:
-            return qs
-        return qs.filter(only_current())
+        if 'archived' not in self.request.query_params:
+            qs = qs.filter(only_current())
+        qs = qs.select_related(
+            'created_by',
+            'created_by_identity__created_by',
+            'created_by_identity__provider',
+            'source__provider',
+            'source__providermachine__application_version__application',
+            'source__volume',
+            'instanceallocationsourcesnapshot__allocation_source',
+            'usage',
+        ).prefetch_related('projects', 'scripts__script_type')
+        return Instance.with_last_history(qs)
 
     @detail_route(methods=['post'])
     def update_metadata(self, request, pk=None):
@@ -0,0 +1,43 @@
+"""
+ Change the allocation source of many instances at once
+"""
+from rest_framework import status
+from rest_framework.exceptions import ValidationError
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from api import permissions
+from service.allocation_source import change_allocation_sources
+
+
+class InstanceAllocationSourceViewSet(ViewSet):
+    """
+    POST {"allocation_source_id": "<source_id>",
+          "instance_ids": ["<provider_alias>", ...]}
+    Every instance must belong to the user (staff may change any instance)
+    """
+    permission_classes = (permissions.InMaintenance,
+                          permissions.EnabledUserRequired,
+                          permissions.ApiAuthRequired,)
+
+    def create(self, request, *args, **kwargs):
+        data = request.data
+        allocation_source_id = data.get('allocation_source_id')
+        instance_ids = data.get('instance_ids')
+        errors = {}
+        if not allocation_source_id:
+            errors['allocation_source_id'] = "This field is required."
+        if not instance_ids or not isinstance(instance_ids, list):
+            errors['instance_ids'] = "Expected a list of instance ids."
+        if errors:
+            raise ValidationError(errors)
+        try:
+            events = change_allocation_sources(
+                request.user, instance_ids, allocation_source_id)
+        except ValueError as exc:
+            raise ValidationError({'detail': exc.message})
+        return Response({
+            'allocation_source_id': allocation_source_id,
+            'instance_ids': sorted(
+                event.payload['instance_id'] for event in events),
+        }, status=status.HTTP_201_CREATED)
@@ -7,7 +7,7 @@ from core.models import InstanceStatusHistory
 
 from api.v2.serializers.details import InstanceStatusHistorySerializer
 from api.v2.views.base import AuthReadOnlyViewSet
-from api.v2.views.mixins import MultipleFieldLookup
+from api.v2.views.mixins import MultipleFieldLookup, KeysetPaginationMixin
 
 class InstanceStatusHistoryFilter(django_filters.FilterSet):
     instance = django_filters.MethodFilter(action='filter_instance_id')
@@ -29,7 +29,8 @@ class InstanceStatusHistoryFilter(django_filters.FilterSet):
 
 
 
-class InstanceStatusHistoryViewSet(MultipleFieldLookup, AuthReadOnlyViewSet):
+class InstanceStatusHistoryViewSet(
+        KeysetPaginationMixin, MultipleFieldLookup, AuthReadOnlyViewSet):
 
     """
     API endpoint that allows instance tags to be viewed
@@ -3,6 +3,7 @@ from rest_framework import exceptions as rest_exceptions
 from api.v2.serializers.details import MachineRequestSerializer,\
     UserMachineRequestSerializer
 from api.v2.views.base import BaseRequestViewSet
+from api.v2.views.mixins import KeysetPaginationMixin
 
 from datetime import timedelta
 
@@ -17,7 +18,7 @@ from core.models import (
     MachineRequest, IdentityMembership, AtmosphereUser,
     Provider, ProviderMachine, Group, Tag
 )
-from core.models.status_type import StatusType
+from core.models.status_type import get_status_type
 from core.email import requestImaging
 
 from service.machine import share_with_admins, share_with_self, remove_duplicate_users
@@ -25,7 +26,7 @@ from service.tasks.machine import start_machine_imaging
 from threepio import logger
 
 
-class MachineRequestViewSet(BaseRequestViewSet):
+class MachineRequestViewSet(KeysetPaginationMixin, BaseRequestViewSet):
     queryset = MachineRequest.objects.none()
     model = MachineRequest
     serializer_class = UserMachineRequestSerializer
@@ -104,7 +105,7 @@ class MachineRequestViewSet(BaseRequestViewSet):
             share_with_self(access_list, request_user.username)
             access_list = remove_duplicate_users(access_list)
 
-        status, _ = StatusType.objects.get_or_create(name="pending")
+        status = get_status_type("pending")
         new_machine_provider = Provider.objects.filter(id=new_provider.id)
         new_machine_owner = AtmosphereUser.objects.filter(id=request_user.id)
         parent_machine = ProviderMachine.objects.filter(id=parent_machine.id)
@@ -172,7 +173,7 @@ class MachineRequestViewSet(BaseRequestViewSet):
         requestImaging(self.request, instance.id, auto_approve=pre_approved)
 
         if pre_approved:
-            status, _ = StatusType.objects.get_or_create(name="approved")
+            status = get_status_type("approved")
             instance.status = status
             instance.save()
             start_machine_imaging(instance)
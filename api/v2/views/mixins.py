@@ -1,9 +1,21 @@
+from hashlib import md5
 import operator
+import time
 
+from django.conf import settings
 from django.db import models
-from django.db.models import Q
+from django.db.models import Count, Max, Q
 from django.http import Http404
+from rest_framework import status
 from rest_framework.generics import get_object_or_404
+from rest_framework.permissions import SAFE_METHODS
+from rest_framework.response import Response
+
+import redis
+
+from service.cache import redis_connection
+
+from api.pagination import KeysetPagination
 
 
 class MultipleFieldLookup(object):
@@ -60,3 +72,104 @@ class MultipleFieldLookup(object):
         obj = get_object_or_404(queryset, filter_chain)
         self.check_object_permissions(self.request, obj)
         return obj
+
+
+class KeysetPaginationMixin(object):
+    """
+    Use KeysetPagination (instead of the pagination_class) when the
+    request includes '?cursor='
+    """
+    cursor_ordering = ('start_date', 'id')
+
+    @property
+    def paginator(self):
+        if not hasattr(self, '_paginator') and \
+                KeysetPagination.cursor_query_param in \
+                self.request.query_params:
+            self._paginator = KeysetPagination()
+        return super(KeysetPaginationMixin, self).paginator
+
+
+ETAG_GENERATION_KEY = "api.etag.generation.{0}"
+
+
+class ConditionalListMixin(object):
+    """
+    ETag / If-None-Match support for 'list'.
+
+    The ETag is built from the request (user, path, Accept) and one
+    aggregate query over the filtered queryset: the number of rows and
+    the newest value of each of 'etag_fields' (default: the model's
+    'updated', 'start_date' and 'end_date'). A matching If-None-Match
+    returns '304 Not Modified' without serializing anything.
+
+    Changes the timestamps can not see are covered by:
+    * A per-user generation, bumped by every successful write request
+      the user makes through the API.
+    * settings.API_ETAG_MAX_AGE, after which every ETag changes.
+    """
+    etag_fields = None
+    default_etag_fields = ('updated', 'start_date', 'end_date')
+
+    def get_etag_fields(self, queryset):
+        if self.etag_fields is not None:
+            return self.etag_fields
+        field_names = set(
+            field.name for field in queryset.model._meta.get_fields())
+        return [name for name in self.default_etag_fields
+                if name in field_names]
+
+    def get_list_etag(self, request, queryset):
+        fields = self.get_etag_fields(queryset)
+        if not fields:
+            return None
+        try:
+            generation = redis_connection().get(
+                ETAG_GENERATION_KEY.format(request.user.pk))
+        except redis.exceptions.ConnectionError:
+            return None
+        aggregates = {'etag_count': Count('pk', distinct=True)}
+        for idx, field in enumerate(fields):
+            aggregates['etag_%s' % idx] = Max(field)
+        values = queryset.order_by().aggregate(**aggregates)
+        max_age = getattr(settings, 'API_ETAG_MAX_AGE', 60)
+        version = [request.user.pk, generation, request.get_full_path(),
+                   request.META.get('HTTP_ACCEPT', ''),
+                   int(time.time() // max_age),
+                   sorted(values.items())]
+        return '"%s"' % md5(repr(version)).hexdigest()
+
+    def list(self, request, *args, **kwargs):
+        queryset = self.filter_queryset(self.get_queryset())
+        etag = self.get_list_etag(request, queryset)
+        if etag:
+            if_none_match = request.META.get('HTTP_IF_NONE_MATCH', '')
+            client_etags = [value.strip().lstrip('W/')
+                            for value in if_none_match.split(',')]
+            if etag in client_etags:
+                response = Response(status=status.HTTP_304_NOT_MODIFIED)
+                response['ETag'] = etag
+                return response
+        # ListModelMixin.list, reusing the queryset the ETag was built from
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            response = self.get_paginated_response(serializer.data)
+        else:
+            serializer = self.get_serializer(queryset, many=True)
+            response = Response(serializer.data)
+        if etag:
+            response['ETag'] = etag
+        return response
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if request.method not in SAFE_METHODS \
+                and response.status_code < 400 \
+                and request.user.is_authenticated():
+            try:
+                redis_connection().incr(
+                    ETAG_GENERATION_KEY.format(request.user.pk))
+            except redis.exceptions.ConnectionError:
+                pass
+        return super(ConditionalListMixin, self).finalize_response(
+            request, response, *args, **kwargs)
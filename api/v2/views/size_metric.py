@@ -0,0 +1,81 @@
+"""
+ Instance size metrics for cloud administrators
+"""
+from datetime import timedelta
+
+from dateutil.parser import parse
+from django.utils import timezone
+from rest_framework.exceptions import NotFound, ValidationError
+from rest_framework.response import Response
+from rest_framework.viewsets import ViewSet
+
+from api import permissions
+from core.models import Provider
+from core.models.cloud_admin import admin_provider_list
+from service.metrics import get_size_metrics
+
+
+class InstanceSizeMetricViewSet(ViewSet):
+    """
+    Size distribution, active counts and CPU hours of a provider's
+    instances over a window of time.
+
+    Query params:
+    provider_id (required)
+    start_date/end_date -- The window (Default: the last 'days' days)
+    days -- Default: 30
+    fresh=true -- Ignore cached results
+    """
+    permission_classes = (permissions.InMaintenance,
+                          permissions.CloudAdminRequired,
+                          permissions.EnabledUserRequired,
+                          permissions.ApiAuthRequired,)
+
+    def _get_provider(self, provider_id):
+        user = self.request.user
+        providers = Provider.objects.all() if user.is_staff \
+            else admin_provider_list(user)
+        try:
+            return providers.get(id=provider_id)
+        except (Provider.DoesNotExist, ValueError):
+            raise NotFound("Provider %s was not found" % provider_id)
+
+    def _get_date(self, param):
+        value = self.request.query_params.get(param)
+        if not value:
+            return None
+        try:
+            date = parse(value)
+        except (ValueError, OverflowError):
+            raise ValidationError({param: "Expected a date, received %s"
+                                          % value})
+        if timezone.is_naive(date):
+            date = timezone.make_aware(date)
+        return date
+
+    def list(self, request, *args, **kwargs):
+        params = request.query_params
+        provider_id = params.get('provider_id')
+        if not provider_id:
+            raise ValidationError({'provider_id': "This parameter is required"})
+        provider = self._get_provider(provider_id)
+        end_date = self._get_date('end_date')
+        start_date = self._get_date('start_date')
+        if not start_date:
+            try:
+                days = int(params.get('days', 30))
+            except ValueError:
+                raise ValidationError({'days': "Expected a number of days"})
+            start_date = (end_date or timezone.now()) - timedelta(days=days)
+        if end_date and end_date <= start_date:
+            raise ValidationError(
+                {'end_date': "end_date must be after start_date"})
+        use_cache = params.get('fresh', '').lower() != 'true'
+        metrics = get_size_metrics(
+            provider.id, start_date, end_date, use_cache=use_cache)
+        return Response({
+            'provider': provider.id,
+            'start_date': start_date,
+            'end_date': end_date or timezone.now(),
+            'results': metrics
+        })
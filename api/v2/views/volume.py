@@ -43,6 +43,8 @@ class VolumeViewSet(MultipleFieldLookup, AuthViewSet):
     lookup_fields = ("id", "instance_source__identifier")
     serializer_class = VolumeSerializer
     filter_class = VolumeFilter
+    etag_fields = ('instance_source__start_date',
+                   'instance_source__end_date')
     http_method_names = ('get', 'post', 'put', 'patch', 'delete',
                          'head', 'options', 'trace')
 
@@ -24,6 +24,7 @@ DEPLOY_TASKS = [
     "_deploy_init_to", "service.tasks.driver._deploy_init_to",
     "deploy_ready_test", "service.tasks.driver.deploy_ready_test", 
     "check_process_task", "service.tasks.driver.check_process_task", 
+    "deploy_instance_batch", "service.tasks.driver.deploy_instance_batch",
 ]
 EMAIL_TASKS = [
     "send_email", "core.tasks.email.send_email",
@@ -48,6 +49,10 @@ PERIODIC_TASKS = [
     "monitor_machines", "monitor_machines_for",
     "monitor_sizes", "monitor_sizes_for",
     "monitor_volumes", "monitor_volumes_for",
+    "rollup_instance_usage",
+    "rebuild_application_visibility",
+    "refresh_application_metrics",
+    "redispatch_events",
     "prune_machines", "prune_machines_for",
     "check_image_membership", "update_membership_for",
     "clear_empty_ips", "clear_empty_ips_for",
@@ -62,6 +67,26 @@ PERIODIC_TASKS = [
 SHORT_TASKS = [
     "wait_for_instance",
 ]
+# Tasks a user is actively waiting on. These are published with the
+# highest priority so a burst of periodic work can not starve them.
+INTERACTIVE_TASKS = [
+    "deploy_init_to", "service.tasks.driver.deploy_init_to",
+    "attach_task", "service.tasks.volume.attach_task",
+    "detach_task", "service.tasks.volume.detach_task",
+    "mount_task", "service.tasks.volume.mount_task",
+    "umount_task", "service.tasks.volume.umount_task",
+    "add_floating_ip", "service.tasks.driver.add_floating_ip",
+    "destroy_instance", "service.tasks.driver.destroy_instance",
+    "wait_for_instance",
+]
+
+# Priority levels -- Using the redis transport, 0 is the *highest* priority.
+# Values are rounded to the nearest entry in
+# BROKER_TRANSPORT_OPTIONS['priority_steps'].
+PRIORITY_INTERACTIVE = 0
+PRIORITY_DEFAULT = 3
+PRIORITY_BACKGROUND = 6
+PRIORITY_PERIODIC = 9
 
 
 class CloudRouter(PredeclareRouter):
@@ -89,6 +114,20 @@ class CloudRouter(PredeclareRouter):
         return the_route
 
     def prepare_route(self, task_name):
+        the_route = self._prepare_queue(task_name)
+        the_route["priority"] = self.prepare_priority(task_name)
+        return the_route
+
+    def prepare_priority(self, task_name):
+        if task_name in INTERACTIVE_TASKS:
+            return PRIORITY_INTERACTIVE
+        elif task_name in PERIODIC_TASKS:
+            return PRIORITY_PERIODIC
+        elif task_name in IMAGING_TASKS or task_name in EMAIL_TASKS:
+            return PRIORITY_BACKGROUND
+        return PRIORITY_DEFAULT
+
+    def _prepare_queue(self, task_name):
         if task_name in SHORT_TASKS:
             return {"queue": "fast_deploy", "routing_key": "short.deployment"}
         elif task_name in IMAGING_TASKS:
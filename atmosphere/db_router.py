@@ -0,0 +1,151 @@
+"""
+Send designated read-only workloads (reports, snapshots, metrics..) to a
+read replica.
+
+    with use_replica():
+        ...
+
+    @use_replica()
+    def create_report(...):
+        ...
+
+Outside of 'use_replica' every query goes to 'default'. Inside, reads go to
+settings.REPLICA_DATABASE unless:
+* It is not configured (not in settings.DATABASES)
+* The replica is more than REPLICA_MAX_LAG seconds behind the primary
+* The workload wrote something (it then reads its own writes from
+  'default' until the block ends), or is inside 'use_primary()'
+"""
+from functools import wraps
+import threading
+import time
+
+from django.conf import settings
+from django.db import DatabaseError, connections
+
+from threepio import logger
+
+
+DEFAULT_DB = 'default'
+_state = threading.local()
+_lag_cache = {}
+
+
+def _replica_alias():
+    alias = getattr(settings, 'REPLICA_DATABASE', None)
+    if alias and alias in settings.DATABASES and alias != DEFAULT_DB:
+        return alias
+    return None
+
+
+def replica_lag(alias):
+    """
+    Seconds the replica 'alias' is behind its primary (0 on a primary),
+    cached for REPLICA_LAG_CHECK_INTERVAL seconds. None if unknown.
+    """
+    checked_at, lag = _lag_cache.get(alias, (0, None))
+    interval = getattr(settings, 'REPLICA_LAG_CHECK_INTERVAL', 10)
+    if time.time() - checked_at < interval:
+        return lag
+    lag = None
+    connection = connections[alias]
+    try:
+        if connection.vendor == 'postgresql':
+            with connection.cursor() as cursor:
+                cursor.execute(
+                    "SELECT CASE WHEN pg_is_in_recovery() THEN"
+                    " COALESCE(EXTRACT(EPOCH FROM"
+                    "  now() - pg_last_xact_replay_timestamp()), 0)"
+                    " ELSE 0 END")
+                lag = float(cursor.fetchone()[0])
+        else:
+            lag = 0.0
+    except DatabaseError:
+        logger.exception("Could not read the lag of database %s" % alias)
+    _lag_cache[alias] = (time.time(), lag)
+    return lag
+
+
+def _replica_for_read():
+    """
+    The alias reads should use in the current workload, or None
+    """
+    if not getattr(_state, 'replica_depth', 0) or \
+            getattr(_state, 'primary_depth', 0) or \
+            getattr(_state, 'wrote', False):
+        return None
+    alias = _replica_alias()
+    if not alias:
+        return None
+    max_lag = getattr(settings, 'REPLICA_MAX_LAG', 60)
+    lag = replica_lag(alias)
+    if lag is None or lag > max_lag:
+        logger.warn("Replica %s is %s seconds behind, reading from %s"
+                    % (alias, lag, DEFAULT_DB))
+        return None
+    return alias
+
+
+class _RoutingBlock(object):
+    """
+    A context manager, that is also a decorator
+    """
+    depth_attr = None
+
+    def __enter__(self):
+        depth = getattr(_state, self.depth_attr, 0)
+        setattr(_state, self.depth_attr, depth + 1)
+        if self.depth_attr == 'replica_depth' and not depth:
+            _state.wrote = False
+        return self
+
+    def __exit__(self, *exc_info):
+        depth = getattr(_state, self.depth_attr) - 1
+        setattr(_state, self.depth_attr, depth)
+        if self.depth_attr == 'replica_depth' and not depth:
+            _state.wrote = False
+        return False
+
+    def __call__(self, func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            with self.__class__():
+                return func(*args, **kwargs)
+        return wrapper
+
+
+class use_replica(_RoutingBlock):
+    """
+    Read from the replica (when it is usable) until the block ends
+    """
+    depth_attr = 'replica_depth'
+
+
+class use_primary(_RoutingBlock):
+    """
+    Read from 'default', even inside 'use_replica'
+    (Ex: A path that must see a write made by another process)
+    """
+    depth_attr = 'primary_depth'
+
+
+class ReplicaRouter(object):
+    """
+    settings.DATABASE_ROUTERS entry, See use_replica
+    """
+
+    def db_for_read(self, model, **hints):
+        return _replica_for_read() or DEFAULT_DB
+
+    def db_for_write(self, model, **hints):
+        if getattr(_state, 'replica_depth', 0):
+            # Read your own writes for the rest of the workload
+            _state.wrote = True
+        return DEFAULT_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as 'default'
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == DEFAULT_DB
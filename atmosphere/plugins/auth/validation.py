@@ -10,6 +10,10 @@ class AlwaysAllow(ValidationPlugin):
     """
     Given an AtmosphereUser, ensure that this user is (still?) valid.
     """
+    # Nothing to save by caching.
+    cache_ttl = 0
+    negative_cache_ttl = 0
+
     def validate_user(self, user):
         return True
 
@@ -441,6 +441,70 @@ CELERY_QUEUES = (
     Queue('imaging', Exchange('imaging'), routing_key='imaging'),
     Queue('periodic', Exchange('periodic'), routing_key='periodic'),
 )
+# Redis priority lanes -- 0 is the highest priority.
+# See atmosphere.celery_router for the priority assigned to each task.
+BROKER_TRANSPORT_OPTIONS = {'priority_steps': [0, 3, 6, 9]}
+# Maximum number of cloud-API-heavy tasks (monitor_*_for, etc.)
+# running against a single provider at once. See service.throttle
+PROVIDER_TASK_CONCURRENCY = 4
+# Per-provider overrides: {"<provider_id>": concurrency}
+PROVIDER_TASK_CONCURRENCY_OVERRIDES = {}
+# Tokens held longer than this (seconds) are returned to the bucket.
+PROVIDER_TASK_LEASE = 30 * 60
+# Periodic fan-out: a '*_for' task is not re-published for a provider
+# while the previous run is still queued or executing. See service.locks
+SINGLE_FLIGHT_DEFAULT_LEASE = 60 * 60
+SINGLE_FLIGHT_LEASES = {
+    "monitor_instances_for": 30 * 60,
+    "clear_empty_ips_for": 2 * 60 * 60,
+}
+# Number of concurrent glance requests made while syncing image membership
+MACHINE_MEMBERSHIP_SYNC_WORKERS = 8
+# Seconds an identity's allocation usage snapshot is served from the cache
+ALLOCATION_USAGE_CACHE_TTL = 15 * 60
+# InstanceUsage is recalculated for instances end-dated within the lookback
+INSTANCE_USAGE_ROLLUP_LOOKBACK = timedelta(hours=2)
+INSTANCE_USAGE_BATCH_SIZE = 500
+# total_usage reads the usage ledger (core.models.usage_ledger) once it has
+# been rebuilt, See docs/DEPLOY_NOTES.md
+USE_USAGE_LEDGER = False
+# Seconds each process caches active MaintenanceRecords
+MAINTENANCE_CACHE_TTL = 30
+# Seconds each process caches lookup tables (InstanceStatus, StatusType..)
+LOOKUP_CACHE_TTL = 5 * 60
+# Validation plugin results (see core.validation), in seconds.
+# Per-plugin values: {'path.to.Plugin': {'ttl': N, 'negative_ttl': N}}
+VALIDATION_CACHE_TTL = 15 * 60
+VALIDATION_CACHE_NEGATIVE_TTL = 60
+VALIDATION_CACHE_STALE_TTL = 24 * 60 * 60
+VALIDATION_CACHE_TTLS = {}
+# Seconds before every v2 list ETag changes, even if nothing else did
+API_ETAG_MAX_AGE = 60
+# Seconds service.metrics caches size metrics (windows ending now/in the past)
+SIZE_METRICS_CACHE_TTL = 15 * 60
+SIZE_METRICS_HISTORIC_CACHE_TTL = 24 * 60 * 60
+# PostgreSQL text search configuration used by service.search
+SEARCH_TEXT_CONFIG = 'english'
+# EventTable listeners, See service.event_bus
+EVENT_BUS_ASYNC = True
+# Cheap snapshot upserts are run when the event is saved
+EVENT_BUS_SYNC_LISTENERS = [
+    'listen_for_instance_allocation_changes',
+    'listen_for_instance_usage_changes',
+    'listen_for_allocation_snapshot_changes',
+    'listen_for_user_snapshot_changes',
+]
+EVENT_BUS_MAX_ATTEMPTS = 5
+# Seconds before the first retry (doubled on each attempt)
+EVENT_BUS_RETRY_DELAY = 60
+EVENT_BUS_LOCK_LEASE = 10 * 60
+# Reporting/monitoring reads (See atmosphere.db_router.use_replica) go to
+# this alias of DATABASES, when it is configured
+DATABASE_ROUTERS = ['atmosphere.db_router.ReplicaRouter']
+REPLICA_DATABASE = 'replica'
+# Seconds behind the primary before reads fall back to 'default'
+REPLICA_MAX_LAG = 60
+REPLICA_LAG_CHECK_INTERVAL = 10
 CELERY_DEFAULT_QUEUE = 'default'
 CELERY_DEFAULT_ROUTING_KEY = "default"
 CELERY_DEFAULT_EXCHANGE = 'default'
@@ -495,6 +559,26 @@ CELERYBEAT_SCHEDULE = {
         "schedule": timedelta(minutes=15),
         "options": {"expires": 10 * 60, "time_limit": 10 * 60}
     },
+    "rollup_instance_usage": {
+        "task": "rollup_instance_usage",
+        "schedule": timedelta(hours=1),
+        "options": {"expires": 30 * 60, "time_limit": 30 * 60}
+    },
+    "rebuild_application_visibility": {
+        "task": "rebuild_application_visibility",
+        "schedule": timedelta(hours=1),
+        "options": {"expires": 30 * 60, "time_limit": 30 * 60}
+    },
+    "refresh_application_metrics": {
+        "task": "refresh_application_metrics",
+        "schedule": crontab(hour="3", minute="0", day_of_week="*"),
+        "options": {"expires": 60 * 60, "time_limit": 60 * 60}
+    },
+    "redispatch_events": {
+        "task": "redispatch_events",
+        "schedule": timedelta(minutes=15),
+        "options": {"expires": 10 * 60, "time_limit": 10 * 60}
+    },
     "clear_empty_ips": {
         "task": "clear_empty_ips",
         "schedule": timedelta(minutes=120),
@@ -8,6 +8,7 @@ from django.utils import timezone
 
 from threepio import logger
 
+from atmosphere.db_router import use_replica
 from core import email
 from core import models
 from core import tasks
@@ -24,6 +25,23 @@ def end_date_object(modeladmin, request, queryset):
 end_date_object.short_description = 'Add end-date to objects'
 
 
+class ReplicaChangeListMixin(object):
+    """
+    List (GET) large tables from the read replica, See atmosphere.db_router
+    """
+
+    def changelist_view(self, request, extra_context=None):
+        if request.method != 'GET':
+            return super(ReplicaChangeListMixin, self).changelist_view(
+                request, extra_context)
+        with use_replica():
+            response = super(ReplicaChangeListMixin, self).changelist_view(
+                request, extra_context)
+            # Evaluate the queries before leaving the block
+            return response.render() \
+                if hasattr(response, 'render') else response
+
+
 # For removing 'standard' registrations
 admin.site.unregister(DjangoGroup)
 
@@ -195,7 +213,7 @@ class ProviderCredentialInline(admin.TabularInline):
     extra = 1
 
 @admin.register(models.EventTable)
-class EventTableAdmin(admin.ModelAdmin):
+class EventTableAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     search_fields = ["entity_id", "name"]
     list_display = ["uuid", "name", "entity_id", "payload", "timestamp"]
     list_filter = ["entity_id", "name"]
@@ -450,7 +468,7 @@ class MachineRequestAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.InstanceStatusHistory)
-class InstanceStatusHistoryAdmin(admin.ModelAdmin):
+class InstanceStatusHistoryAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     search_fields = ["instance__created_by__username",
                      "instance__source__identifier",
                      "instance__provider_alias", "status__name"]
@@ -474,7 +492,7 @@ class InstanceStatusHistoryAdmin(admin.ModelAdmin):
 
 
 @admin.register(models.Instance)
-class InstanceAdmin(admin.ModelAdmin):
+class InstanceAdmin(ReplicaChangeListMixin, admin.ModelAdmin):
     search_fields = ["created_by__username", "provider_alias", "ip_address"]
     list_display = ["provider_alias", "get_size", "application_id", "application_name", "start_date", "name", "created_by", "ip_address"]
     list_filter = ["source__provider__location"]
@@ -89,11 +89,16 @@ def listen_before_allocation_snapshot_changes(sender, instance, raw, **kwargs):
         return
     if not source.compute_allowed:
         return
-    prev_snapshot = AllocationSourceSnapshot.objects.filter(allocation_source__source_id=allocation_source_id).first()
-    if not prev_snapshot:
+    # The snapshot may already include this event (See EVENT_BUS_SYNC_LISTENERS)
+    # so compare with the previous event instead.
+    prev_event = EventTable.objects\
+        .filter(name='allocation_source_snapshot', id__lt=event.id)\
+        .filter(payload__allocation_source_id=allocation_source_id)\
+        .order_by('id').last()
+    if not prev_event:
         prev_compute_used = 0
     else:
-        prev_compute_used = float(prev_snapshot.compute_used)
+        prev_compute_used = float(prev_event.payload['compute_used'])
     prev_percentage = int(100.0*prev_compute_used/source.compute_allowed)
     current_percentage = int(100.0*new_compute_used/source.compute_allowed)
     print "Previous:%s - New:%s" % (prev_percentage, current_percentage)
@@ -285,3 +290,30 @@ def listen_for_instance_allocation_changes(sender, instance, created, **kwargs):
             allocation_source=allocation_source,
             instance=instance)
     return snapshot
+
+
+def listen_for_instance_usage_changes(sender, instance, created, **kwargs):
+    """
+    This listener expects:
+    EventType - 'instance_allocation_source_changed'
+    EventPayload - {
+        "allocation_source_id": "37623",
+        "instance_id":"2439b15a-293a-4c11-b447-bf349f16ed2e"
+    }
+
+    The method should result in the usage ledger being charged to the previous
+    allocation source for the time before the event.
+    """
+    event = instance
+    if event.name != 'instance_allocation_source_changed' or not created:
+        return None
+    from core.models.usage_ledger import UsageLedgerEntry
+    instance = Instance.objects.filter(
+        provider_alias=event.payload['instance_id']).first()
+    if not instance:
+        return None
+    entries = []
+    for history in instance.instancestatushistory_set.filter(
+            end_date=None, start_date__lt=event.timestamp):
+        entries.extend(UsageLedgerEntry.record(history, until=event.timestamp))
+    return entries
@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+from core.models import Instance, InstanceUsage
+
+
+class Command(BaseCommand):
+    help = 'Calculates InstanceUsage for existing instances, in batches'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of instances updated at a time")
+        parser.add_argument("--missing-only", action="store_true",
+                            help="Skip instances that already have usage")
+        parser.add_argument("--provider-id", type=int,
+                            help="Limit the backfill to a single provider")
+
+    def handle(self, *args, **options):
+        instances = Instance.objects.all()
+        if options['missing_only']:
+            instances = instances.filter(usage__isnull=True)
+        if options['provider_id']:
+            instances = instances.filter(
+                source__provider__id=options['provider_id'])
+        total = InstanceUsage.update_in_batches(
+            instances, batch_size=options['batch_size'],
+            stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Successfully updated usage for %s instances' % total))
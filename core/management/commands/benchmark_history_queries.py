@@ -0,0 +1,209 @@
+import importlib
+import random
+import time
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from core.models import (
+    EventTable, Identity, Instance, InstanceSource, InstanceStatus,
+    InstanceStatusHistory)
+
+
+INDEX_MIGRATION = 'core.migrations.0067_history_and_event_indexes'
+EVENT_NAMES = ['instance_allocation_source_changed',
+               'allocation_source_threshold_met',
+               'user_allocation_snapshot_changed',
+               'allocation_source_snapshot']
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ('Seeds synthetic InstanceStatusHistory/EventTable rows and '
+            'reports hot query latencies with and without their indexes. '
+            'Everything is rolled back, but the tables are locked while '
+            'it runs: Do NOT run against a production database.')
+
+    def add_arguments(self, parser):
+        parser.add_argument("--histories", type=int, default=1000000,
+                            help="Number of histories to create")
+        parser.add_argument("--events", type=int, default=1000000,
+                            help="Number of events to create")
+        parser.add_argument("--histories-per-instance", type=int, default=10)
+        parser.add_argument("--users", type=int, default=1000,
+                            help="Number of usernames used by events")
+        parser.add_argument("--repeat", type=int, default=20,
+                            help="Number of times each query is run")
+        parser.add_argument("--seed", type=int, default=42)
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("The benchmark requires PostgreSQL")
+        identity = Identity.objects.select_related(
+            'created_by', 'provider').first()
+        if not identity:
+            raise CommandError("At least one Identity is required")
+        self.options = options
+        self.end_time = timezone.now()
+        self.start_time = self.end_time - timedelta(days=365)
+        try:
+            with transaction.atomic():
+                self.seed(identity)
+                with_indexes = self.run_queries()
+                self.drop_indexes()
+                without_indexes = self.run_queries()
+                self.report(with_indexes, without_indexes)
+                raise Rollback()
+        except Rollback:
+            self.stdout.write("Synthetic data and index changes rolled back")
+
+    def _execute(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def seed(self, identity):
+        options = self.options
+        self._execute("SELECT setseed(%s)",
+                      [float(options['seed'] % 1000) / 1000])
+        source = InstanceSource.objects.create(
+            provider=identity.provider, identifier='benchmark-source')
+        status = InstanceStatus.objects.get_or_create(name='active')[0]
+        instance_count = max(
+            options['histories'] / options['histories_per_instance'], 1)
+        self.stdout.write("Creating %s instances" % instance_count)
+        batch = []
+        for idx in xrange(instance_count):
+            batch.append(Instance(
+                name='benchmark-%s' % idx,
+                provider_alias='benchmark-%s' % idx,
+                source=source,
+                created_by=identity.created_by,
+                created_by_identity=identity,
+                start_date=self.start_time))
+            if len(batch) == 5000:
+                Instance.objects.bulk_create(batch)
+                batch = []
+        Instance.objects.bulk_create(batch)
+        self.instance_ids = list(Instance.objects.filter(
+            source=source).values_list('id', flat=True))
+
+        self.stdout.write("Creating %s histories" % options['histories'])
+        # Each instance gets 'histories_per_instance' histories of a day
+        # starting at random within the year, the last one is left open.
+        self._execute(
+            "INSERT INTO instance_status_history"
+            " (uuid, instance_id, status_id, start_date, end_date)"
+            " SELECT md5(random()::text || g)::uuid, instance_id, %s,"
+            "  start_date,"
+            "  CASE WHEN g %% %s = %s THEN NULL"
+            "   ELSE start_date + interval '1 day' END"
+            " FROM (SELECT g, ids.id AS instance_id,"
+            "  %s::timestamptz + (random() * 364) * interval '1 day'"
+            "   AS start_date"
+            "  FROM generate_series(0, %s - 1) AS g"
+            "  JOIN (SELECT id, row_number() OVER (ORDER BY id) - 1 AS n"
+            "   FROM instance WHERE source_id = %s) AS ids"
+            "  ON ids.n = g / %s) AS h",
+            [status.id, options['histories_per_instance'],
+             options['histories_per_instance'] - 1, self.start_time,
+             options['histories'], source.id,
+             options['histories_per_instance']])
+
+        self.stdout.write("Creating %s events" % options['events'])
+        self._execute(
+            "INSERT INTO event_table (uuid, entity_id, name, payload, timestamp)"
+            " SELECT md5(random()::text || g)::uuid, '',"
+            "  (%s::text[])[1 + g %% %s],"
+            "  json_build_object('username', 'user' || (g %% %s),"
+            "                    'allocation_source_id', g %% 100)::jsonb,"
+            "  %s::timestamptz + (random() * 365) * interval '1 day'"
+            " FROM generate_series(0, %s - 1) AS g",
+            [EVENT_NAMES, len(EVENT_NAMES), options['users'],
+             self.start_time, options['events']])
+        self._execute("ANALYZE instance_status_history")
+        self._execute("ANALYZE event_table")
+
+    def drop_indexes(self):
+        migration = importlib.import_module(INDEX_MIGRATION)
+        for name, _ in migration.INDEXES:
+            self._execute("DROP INDEX IF EXISTS %s" % name)
+
+    def _window(self, days):
+        start = self.start_time + timedelta(
+            days=self.random.uniform(0, 365 - days))
+        return start, start + timedelta(days=days)
+
+    def queries(self):
+        """
+        name -> function returning a fresh (evaluated) query
+        """
+        def last_history():
+            instance_id = self.random.choice(self.instance_ids)
+            return InstanceStatusHistory.objects.filter(
+                instance_id=instance_id).order_by('-start_date').first()
+
+        def active_history():
+            instance_id = self.random.choice(self.instance_ids)
+            return list(InstanceStatusHistory.objects.filter(
+                instance_id=instance_id, end_date=None))
+
+        def histories_in_window():
+            start, end = self._window(1)
+            return InstanceStatusHistory.objects.filter(
+                Q(end_date__gt=start) | Q(end_date__isnull=True),
+                start_date__lt=end).count()
+
+        def events_in_window():
+            start, end = self._window(7)
+            return EventTable.objects.filter(
+                name='instance_allocation_source_changed',
+                timestamp__gte=start, timestamp__lte=end).count()
+
+        def last_event_for_user():
+            before, _ = self._window(0)
+            username = 'user%s' % self.random.randrange(
+                self.options['users'])
+            return EventTable.objects.filter(
+                name='instance_allocation_source_changed',
+                payload__username=username,
+                timestamp__lt=before).order_by('timestamp').last()
+
+        return [('last_history', last_history),
+                ('active_history', active_history),
+                ('histories_in_window', histories_in_window),
+                ('events_in_window', events_in_window),
+                ('last_event_for_user', last_event_for_user)]
+
+    def run_queries(self):
+        """
+        Returns [(name, median_ms, p95_ms), ...]
+        """
+        # The same parameters are used for every run
+        self.random = random.Random(self.options['seed'])
+        results = []
+        for name, query in self.queries():
+            timings = []
+            for _ in xrange(self.options['repeat']):
+                start = time.time()
+                query()
+                timings.append((time.time() - start) * 1000)
+            timings.sort()
+            results.append((
+                name, timings[len(timings) / 2],
+                timings[min(int(len(timings) * 0.95), len(timings) - 1)]))
+        return results
+
+    def report(self, with_indexes, without_indexes):
+        self.stdout.write("%-22s %24s %24s" % (
+            "query", "without indexes (ms)", "with indexes (ms)"))
+        self.stdout.write("%-22s %12s %11s %12s %11s" % (
+            "", "median", "p95", "median", "p95"))
+        for before, after in zip(without_indexes, with_indexes):
+            self.stdout.write("%-22s %12.2f %11.2f %12.2f %11.2f" % (
+                before[0], before[1], before[2], after[1], after[2]))
@@ -0,0 +1,127 @@
+import csv
+
+from dateutil.parser import parse
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from atmosphere.db_router import use_replica
+from core.models import (
+    Application, Instance, InstanceStatusHistory, ObjectDoesNotExist,
+    timelines_for)
+
+
+CSV_HEADER = ("Instance ID, Instance Alias, Username, Provider, "
+              "Instance Start Date, Image Name, Version Name, Size Name, "
+              "Size Alias, Size cpu, Size mem, Size disk, Featured Image, "
+              "Active, Deploy Error, Error, Aborted")
+
+
+def _encode(value):
+    if isinstance(value, unicode):
+        return value.encode('utf-8')
+    return value
+
+
+class Command(BaseCommand):
+    help = ('Prints the Jetstream accounting CSV (one row per instance), '
+            'replaces scripts/generate_metrics.py')
+
+    def add_arguments(self, parser):
+        parser.add_argument("--since",
+                            help="Only instances with a status change "
+                                 "since this date (ex: 2016-10-01)")
+        parser.add_argument("--output",
+                            help="Write the CSV to this file "
+                                 "(Default: stdout)")
+        parser.add_argument("--batch-size", type=int, default=2000,
+                            help="Number of instances read at a time")
+
+    @use_replica()
+    def handle(self, *args, **options):
+        instances = Instance.objects.all()
+        if options['since']:
+            since = parse(options['since'])
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+            instances = instances.filter(
+                id__in=InstanceStatusHistory.objects.filter(
+                    start_date__gte=since).values('instance_id'))
+        output = open(options['output'], 'wb') \
+            if options['output'] else self.stdout
+        try:
+            output.write(CSV_HEADER + "\n")
+            writer = csv.writer(output)
+            for row in self.rows(instances, options['batch_size']):
+                writer.writerow([_encode(value) for value in row])
+        finally:
+            if options['output']:
+                output.close()
+
+    def rows(self, instances, batch_size):
+        """
+        Yield one CSV row per instance, reading 'batch_size' instances
+        (and all of their histories) at a time.
+        """
+        last_id = 0
+        while True:
+            batch = list(instances.filter(id__gt=last_id).order_by(
+                'id').select_related(
+                    'created_by', 'source__provider',
+                    'source__providermachine__application_version'
+                    '__application')[:batch_size])
+            if not batch:
+                return
+            last_id = batch[-1].id
+            timelines = timelines_for(batch)
+            featured = self._featured(batch)
+            for instance in batch:
+                yield self.row(instance, timelines[instance.id], featured)
+
+    def _featured(self, batch):
+        application_ids = set()
+        for instance in batch:
+            application = self._application(instance)
+            if application:
+                application_ids.add(application.id)
+        return set(Application.tags.through.objects.filter(
+            application__id__in=application_ids,
+            tag__name__icontains='featured'
+        ).values_list('application_id', flat=True))
+
+    def _application(self, instance):
+        try:
+            return instance.source.providermachine\
+                .application_version.application
+        except (ObjectDoesNotExist, AttributeError):
+            return None
+
+    def row(self, instance, timeline, featured):
+        application = self._application(instance)
+        if application:
+            version = instance.source.providermachine.application_version
+            image_name, version_name = application.name, version.name
+            featured_image = application.id in featured
+        else:
+            image_name, version_name = "Deleted Image", "N/A"
+            featured_image = False
+        statuses = set(history.status.name.lower() for history in timeline)
+        size = timeline.last.size if timeline else None
+        hit_active = 'active' in statuses
+        hit_error = 'error' in statuses
+        hit_deploy_error = 'deploy_error' in statuses
+        hit_aborted = not (hit_active or hit_error or hit_deploy_error)
+        if hit_active:
+            hit_error = hit_deploy_error = False
+        if hit_error and hit_deploy_error:
+            hit_error = False
+        return [
+            instance.id, instance.provider_alias,
+            instance.created_by.username,
+            instance.source.provider.location,
+            instance.start_date.strftime("%x %X"),
+            image_name, version_name,
+            size.name if size else "", size.alias if size else "",
+            size.cpu if size else "", size.mem if size else "",
+            size.disk if size else "",
+            int(featured_image), int(hit_active), int(hit_deploy_error),
+            int(hit_error), int(hit_aborted)]
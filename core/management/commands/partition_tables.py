@@ -0,0 +1,216 @@
+from datetime import datetime
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+import pytz
+
+
+# table -> partition key. Both tables are range partitioned by month.
+PARTITIONED_TABLES = {
+    'instance_status_history': 'start_date',
+    'event_table': 'timestamp',
+}
+ARCHIVE_SCHEMA = 'archive'
+
+
+def _month(date, offset=0):
+    """
+    The first instant (UTC) of the month 'offset' months after 'date'
+    """
+    month = date.year * 12 + date.month - 1 + offset
+    return datetime(month // 12, month % 12 + 1, 1, tzinfo=pytz.utc)
+
+
+def _partition_name(table, month):
+    return "%s_p%04d_%02d" % (table, month.year, month.month)
+
+
+def _parse_month(value):
+    try:
+        return datetime.strptime(value, "%Y-%m").replace(tzinfo=pytz.utc)
+    except ValueError:
+        raise CommandError("Expected a month (ex: 2016-10), received %s"
+                           % value)
+
+
+class Command(BaseCommand):
+    help = ('Manages monthly range partitions (PostgreSQL 11+) of '
+            'instance_status_history and event_table: --convert the tables '
+            'once, then run periodically to create future partitions and '
+            'to move old ones to the "%s" schema.' % ARCHIVE_SCHEMA)
+
+    def add_arguments(self, parser):
+        parser.add_argument("--table", action="append",
+                            choices=sorted(PARTITIONED_TABLES.keys()),
+                            help="Only manage this table (Default: all)")
+        parser.add_argument("--convert", action="store_true",
+                            help="Convert the tables to partitioned tables "
+                                 "(copies every row, run during downtime)")
+        parser.add_argument("--months-ahead", type=int, default=3,
+                            help="Number of future monthly partitions")
+        parser.add_argument("--archive-before",
+                            help="Detach partitions of months before this "
+                                 "one (ex: 2015-01) and move them to the "
+                                 "'%s' schema" % ARCHIVE_SCHEMA)
+        parser.add_argument("--dry-run", action="store_true",
+                            help="Print the SQL without running it")
+
+    def handle(self, *args, **options):
+        if connection.vendor != 'postgresql':
+            raise CommandError("Partitioning requires PostgreSQL")
+        if connection.pg_version < 110000:
+            raise CommandError("Partitioning requires PostgreSQL 11+ "
+                               "(Found %s)" % connection.pg_version)
+        self.dry_run = options['dry_run']
+        now_time = timezone.now()
+        for table in options['table'] or sorted(PARTITIONED_TABLES.keys()):
+            column = PARTITIONED_TABLES[table]
+            with transaction.atomic():
+                if options['convert']:
+                    self.convert(table, column, now_time)
+                elif not self.is_partitioned(table):
+                    self.stdout.write("%s is not partitioned (See --convert)"
+                                      % table)
+                    continue
+                for offset in xrange(options['months_ahead'] + 1):
+                    self.create_partition(
+                        table, column, _month(now_time, offset))
+                if options['archive_before']:
+                    self.archive(table, column,
+                                 _parse_month(options['archive_before']))
+        self.stdout.write(self.style.SUCCESS("Partitions are up to date"))
+
+    def _execute(self, sql, params=None):
+        if self.dry_run:
+            self.stdout.write(sql % tuple(
+                "'%s'" % param for param in params or []) + ";")
+            return
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+
+    def _fetch(self, sql, params=None):
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return cursor.fetchall()
+
+    def is_partitioned(self, table):
+        return self._fetch(
+            "SELECT relkind FROM pg_class WHERE oid = %s::regclass",
+            [table])[0][0] == 'p'
+
+    def partitions(self, table):
+        """
+        Names of the partitions of 'table'
+        """
+        return set(row[0] for row in self._fetch(
+            "SELECT c.relname FROM pg_inherits i"
+            " JOIN pg_class c ON c.oid = i.inhrelid"
+            " WHERE i.inhparent = %s::regclass", [table]))
+
+    def convert(self, table, column, now_time):
+        """
+        Replace 'table' with a table partitioned by month on 'column'.
+        Indexes and foreign keys are re-created, foreign keys *to* the table
+        are dropped (PostgreSQL can not reference a partitioned table by
+        'id' alone) and the primary key becomes (id, column).
+        """
+        if self.is_partitioned(table):
+            self.stdout.write("%s is already partitioned" % table)
+            return
+        legacy = "%s_legacy" % table
+        indexes = [row[0] for row in self._fetch(
+            "SELECT pg_get_indexdef(i.indexrelid) FROM pg_index i"
+            " WHERE i.indrelid = %s::regclass"
+            " AND NOT i.indisprimary AND NOT i.indisunique", [table])]
+        foreign_keys = self._fetch(
+            "SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint"
+            " WHERE conrelid = %s::regclass AND contype = 'f'", [table])
+        references = self._fetch(
+            "SELECT conrelid::regclass::text, conname FROM pg_constraint"
+            " WHERE confrelid = %s::regclass AND contype = 'f'", [table])
+        sequence = self._fetch(
+            "SELECT pg_get_serial_sequence(%s, 'id')", [table])[0][0]
+        first_date = self._fetch(
+            "SELECT min(\"%s\") FROM %s" % (column, table))[0][0] or now_time
+
+        self.stdout.write("Converting %s" % table)
+        for referencing_table, name in references:
+            self._execute("ALTER TABLE %s DROP CONSTRAINT %s"
+                          % (referencing_table, name))
+        self._execute("ALTER TABLE %s RENAME TO %s" % (table, legacy))
+        self._execute(
+            "CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)"
+            " PARTITION BY RANGE (\"%s\")" % (table, legacy, column))
+        # Named apart from the constraints still held by the legacy table
+        self._execute(
+            "ALTER TABLE %s ADD CONSTRAINT %s_id_%s_pkey"
+            " PRIMARY KEY (id, \"%s\")" % (table, table, column, column))
+        self._execute(
+            "ALTER TABLE %s ADD CONSTRAINT %s_uuid_%s_key"
+            " UNIQUE (uuid, \"%s\")" % (table, table, column, column))
+        self._execute("CREATE TABLE %s_default PARTITION OF %s DEFAULT"
+                      % (table, table))
+        month = _month(first_date)
+        while month <= _month(now_time):
+            self.create_partition(table, column, month)
+            month = _month(month, 1)
+        self._execute("INSERT INTO %s SELECT * FROM %s" % (table, legacy))
+        if sequence:
+            self._execute("ALTER SEQUENCE %s OWNED BY %s.id"
+                          % (sequence, table))
+        self._execute("DROP TABLE %s" % legacy)
+        for definition in indexes:
+            self._execute(definition)
+        for name, definition in foreign_keys:
+            self._execute("ALTER TABLE %s ADD CONSTRAINT %s %s"
+                          % (table, name, definition))
+
+    def create_partition(self, table, column, month):
+        """
+        Create the partition of 'month', moving its rows out of the
+        default partition.
+        """
+        name = _partition_name(table, month)
+        if not self.dry_run and name in self.partitions(table):
+            return
+        next_month = _month(month, 1)
+        self.stdout.write("Creating %s" % name)
+        self._execute("CREATE TABLE %s (LIKE %s INCLUDING DEFAULTS)"
+                      % (name, table))
+        self._execute(
+            "WITH moved AS (DELETE FROM %s_default"
+            " WHERE \"%s\" >= %%s AND \"%s\" < %%s RETURNING *)"
+            " INSERT INTO %s SELECT * FROM moved"
+            % (table, column, column, name), [month, next_month])
+        self._execute(
+            "ALTER TABLE %s ATTACH PARTITION %s"
+            " FOR VALUES FROM (%%s) TO (%%s)" % (table, name),
+            [month, next_month])
+
+    def archive(self, table, column, before):
+        """
+        Detach the partitions of months before 'before' and move them to
+        the archive schema (pg_dump and drop them from there).
+        """
+        self._execute("CREATE SCHEMA IF NOT EXISTS %s" % ARCHIVE_SCHEMA)
+        prefix = "%s_p" % table
+        for name in sorted(self.partitions(table)):
+            if not name.startswith(prefix):
+                continue
+            month = _parse_month(name[len(prefix):].replace('_', '-'))
+            if month >= before:
+                continue
+            if table == 'instance_status_history' and self._fetch(
+                    "SELECT 1 FROM %s WHERE end_date IS NULL LIMIT 1"
+                    % name):
+                # The current status of a running instance
+                self.stdout.write("Skipping %s: It has open histories"
+                                  % name)
+                continue
+            self.stdout.write("Archiving %s" % name)
+            self._execute("ALTER TABLE %s DETACH PARTITION %s"
+                          % (table, name))
+            self._execute("ALTER TABLE %s SET SCHEMA %s"
+                          % (name, ARCHIVE_SCHEMA))
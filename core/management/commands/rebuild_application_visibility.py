@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from core.models import ApplicationVisibility
+
+
+class Command(BaseCommand):
+    help = 'Rebuilds the visibility and search text of every application'
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of applications rebuilt at a time")
+
+    def handle(self, *args, **options):
+        total = ApplicationVisibility.rebuild_all(
+            batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Successfully rebuilt visibility for %s applications' % total))
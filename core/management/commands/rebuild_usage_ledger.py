@@ -0,0 +1,52 @@
+from dateutil.parser import parse
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from core.models import InstanceStatusHistory, UsageLedgerEntry
+
+
+def _parse_date(value):
+    date = parse(value)
+    if timezone.is_naive(date):
+        date = timezone.make_aware(date)
+    return date
+
+
+class Command(BaseCommand):
+    help = ('Replays instance status histories and allocation source '
+            'events into the usage ledger for a date range')
+
+    def add_arguments(self, parser):
+        parser.add_argument("--start-date",
+                            help="Replay histories active after this date "
+                                 "(ex: 2016-10-01, Default: the first "
+                                 "history)")
+        parser.add_argument("--end-date",
+                            help="Replay histories active before this date "
+                                 "(Default: now)")
+        parser.add_argument("--users",
+                            help="Limit the rebuild to these usernames "
+                                 "(comma separated)")
+        parser.add_argument("--batch-size", type=int, default=500,
+                            help="Number of histories replayed at a time")
+
+    def handle(self, *args, **options):
+        if options['start_date']:
+            start_date = _parse_date(options['start_date'])
+        else:
+            first = InstanceStatusHistory.objects.order_by(
+                'start_date').first()
+            if not first:
+                self.stdout.write("There are no histories to replay")
+                return
+            start_date = first.start_date
+        end_date = _parse_date(options['end_date']) \
+            if options['end_date'] else timezone.now()
+        if end_date <= start_date:
+            raise CommandError("--end-date must be after --start-date")
+        usernames = options['users'].split(',') if options['users'] else None
+        total = UsageLedgerEntry.rebuild(
+            start_date, end_date, usernames=usernames,
+            batch_size=options['batch_size'], stdout=self.stdout)
+        self.stdout.write(self.style.SUCCESS(
+            'Successfully wrote %s usage ledger entries' % total))
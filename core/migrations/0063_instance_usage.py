@@ -0,0 +1,29 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0062_update_templates_with_cyverse'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='InstanceUsage',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('total_hours', models.FloatField(default=0)),
+                ('burn_rate', models.FloatField(default=0)),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('instance', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='usage', to='core.Instance')),
+            ],
+            options={
+                'db_table': 'instance_usage',
+            },
+        ),
+    ]
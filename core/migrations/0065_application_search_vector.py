@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+def add_search_vector(apps, schema_editor):
+    """
+    PostgreSQL only: the full-text index used by service.search
+    (Weights are refined by 'manage.py rebuild_application_visibility')
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE application ADD COLUMN search_vector tsvector")
+    schema_editor.execute(
+        "UPDATE application SET search_vector = "
+        "setweight(to_tsvector('english', name), 'A') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C') || "
+        "setweight(to_tsvector('english', search_text), 'D')")
+    schema_editor.execute(
+        "CREATE INDEX application_search_vector_idx "
+        "ON application USING gin(search_vector)")
+
+
+def remove_search_vector(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute(
+        "ALTER TABLE application DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0064_application_visibility'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_search_vector, remove_search_vector),
+    ]
@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+import datetime
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0065_application_search_vector'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ApplicationVersionMetric',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('domain', models.CharField(max_length=256)),
+                ('instance_count', models.IntegerField(default=0)),
+                ('total_time', models.DurationField(default=datetime.timedelta(0))),
+                ('updated', models.DateTimeField(default=django.utils.timezone.now)),
+                ('provider', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='core.Provider')),
+                ('version', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='metrics', to='core.ApplicationVersion')),
+            ],
+            options={
+                'db_table': 'application_version_metric',
+            },
+        ),
+        migrations.AlterUniqueTogether(
+            name='applicationversionmetric',
+            unique_together=set([('version', 'provider', 'domain')]),
+        ),
+    ]
@@ -0,0 +1,79 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+# Indexes for the hot InstanceStatusHistory/EventTable queries
+# (See 'manage.py benchmark_history_queries')
+INDEXES = [
+    # Instance.get_last_history, ordered histories of an instance
+    ("instance_status_history_instance_start_idx",
+     "ON instance_status_history (instance_id, start_date)"),
+    # The active history of an instance
+    ("instance_status_history_active_idx",
+     "ON instance_status_history (instance_id) WHERE end_date IS NULL"),
+    # Histories overlapping a time window
+    ("instance_status_history_range_idx",
+     "ON instance_status_history (start_date, end_date)"),
+    ("instance_status_history_end_date_idx",
+     "ON instance_status_history (end_date)"),
+    # Events by name within a time window
+    ("event_table_name_timestamp_idx",
+     "ON event_table (name, timestamp)"),
+    # Events by name for a user (payload__username)
+    ("event_table_name_username_idx",
+     "ON event_table (name, (payload -> 'username'), timestamp)"),
+    # Any other payload__contains lookup
+    ("event_table_payload_idx",
+     "ON event_table USING gin (payload jsonb_path_ops)"),
+]
+
+
+def _is_invalid(connection, name):
+    """
+    True if 'name' was left INVALID by an interrupted CREATE INDEX
+    CONCURRENTLY ('IF NOT EXISTS' would keep it and it is never used).
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT 1 FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid"
+            " WHERE c.relname = %s AND pg_table_is_visible(c.oid)"
+            " AND NOT i.indisvalid", [name])
+        return cursor.fetchone() is not None
+
+
+def create_indexes(apps, schema_editor):
+    """
+    PostgreSQL only: built CONCURRENTLY, writes to these (large) tables
+    are not blocked while each index is built.
+    """
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in INDEXES:
+        if _is_invalid(schema_editor.connection, name):
+            schema_editor.execute("DROP INDEX CONCURRENTLY %s" % name)
+        schema_editor.execute(
+            "CREATE INDEX CONCURRENTLY IF NOT EXISTS %s %s"
+            % (name, definition))
+
+
+def drop_indexes(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for name, definition in INDEXES:
+        schema_editor.execute(
+            "DROP INDEX CONCURRENTLY IF EXISTS %s" % name)
+
+
+class Migration(migrations.Migration):
+    # CREATE INDEX CONCURRENTLY can not run inside a transaction
+    atomic = False
+
+    dependencies = [
+        ('core', '0066_application_version_metric'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_indexes, drop_indexes, atomic=False),
+    ]
@@ -0,0 +1,39 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0067_history_and_event_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='UsageLedgerEntry',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('start_date', models.DateTimeField()),
+                ('end_date', models.DateTimeField()),
+                ('cpu', models.IntegerField()),
+                ('cpu_seconds', models.FloatField()),
+                ('created', models.DateTimeField(default=django.utils.timezone.now)),
+                ('allocation_source', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_ledger', to='core.AllocationSource')),
+                ('history', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usage_ledger', to='core.InstanceStatusHistory')),
+                ('instance', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_ledger', to='core.Instance')),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='usage_ledger', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'db_table': 'usage_ledger',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='usageledgerentry',
+            index_together=set([('user', 'allocation_source', 'start_date'), ('user', 'start_date')]),
+        ),
+    ]
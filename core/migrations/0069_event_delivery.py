@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0068_usage_ledger'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='EventDelivery',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('listener', models.CharField(max_length=128)),
+                ('status', models.CharField(choices=[('pending', 'Pending'), ('delivered', 'Delivered'), ('dead', 'Dead')], default='pending', max_length=16)),
+                ('attempts', models.IntegerField(default=0)),
+                ('next_attempt', models.DateTimeField(default=django.utils.timezone.now)),
+                ('error', models.TextField(blank=True, default='')),
+                ('updated', models.DateTimeField(auto_now=True)),
+                ('event', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.EventTable')),
+            ],
+            options={
+                'db_table': 'event_delivery',
+            },
+        ),
+        migrations.AlterIndexTogether(
+            name='eventdelivery',
+            index_together=set([('status', 'next_attempt')]),
+        ),
+    ]
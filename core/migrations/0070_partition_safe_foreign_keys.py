@@ -0,0 +1,25 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('core', '0069_event_delivery'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='eventdelivery',
+            name='event',
+            field=models.ForeignKey(db_constraint=False, on_delete=django.db.models.deletion.CASCADE, related_name='deliveries', to='core.EventTable'),
+        ),
+        migrations.AlterField(
+            model_name='usageledgerentry',
+            name='history',
+            field=models.ForeignKey(blank=True, db_constraint=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='usage_ledger', to='core.InstanceStatusHistory'),
+        ),
+    ]
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    No-op. The usage ledger is filled after the deploy, outside of
+    'migrate' (replaying every history can take hours):
+        ./manage.py rebuild_usage_ledger
+    then set USE_USAGE_LEDGER = True (See docs/DEPLOY_NOTES.md)
+    """
+
+    dependencies = [
+        ('core', '0070_partition_safe_foreign_keys'),
+    ]
+
+    operations = []
@@ -0,0 +1,20 @@
+# -*- coding: utf-8 -*-
+from __future__ import unicode_literals
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+    """
+    No-op. application_visibility is filled after the deploy, outside of
+    'migrate':
+        ./manage.py rebuild_application_visibility
+    (and hourly by the 'rebuild_application_visibility' task,
+    See docs/DEPLOY_NOTES.md)
+    """
+
+    dependencies = [
+        ('core', '0071_backfill_usage_ledger'),
+    ]
+
+    operations = []
@@ -10,6 +10,7 @@ from core.models.allocation_source import (
         InstanceAllocationSourceSnapshot, AllocationSourceSnapshot)
 from core.models.application import Application, ApplicationMembership,\
     ApplicationScore, ApplicationBookmark, ApplicationThreshold
+from core.models.application_metrics import ApplicationVersionMetric
 from core.models.application_tag import ApplicationTag
 from core.models.application_version import ApplicationVersion, ApplicationVersionMembership
 from core.models.cloud_admin import CloudAdministrator
@@ -33,13 +34,17 @@ from core.models.provider import (
 )
 from core.models.license import LicenseType, License, ApplicationVersionLicense
 from core.models.machine import ProviderMachine, ProviderMachineMembership
+from core.models.application_visibility import ApplicationVisibility
 from core.models.machine_request import MachineRequest
 from core.models.match import PatternMatch, MatchType
 from core.models.maintenance import MaintenanceRecord
 from core.models.instance import Instance
 from core.models.instance_action import InstanceAction
-from core.models.instance_history import InstanceStatus, InstanceStatusHistory
+from core.models.instance_history import (
+    InstanceStatus, InstanceStatusHistory, Timeline, timelines_for)
 from core.models.instance_source import InstanceSource
+from core.models.instance_usage import InstanceUsage
+from core.models.usage_ledger import UsageLedgerEntry
 from core.models.node import NodeController
 from core.models.boot_script import ScriptType, BootScript, ApplicationVersionBootScript
 from core.models.quota import Quota
@@ -53,4 +58,4 @@ from core.models.user import AtmosphereUser
 from core.models.volume import Volume
 from core.models.ssh_key import SSHKey
 
-from core.models.event_table import EventTable
+from core.models.event_table import EventTable, EventDelivery
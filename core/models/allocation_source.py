@@ -1,5 +1,6 @@
 from django.conf import settings
 from django.db import models
+from django.db.models.signals import post_delete, post_save
 from django.utils import timezone
 from threepio import logger
 from pprint import pprint
@@ -56,6 +57,20 @@ class UserAllocationSource(models.Model):
         app_label = 'core'
 
 
+def invalidate_allocation_validation(sender, instance, **kwargs):
+    """
+    Validation plugins may depend on the user's allocation sources
+    (See core.validation)
+    """
+    from core.validation import invalidate_validation
+    invalidate_validation(instance.user)
+
+post_save.connect(invalidate_allocation_validation,
+                  sender=UserAllocationSource)
+post_delete.connect(invalidate_allocation_validation,
+                    sender=UserAllocationSource)
+
+
 class UserAllocationSnapshot(models.Model):
     """
     Fixme: Potential optimization -- user_allocation_source could just store burn_rate and updated?
@@ -108,19 +123,27 @@ class AllocationSourceSnapshot(models.Model):
 def total_usage(username, start_date, allocation_source_name=None,end_date=None, burn_rate=False):
     """ 
         This function outputs the total allocation usage in hours
+        (A sum over the usage ledger when USE_USAGE_LEDGER,
+         See UsageLedgerEntry)
     """
+    from core.models.usage_ledger import UsageLedgerEntry
     from service.allocation_logic import create_report
     if not end_date:
         end_date = timezone.now()
-    user_allocation = create_report(start_date,end_date,user_id=username,allocation_source_name=allocation_source_name)
-    total_allocation = 0.0
-    for data in user_allocation:
-        print data['instance_id'], data['allocation_source'], data['instance_status_start_date'], data['instance_status_end_date'], data['applicable_duration']
-        if not data['allocation_source']=='N/A':
-            total_allocation += data['applicable_duration']
-    compute_used_total = round(total_allocation/3600.0,2)
+    if getattr(settings, 'USE_USAGE_LEDGER', False):
+        compute_used_total, burn_rate_total = UsageLedgerEntry.usage_for(
+            username, start_date, end_date,
+            allocation_source_name=allocation_source_name)
+    else:
+        # Until the ledger has been rebuilt (it only holds new usage)
+        user_allocation = create_report(start_date,end_date,user_id=username,allocation_source_name=allocation_source_name)
+        total_allocation = 0.0
+        for data in user_allocation:
+            if not data['allocation_source']=='N/A':
+                total_allocation += data['applicable_duration']
+        compute_used_total = round(total_allocation/3600.0,2)
+        burn_rate_total = 0 if len(user_allocation)<1 else user_allocation[-1]['burn_rate']
     logger.info("Total usage for User %s with AllocationSource %s from %s-%s = %s" % (username, allocation_source_name, start_date, end_date, compute_used_total))
     if burn_rate:
-        burn_rate_total = 0 if len(user_allocation)<1 else user_allocation[-1]['burn_rate']
         return [compute_used_total, burn_rate_total]
     return compute_used_total
@@ -40,6 +40,9 @@ class Application(models.Model):
     # User/Identity that created the application object
     created_by = models.ForeignKey('AtmosphereUser')
     created_by_identity = models.ForeignKey(Identity, null=True)
+    # Denormalized text used by image search,
+    # see ApplicationVisibility.rebuild_for
+    search_text = models.TextField(default='', blank=True, editable=False)
 
     @property
     def all_versions(self):
@@ -133,31 +136,23 @@ class Application(models.Model):
                 in_provider_list(atmo_user.current_providers, key_override='versions__machines__instance_source__provider'))
         return all_the_images
 
-    def get_metrics(self):
+    def get_metrics(self, fresh=False):
         """
         Aggregate 'all-version' metrics
         More specific metrics can be found at the version level
         """
-        versions = self.versions.all()
-        version_map = {}
-        all_count = 0
-        all_total = timezone.timedelta(0)
-        all_avg = timezone.timedelta(0)
-        all_user_domain_map = {}
-        for version in versions:
-            version_metrics = version.get_metrics()
-            provider_metrics = version_metrics['providers']
-            for key,val in version_metrics['domains'].items():
-                count = all_user_domain_map.get(key,0)
-                count += val
-                all_user_domain_map[key] = count
-            all_avg += sum([prov['avg_time'] for prov in provider_metrics.values()], timezone.timedelta(0))
-            all_total += sum([prov['total'] for prov in provider_metrics.values()], timezone.timedelta(0))
-            all_count += sum([prov['count'] for prov in provider_metrics.values()])
-            version_map[version.name] = version_metrics
+        from core.models.application_metrics import (
+            ApplicationVersionMetric, summarize_metrics)
+        metrics = ApplicationVersionMetric.for_versions(
+            self.versions.values_list('id', flat=True), fresh=fresh)
+        summary = summarize_metrics(metrics)
+        all_count = sum(prov['count'] for prov in summary['providers'].values())
+        all_total = sum([prov['total'] for prov in summary['providers'].values()],
+                        timezone.timedelta(0))
+        all_avg = all_total / all_count if all_count else timezone.timedelta(0)
         return {'versions': {
             'avg_time': all_avg, 'total': all_total,
-            'count': all_count,'domains':all_user_domain_map
+            'count': all_count, 'domains': summary['domains']
             }
         }
 
@@ -0,0 +1,168 @@
+"""
+  Cached launch metrics for application versions.
+"""
+from collections import defaultdict
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, ExpressionWrapper, F, Sum,
+    Value, When)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from threepio import logger
+
+from atmosphere.db_router import use_replica
+
+
+def email_domain(email, unknown_str='unknown'):
+    """
+    'user@example.org' -> 'org'
+    """
+    if not email or '@' not in email:
+        return unknown_str
+    return email.split('@')[1].split('.')[-1:][0]
+
+
+class ApplicationVersionMetric(models.Model):
+    """
+    Instances launched from a version on a provider, by users with an
+    email in 'domain' (See email_domain):
+    instance_count -- Number of instances
+    total_time -- Time the instances ran (until 'updated' if still running)
+
+    Refreshed nightly by the 'refresh_application_metrics' task,
+    see ApplicationVersion.get_metrics
+    """
+    version = models.ForeignKey("ApplicationVersion", related_name="metrics")
+    provider = models.ForeignKey("Provider")
+    domain = models.CharField(max_length=256)
+    instance_count = models.IntegerField(default=0)
+    total_time = models.DurationField(default=timedelta(0))
+    updated = models.DateTimeField(default=timezone.now)
+
+    @classmethod
+    def calculate(cls, version_ids, now_time=None):
+        """
+        Aggregate the instances of 'version_ids' in the database.
+        Returns a list of (unsaved) metrics.
+        """
+        from core.models.instance import Instance
+        if not now_time:
+            now_time = timezone.now()
+        run_time = ExpressionWrapper(
+            Coalesce('end_date', Value(now_time, output_field=DateTimeField()))
+            - F('start_date'), output_field=DurationField())
+        rows = Instance.objects.filter(
+            source__providermachine__application_version__id__in=version_ids
+        ).order_by().values(
+            'source__providermachine__application_version',
+            'source__provider', 'created_by__email'
+        ).annotate(
+            instance_count=Count('id'),
+            # Guarantee positive results
+            total_time=Sum(Case(
+                When(end_date__lt=F('start_date'),
+                     then=Value(timedelta(0), output_field=DurationField())),
+                default=run_time, output_field=DurationField())))
+        # Emails are folded into their domain here.
+        metrics = {}
+        for row in rows:
+            key = (row['source__providermachine__application_version'],
+                   row['source__provider'],
+                   email_domain(row['created_by__email']))
+            metric = metrics.get(key)
+            if not metric:
+                metric = metrics[key] = cls(
+                    version_id=key[0], provider_id=key[1], domain=key[2],
+                    updated=now_time)
+            metric.instance_count += row['instance_count']
+            metric.total_time += row['total_time'] or timedelta(0)
+        return metrics.values()
+
+    @classmethod
+    def refresh(cls, version_ids, now_time=None):
+        """
+        Replace the saved metrics of 'version_ids'
+        """
+        version_ids = list(version_ids)
+        metrics = cls.calculate(version_ids, now_time)
+        with transaction.atomic():
+            cls.objects.filter(version__id__in=version_ids).delete()
+            cls.objects.bulk_create(metrics)
+        return metrics
+
+    @classmethod
+    def refresh_all(cls, batch_size=500):
+        """
+        Refresh every version that has been launched.
+        Returns the number of versions refreshed.
+        """
+        from core.models.application_version import ApplicationVersion
+        now_time = timezone.now()
+        version_ids = list(ApplicationVersion.objects.filter(
+            machines__instance_source__instances__isnull=False
+        ).order_by().values_list('id', flat=True).distinct())
+        for idx in xrange(0, len(version_ids), batch_size):
+            cls.refresh(version_ids[idx:idx + batch_size], now_time)
+        logger.info("Refreshed metrics for %s application versions"
+                    % len(version_ids))
+        return len(version_ids)
+
+    @classmethod
+    def for_versions(cls, version_ids, fresh=False, now_time=None):
+        """
+        Return the metrics of 'version_ids', using the saved metrics when
+        available and aggregating the rest.
+        fresh=True -- Always aggregate (Does not save the result)
+        """
+        from core.models.provider import Provider
+        version_ids = set(version_ids)
+        metrics = []
+        if not fresh:
+            metrics = list(cls.objects.filter(
+                version__id__in=version_ids).select_related('provider'))
+            version_ids -= set(metric.version_id for metric in metrics)
+        if version_ids:
+            with use_replica():
+                calculated = cls.calculate(version_ids, now_time)
+            providers = Provider.objects.in_bulk(
+                set(metric.provider_id for metric in calculated))
+            for metric in calculated:
+                metric.provider = providers[metric.provider_id]
+            metrics.extend(calculated)
+        return metrics
+
+    def __unicode__(self):
+        return "%s on %s (%s): %s instances, %s" % (
+            self.version_id, self.provider_id, self.domain,
+            self.instance_count, self.total_time)
+
+    class Meta:
+        db_table = "application_version_metric"
+        app_label = "core"
+        unique_together = ('version', 'provider', 'domain')
+
+
+def summarize_metrics(metrics):
+    """
+    Combine 'metrics' into:
+    {'domains': {domain: count, ...},
+     'providers': {location: {'count', 'total', 'avg_time'}, ...}}
+    """
+    domains = defaultdict(int)
+    providers = {}
+    for metric in metrics:
+        domains[metric.domain] += metric.instance_count
+        summary = providers.setdefault(metric.provider.location, {
+            'count': 0, 'total': timedelta(0)})
+        summary['count'] += metric.instance_count
+        summary['total'] += metric.total_time
+    for summary in providers.values():
+        summary['avg_time'] = summary['total'] / summary['count'] \
+            if summary['count'] else timedelta(0)
+    return {
+        'domains': dict(domains),
+        'providers': providers
+    }
@@ -0,0 +1,301 @@
+"""
+  Precomputed image (application) visibility for atmosphere.
+"""
+from collections import defaultdict
+
+from django.db import models, transaction
+from django.db.models import Q
+from django.db.models.signals import post_save, post_delete, m2m_changed
+from django.contrib.auth.models import AnonymousUser
+from django.utils import timezone
+
+from threepio import logger
+
+from core.models.application import Application
+from core.models.application_version import (
+    ApplicationVersion, ApplicationVersionMembership)
+from core.models.instance_source import InstanceSource
+from core.models.machine import ProviderMachine, ProviderMachineMembership
+from core.models.provider import Provider
+from core.models.tag import Tag
+
+
+class ApplicationVisibility(models.Model):
+    """
+    Who can see an application on a provider.
+
+    One row per (application, provider) with a machine, for each of:
+    * Everyone -- group and user are empty, is_public is set when the
+      application is not private. (Also used for staff)
+    * The owner -- user is the application's created_by
+    * Each group sharing a machine or version of the application
+
+    is_current -- The application, a version and a machine on the
+      provider are in range and the provider is active
+      (See core.query.only_current_apps)
+    is_active -- The application itself is in range
+
+    Rebuilt for an application whenever its memberships, privacy,
+    versions or machines change (See the signals below),
+    and for every application by the 'rebuild_application_visibility' task.
+    """
+    application = models.ForeignKey(Application, related_name="visibility")
+    provider = models.ForeignKey(Provider)
+    group = models.ForeignKey("Group", null=True, blank=True)
+    user = models.ForeignKey("AtmosphereUser", null=True, blank=True)
+    is_public = models.BooleanField(default=False)
+    is_current = models.BooleanField(default=False)
+    is_active = models.BooleanField(default=False)
+
+    @classmethod
+    def applications_for(cls, atmo_user=None):
+        """
+        The visible applications for 'atmo_user'
+        Equivalent to Application.current_apps, as a single indexed query.
+        """
+        if not atmo_user or isinstance(atmo_user, AnonymousUser):
+            visible = cls.objects.filter(is_public=True, is_current=True)
+        else:
+            query = Q(is_current=True) & (
+                Q(is_public=True) | Q(group__id__in=atmo_user.group_ids())
+            ) | Q(user=atmo_user)
+            if atmo_user.is_staff:
+                query |= Q(is_active=True,
+                           provider__id__in=atmo_user.provider_ids())
+            visible = cls.objects.filter(
+                query, provider__in=atmo_user.current_providers)
+        return Application.objects.filter(
+            id__in=visible.values('application_id'))
+
+    @classmethod
+    def rebuild_for(cls, application_ids, now_time=None):
+        """
+        Recalculate the visibility (and search text/vector) of
+        'application_ids'
+        """
+        application_ids = set(application_ids)
+        if not application_ids:
+            return 0
+        if not now_time:
+            now_time = timezone.now()
+
+        def _in_range(start_date, end_date):
+            return start_date < now_time and (
+                not end_date or end_date > now_time)
+
+        applications = {
+            app.id: app for app in Application.objects.filter(
+                id__in=application_ids).select_related('created_by')}
+        machines = ProviderMachine.objects.filter(
+            application_version__application__id__in=applications
+        ).values_list(
+            'id', 'application_version__application', 'application_version',
+            'application_version__start_date', 'application_version__end_date',
+            'instance_source__start_date', 'instance_source__end_date',
+            'instance_source__identifier',
+            'instance_source__provider', 'instance_source__provider__active',
+            'instance_source__provider__end_date',
+            'instance_source__provider__location')
+        # (application_id, provider_id) -> is_current
+        app_providers = {}
+        machine_keys = {}
+        version_apps = {}
+        # application_id -> search weight -> terms
+        search_terms = defaultdict(lambda: defaultdict(set))
+        for (machine_id, app_id, version_id, version_start, version_end,
+             source_start, source_end, identifier, provider_id,
+             provider_active, provider_end, location) in machines:
+            key = (app_id, provider_id)
+            machine_keys[machine_id] = key
+            version_apps[version_id] = app_id
+            search_terms[app_id]['D'].update([identifier, location])
+            is_current = (
+                _in_range(applications[app_id].start_date,
+                          applications[app_id].end_date) and
+                _in_range(version_start, version_end) and
+                _in_range(source_start, source_end) and
+                provider_active and
+                (not provider_end or provider_end > now_time))
+            app_providers[key] = app_providers.get(key, False) or is_current
+
+        # (application_id, provider_id) -> set of group ids
+        shared_groups = defaultdict(set)
+        for machine_id, group_id in ProviderMachineMembership.objects.filter(
+                provider_machine__id__in=machine_keys
+        ).values_list('provider_machine', 'group'):
+            shared_groups[machine_keys[machine_id]].add(group_id)
+        app_groups = defaultdict(set)
+        for version_id, group_id in ApplicationVersionMembership.objects.filter(
+                image_version__application__id__in=applications
+        ).values_list('image_version', 'group'):
+            app_groups[version_apps.get(version_id)].add(group_id)
+
+        rows = []
+        for (app_id, provider_id), is_current in app_providers.items():
+            app = applications[app_id]
+            is_active = _in_range(app.start_date, app.end_date)
+            values = dict(application_id=app_id, provider_id=provider_id,
+                          is_current=is_current, is_active=is_active)
+            rows.append(cls(is_public=not app.private, **values))
+            rows.append(cls(user_id=app.created_by_id, **values))
+            group_ids = shared_groups[(app_id, provider_id)] | \
+                app_groups[app_id]
+            for group_id in group_ids:
+                rows.append(cls(group_id=group_id, **values))
+
+        for app_id, change_log in ApplicationVersion.objects.filter(
+                application__id__in=applications
+        ).values_list('application', 'change_log'):
+            search_terms[app_id]['C'].add(change_log)
+        for app_id, name, description in Application.tags.through.objects.filter(
+                application__id__in=applications
+        ).values_list('application', 'tag__name', 'tag__description'):
+            search_terms[app_id]['B'].update([name, description])
+
+        documents = {}
+        for app in applications.values():
+            terms = search_terms[app.id]
+            terms['A'].add(app.name)
+            terms['C'].add(app.description)
+            terms['D'].update([str(app.id), app.created_by.username])
+            documents[app.id] = {
+                weight: " ".join(sorted(term for term in terms[weight] if term))
+                for weight in "ABCD"}
+
+        from service.search import update_search_vectors
+        with transaction.atomic():
+            cls.objects.filter(application__id__in=application_ids).delete()
+            cls.objects.bulk_create(rows)
+            for app_id, document in documents.items():
+                Application.objects.filter(id=app_id).update(
+                    search_text=" ".join(
+                        document[weight] for weight in "ABCD"))
+            update_search_vectors(documents)
+        return len(rows)
+
+    @classmethod
+    def rebuild_all(cls, batch_size=500, stdout=None):
+        """
+        Rebuild every application, 'batch_size' applications at a time.
+        Returns the number of applications rebuilt.
+        """
+        application_ids = list(Application.objects.order_by(
+            'id').values_list('id', flat=True))
+        now_time = timezone.now()
+        for idx in xrange(0, len(application_ids), batch_size):
+            cls.rebuild_for(application_ids[idx:idx + batch_size], now_time)
+            if stdout:
+                stdout.write("Rebuilt visibility for %s/%s applications"
+                             % (min(idx + batch_size, len(application_ids)),
+                                len(application_ids)))
+        # Applications that were deleted
+        cls.objects.exclude(application__id__in=application_ids).delete()
+        return len(application_ids)
+
+    def __unicode__(self):
+        audience = self.group_id or self.user_id or (
+            "public" if self.is_public else "staff")
+        return "%s on %s: %s" % (
+            self.application_id, self.provider_id, audience)
+
+    class Meta:
+        db_table = "application_visibility"
+        app_label = "core"
+        index_together = [
+            ("provider", "is_public", "is_current"),
+        ]
+
+
+def rebuild_visibility_on_commit(application_ids):
+    """
+    Rebuild once the current transaction commits, so that a batch of
+    changes to the same application is not rebuilt mid-way.
+    """
+    application_ids = set(app_id for app_id in application_ids if app_id)
+    if not application_ids:
+        return
+
+    def _rebuild():
+        try:
+            ApplicationVisibility.rebuild_for(application_ids)
+        except Exception:
+            logger.exception("Could not rebuild visibility for applications"
+                             " %s" % application_ids)
+    transaction.on_commit(_rebuild)
+
+
+def _application_changed(sender, instance, **kwargs):
+    rebuild_visibility_on_commit([instance.id])
+
+
+def _version_changed(sender, instance, **kwargs):
+    rebuild_visibility_on_commit([instance.application_id])
+
+
+def _version_membership_changed(sender, instance, **kwargs):
+    rebuild_visibility_on_commit([instance.image_version.application_id])
+
+
+def _machine_changed(sender, instance, **kwargs):
+    if instance.application_version_id:
+        rebuild_visibility_on_commit(
+            [instance.application_version.application_id])
+
+
+def _machine_membership_changed(sender, instance, **kwargs):
+    _machine_changed(sender, instance.provider_machine)
+
+
+def _source_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    rebuild_visibility_on_commit(ProviderMachine.objects.filter(
+        instance_source=instance).values_list(
+            'application_version__application', flat=True))
+
+
+def _provider_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    rebuild_visibility_on_commit(ProviderMachine.objects.filter(
+        instance_source__provider=instance).values_list(
+            'application_version__application', flat=True).distinct())
+
+
+def _tag_changed(sender, instance, created=False, **kwargs):
+    if created:
+        return
+    rebuild_visibility_on_commit(instance.application_set.values_list(
+        'id', flat=True))
+
+
+def _application_tags_changed(sender, instance, action, pk_set=None,
+                              **kwargs):
+    if isinstance(instance, Application):
+        if action in ("post_add", "post_remove", "post_clear"):
+            rebuild_visibility_on_commit([instance.id])
+    elif action == "pre_clear":
+        # The tag's applications are unknown once cleared.
+        _tag_changed(sender, instance)
+    elif action in ("post_add", "post_remove"):
+        rebuild_visibility_on_commit(pk_set or [])
+
+
+post_save.connect(_application_changed, sender=Application)
+post_save.connect(_version_changed, sender=ApplicationVersion)
+post_delete.connect(_version_changed, sender=ApplicationVersion)
+post_save.connect(_version_membership_changed,
+                  sender=ApplicationVersionMembership)
+post_delete.connect(_version_membership_changed,
+                    sender=ApplicationVersionMembership)
+post_save.connect(_machine_changed, sender=ProviderMachine)
+post_delete.connect(_machine_changed, sender=ProviderMachine)
+post_save.connect(_machine_membership_changed,
+                  sender=ProviderMachineMembership)
+post_delete.connect(_machine_membership_changed,
+                    sender=ProviderMachineMembership)
+post_save.connect(_source_changed, sender=InstanceSource)
+post_save.connect(_provider_changed, sender=Provider)
+post_save.connect(_tag_changed, sender=Tag)
+m2m_changed.connect(_application_tags_changed,
+                    sender=Application.tags.through)
@@ -14,7 +14,8 @@ from core.hooks.allocation_source import (
     listen_for_user_snapshot_changes,
     listen_for_allocation_threshold_met,
     listen_for_allocation_overage,
-    listen_for_instance_allocation_changes
+    listen_for_instance_allocation_changes,
+    listen_for_instance_usage_changes
 )
 
 
@@ -42,24 +43,98 @@ class EventTable(models.Model):
         return "%s" % self.name
 
     class Meta:
+        # Hot query indexes: core/migrations/0067_history_and_event_indexes.py
+        # Optionally partitioned by month: 'manage.py partition_tables'
+        # Once partitioned, uuid is only unique per (uuid, timestamp)
+        # and a save/update by id probes every partition.
         db_table = "event_table"
         app_label = "core"
 
 
+class EventDelivery(models.Model):
+
+    """
+    A listener that has yet to run (or ran) for an event, See service.event_bus
+    """
+    PENDING = 'pending'
+    DELIVERED = 'delivered'
+    DEAD = 'dead'
+    STATUS_CHOICES = (
+        (PENDING, 'Pending'),
+        (DELIVERED, 'Delivered'),
+        (DEAD, 'Dead'),
+    )
+
+    # No database constraint: event_table may be partitioned
+    # (See 'manage.py partition_tables')
+    event = models.ForeignKey(
+        EventTable, related_name="deliveries", db_constraint=False)
+    listener = models.CharField(max_length=128)
+    status = models.CharField(
+        max_length=16, choices=STATUS_CHOICES, default=PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt = models.DateTimeField(default=timezone.now)
+    error = models.TextField(blank=True, default='')
+    updated = models.DateTimeField(auto_now=True)
+
+    @classmethod
+    def requeue_dead(cls, **filters):
+        """
+        Give 'dead' deliveries (matching filters) another set of attempts.
+        Returns the entity_ids to dispatch.
+        """
+        dead = cls.objects.filter(status=cls.DEAD, **filters)
+        entity_ids = set(dead.values_list('event__entity_id', flat=True))
+        dead.update(status=cls.PENDING, attempts=0,
+                    next_attempt=timezone.now())
+        return entity_ids
+
+    def __unicode__(self):
+        return "%s -> %s (%s, %s attempts)" % (
+            self.event_id, self.listener, self.status, self.attempts)
+
+    class Meta:
+        db_table = "event_delivery"
+        app_label = "core"
+        index_together = [("status", "next_attempt")]
+
+
+# (event name, listener) in the order they run, See service.event_bus
+EVENT_LISTENERS = [
+    ('allocation_source_snapshot', listen_before_allocation_snapshot_changes),
+    ('allocation_source_snapshot', listen_for_allocation_overage),
+    ('allocation_source_threshold_met', listen_for_allocation_threshold_met),
+    ('instance_allocation_source_changed',
+     listen_for_instance_allocation_changes),
+    ('instance_allocation_source_changed', listen_for_instance_usage_changes),
+    ('allocation_source_snapshot', listen_for_allocation_snapshot_changes),
+    ('user_allocation_snapshot_changed', listen_for_user_snapshot_changes),
+]
+
+
+def get_listener(name):
+    for _, listener in EVENT_LISTENERS:
+        if listener.__name__ == name:
+            return listener
+    return None
+
+
+def listeners_for(event_name):
+    return [listener for name, listener in EVENT_LISTENERS
+            if name == event_name]
+
+
 # Save hooks
 def listen_for_changes(sender, instance, created, **kwargs):
     """
     Ideally, this would be the master listener. On each save, it could contact all listeners and send them the payload.
 
-    For now, it will do nothing.
+    Listeners are dispatched by the event bus (See service.event_bus)
     """
-    return None
+    if not created or kwargs.get('raw'):
+        return None
+    from service.event_bus import publish_event
+    publish_event(instance)
 
 # Instantiate the hooks:
-post_save.connect(listen_before_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_allocation_overage, sender=EventTable)
-#post_save.connect(listen_for_changes, sender=EventTable)
-post_save.connect(listen_for_allocation_threshold_met, sender=EventTable)
-post_save.connect(listen_for_instance_allocation_changes, sender=EventTable)
-post_save.connect(listen_for_allocation_snapshot_changes, sender=EventTable)
-post_save.connect(listen_for_user_snapshot_changes, sender=EventTable)
+post_save.connect(listen_for_changes, sender=EventTable)
@@ -55,7 +55,7 @@ class Identity(models.Model):
         Depending on the ProviderType, appropriately
         generate 'export data' into an appropriate source-file
         """
-        provider_type = self.provider.type.name
+        provider_type = self.provider.get_type_name()
         if provider_type.lower() == 'openstack':
             from service.accounts.openstack_manager import AccountDriver
             return AccountDriver.generate_openrc(self, filename)
@@ -66,7 +66,7 @@ class Identity(models.Model):
         Depending on the ProviderType, appropriately
         generate 'export data', a dict.
         """
-        provider_type = self.provider.type.name
+        provider_type = self.provider.get_type_name()
         if provider_type.lower() == 'openstack':
             from service.accounts.openstack_manager import AccountDriver
             return AccountDriver.export_identity(self)
@@ -367,10 +367,11 @@ class Identity(models.Model):
         total_au = allocation_result.total_runtime().total_seconds() / 3600.0
         return total_au
 
-    def get_allocation_usage(self):
+    def get_allocation_usage(self, allocation_result=None):
         # Undoubtedly will cause circular dependencies
         from service.monitoring import _get_allocation_result
-        allocation_result = _get_allocation_result(self)
+        if not allocation_result:
+            allocation_result = _get_allocation_result(self)
         over_allocation, diff_amount = allocation_result.total_difference()
         burn_time = allocation_result.get_burn_rate()
         # Moving from seconds to hours
@@ -1,6 +1,7 @@
 """
   Instance model for atmosphere.
 """
+from collections import defaultdict
 from hashlib import md5
 from datetime import datetime, timedelta
 
@@ -32,6 +33,13 @@ from core.models.tag import Tag
 from core.models.managers import ActiveInstancesManager
 from atmosphere import settings
 
+# Correlated subquery selecting the newest InstanceStatusHistory.
+LAST_HISTORY_SQL = (
+    "SELECT history.id FROM instance_status_history history "
+    "WHERE history.instance_id = instance.id "
+    "ORDER BY history.start_date DESC LIMIT 1")
+
+
 class Instance(models.Model):
     """
     When a user launches a machine, an Instance is created.
@@ -83,8 +91,22 @@ class Instance(models.Model):
         qs = Instance.objects.filter(created_by_identity__in=identity_ids)
         return qs
 
+    @classmethod
+    def with_last_history(cls, queryset):
+        """
+        Annotate each instance in 'queryset' with 'last_history_id'
+        See also: prefetch_last_history
+        """
+        return queryset.extra(select={'last_history_id': LAST_HISTORY_SQL})
+
     def get_total_hours(self):
         from service.monitoring import _get_allocation_result
+        if getattr(self, '_total_hours', None) is not None:
+            return self._total_hours
+        try:
+            return self.usage.current_hours()
+        except ObjectDoesNotExist:
+            pass
         identity = self.created_by_identity
         limit_instances = [self.provider_alias]
         result = _get_allocation_result(
@@ -115,6 +137,14 @@ class Instance(models.Model):
         except ObjectDoesNotExist:
             return None
 
+    def timeline(self):
+        """
+        Returns the Timeline of every InstanceStatusHistory (one query)
+        Use core.models.instance_history.timelines_for for many instances.
+        """
+        from core.models.instance_history import timelines_for
+        return timelines_for([self])[self.id]
+
     def get_last_history(self):
         """
         Returns the newest InstanceStatusHistory
@@ -124,6 +154,8 @@ class Instance(models.Model):
         # except InstanceStatusHistory.DoesNotExist:
         # TODO: Profile current choice
 	#FIXME: Move this call so that it happens inside InstanceStatusHistory to avoid circ.dep.
+        if getattr(self, '_last_history', None):
+            return self._last_history
         last_history = self.instancestatushistory_set.order_by(
             '-start_date').first()
         if last_history:
@@ -511,6 +543,84 @@ class Instance(models.Model):
 """
 Useful utility methods for the Core Model..
 """
+
+
+def prefetch_last_history(instances):
+    """
+    Load the newest InstanceStatusHistory (and its status and size)
+    of every instance in 'instances' with a single query.
+    Instances must come from a queryset using Instance.with_last_history
+    """
+    from core.models.instance_history import InstanceStatusHistory
+    history_ids = [getattr(instance, 'last_history_id', None)
+                   for instance in instances]
+    history_ids = [history_id for history_id in history_ids if history_id]
+    if not history_ids:
+        return instances
+    histories = InstanceStatusHistory.objects.filter(
+        id__in=history_ids).select_related('status', 'size')
+    history_map = {history.id: history for history in histories}
+    for instance in instances:
+        instance._last_history = history_map.get(
+            getattr(instance, 'last_history_id', None))
+    return instances
+
+
+def calculate_usage(instances):
+    """
+    Run the allocation engine once per identity (instead of once per
+    instance) for every instance in 'instances'.
+    Returns a dict of provider_alias -> (total_hours, burn_rate)
+    burn_rate -- Hours used per hour in the current time period
+    """
+    from service.monitoring import _get_allocation_result
+    identity_instances = {}
+    for instance in instances:
+        identity = instance.created_by_identity
+        if not identity:
+            continue
+        identity_instances.setdefault(
+            identity.id, (identity, []))[1].append(instance)
+    usage_map = {}
+    for identity, core_instances in identity_instances.values():
+        result = _get_allocation_result(
+            identity,
+            limit_instances=[inst.provider_alias for inst in core_instances])
+        runtimes = defaultdict(timedelta)
+        burn_rates = {}
+        for period in result.time_periods:
+            for instance_result in period.instance_results:
+                runtimes[instance_result.identifier] +=\
+                    instance_result.total_runtime()
+        if result.time_periods:
+            for instance_result in result.time_periods[-1].instance_results:
+                burn_rates[instance_result.identifier] =\
+                    instance_result.get_burn_rate().total_seconds()
+        for instance in core_instances:
+            alias = instance.provider_alias
+            total_hours = runtimes[alias].total_seconds()/3600.0
+            usage_map[alias] = (
+                round(total_hours, 2), burn_rates.get(alias, 0.0))
+    return usage_map
+
+
+def prefetch_total_hours(instances):
+    """
+    Set 'get_total_hours' for every instance in 'instances' that has no
+    InstanceUsage, with a single allocation engine run per identity.
+    """
+    missing = []
+    for instance in instances:
+        try:
+            instance._total_hours = instance.usage.current_hours()
+        except ObjectDoesNotExist:
+            missing.append(instance)
+    usage_map = calculate_usage(missing)
+    for instance in missing:
+        instance._total_hours = usage_map.get(
+            instance.provider_alias, (0.0, 0.0))[0]
+    return instances
+
 OPENSTACK_TASK_STATUS_MAP = {
     # Terminate tasks
     # Suspend tasks
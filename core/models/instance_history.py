@@ -6,10 +6,13 @@ from datetime import timedelta
 
 from django.db import models, transaction, DatabaseError
 from django.db.models import ObjectDoesNotExist
+from django.db.models.signals import post_save, post_delete
 from django.utils import timezone
 
 from threepio import logger
 
+from core.models.lookup_cache import LookupCache
+
 
 class InstanceStatus(models.Model):
 
@@ -27,6 +30,9 @@ class InstanceStatus(models.Model):
         app_label = "core"
 
 
+instance_status_cache = LookupCache(InstanceStatus)
+
+
 class InstanceStatusHistory(models.Model):
 
     """
@@ -58,20 +64,33 @@ class InstanceStatusHistory(models.Model):
     def previous(self):
         """
         Given that you are a node on a linked-list, traverse yourself backwards
+        (Without a query, when loaded by a Timeline)
         """
+        if getattr(self, '_timeline', None):
+            if not self._previous:
+                raise LookupError("This is the first state of instance %s" % self.instance)
+            return self._previous
         if self.instance.start_date == self.start_date:
             raise LookupError("This is the first state of instance %s" % self.instance)
         try:
-            history = self.instance.instancestatushistory_set.get(start_date=self.end_date)
+            history = self.instance.instancestatushistory_set.get(end_date=self.start_date)
             if history.id == self.id:
-                raise ValueError("There was no matching transaction for Instance:%s end-date:%s" % (self.instance, self.end_date))
+                raise ValueError("There was no matching transaction for Instance:%s start-date:%s" % (self.instance, self.start_date))
+            return history
         except ObjectDoesNotExist:
-            raise ValueError("There was no matching transaction for Instance:%s end-date:%s" % (self.instance, self.end_date))
+            raise ValueError("There was no matching transaction for Instance:%s start-date:%s" % (self.instance, self.start_date))
 
     def next(self):
         """
         Given that you are a node on a linked-list, traverse yourself forwards
+        (Without a query, when loaded by a Timeline)
         """
+        if getattr(self, '_timeline', None):
+            if not self._next:
+                if not self.end_date and self.instance.end_date:
+                    raise ValueError("Whoa! The instance %s has been terminated, but status %s has not! This could leak time" % (self.instance,self))
+                raise LookupError("This is the final state of instance %s" % self.instance)
+            return self._next
         # In this situation, the instance is presumably still running.
         if not self.end_date:
             if self.instance.end_date:
@@ -130,7 +149,7 @@ class InstanceStatusHistory(models.Model):
         """
         Creates a new (Unsaved!) InstanceStatusHistory
         """
-        status, _ = InstanceStatus.objects.get_or_create(name=status_name)
+        status = instance_status_cache.get(status_name)
         new_history = InstanceStatusHistory(
             instance=instance, size=size, status=status, activity=activity)
         if start_date:
@@ -209,5 +228,164 @@ class InstanceStatusHistory(models.Model):
             return False
 
     class Meta:
+        # Hot query indexes: core/migrations/0067_history_and_event_indexes.py
+        # Optionally partitioned by month: 'manage.py partition_tables'
+        # Once partitioned, uuid is only unique per (uuid, start_date)
+        # and a save/update by id probes every partition.
         db_table = "instance_status_history"
         app_label = "core"
+
+
+class Timeline(object):
+    """
+    The histories of an instance, in order, linked in memory.
+    See timelines_for / Instance.timeline
+
+    timeline.first, timeline.last -- The first and latest history
+    history.previous(), history.next() -- Traverse without queries
+    """
+
+    def __init__(self, instance, histories):
+        self.instance = instance
+        self.histories = list(histories)
+        previous = None
+        for history in self.histories:
+            # Avoid a query for every 'history.instance'
+            history.instance = instance
+            history._timeline = self
+            history._previous = previous
+            history._next = None
+            if previous:
+                previous._next = history
+            previous = history
+
+    def __iter__(self):
+        return iter(self.histories)
+
+    def __len__(self):
+        return len(self.histories)
+
+    def __nonzero__(self):
+        return bool(self.histories)
+
+    @property
+    def first(self):
+        return self.histories[0] if self.histories else None
+
+    @property
+    def last(self):
+        return self.histories[-1] if self.histories else None
+
+    def pairs(self):
+        """
+        [(history, next_history), ...]
+        """
+        return zip(self.histories, self.histories[1:])
+
+    def gaps(self):
+        """
+        [(history, next_history), ...] where time is missing between
+        the end of 'history' and the start of 'next_history'
+        """
+        return [(history, next_history)
+                for history, next_history in self.pairs()
+                if history.end_date
+                and history.end_date < next_history.start_date]
+
+    def overlaps(self):
+        """
+        [(history, next_history), ...] where 'history' ends after (or never
+        ends before) 'next_history' starts
+        """
+        return [(history, next_history)
+                for history, next_history in self.pairs()
+                if not history.end_date
+                or history.end_date > next_history.start_date]
+
+    def open_histories(self):
+        """
+        Histories without an end_date (Only the last should be open)
+        """
+        return [history for history in self.histories if not history.end_date]
+
+    def between(self, start_date=None, end_date=None):
+        """
+        Histories that overlap the window start_date-end_date
+        """
+        return [history for history in self.histories
+                if (not end_date or history.start_date < end_date)
+                and (not start_date or not history.end_date
+                     or history.end_date > start_date)]
+
+    def __repr__(self):
+        return "<Timeline: %s Histories:%s>" % (
+            self.instance, len(self.histories))
+
+
+def timelines_for(instances):
+    """
+    Return {instance.id: Timeline} for 'instances', loading every history
+    in a single ordered query.
+    """
+    instances = list(instances)
+    by_instance = dict((instance.id, []) for instance in instances)
+    histories = InstanceStatusHistory.objects.filter(
+        instance__in=instances).select_related('status', 'size')\
+        .order_by('instance_id', 'start_date', 'id')
+    for history in histories:
+        by_instance[history.instance_id].append(history)
+    return dict((instance.id, Timeline(instance, by_instance[instance.id]))
+                for instance in instances)
+
+
+def invalidate_allocation_usage(sender, instance, **kwargs):
+    """
+    Drop the cached allocation usage of the identity that owns
+    the instance whose history changed.
+    """
+    from service.cache import invalidate_allocation_usage as _invalidate
+    identity_id = instance.instance.created_by_identity_id
+    if identity_id:
+        _invalidate(identity_id)
+
+
+def update_instance_usage(sender, instance, created, **kwargs):
+    """
+    Keep InstanceUsage current when an instance changes status
+    (a new history is created) or is end-dated.
+    The allocation engine runs in the 'update_instance_usage' task, once
+    the history is committed ('rollup_instance_usage' corrects any miss).
+    """
+    core_instance = instance.instance
+    if not created and not core_instance.end_date:
+        return
+    instance_id = core_instance.id
+
+    def _publish():
+        from core.tasks import update_instance_usage as update_usage_task
+        try:
+            update_usage_task.apply_async(args=[[instance_id]])
+        except Exception:
+            logger.exception(
+                "Could not schedule a usage update for instance %s"
+                % instance_id)
+    transaction.on_commit(_publish)
+
+def record_usage_ledger(sender, instance, created, raw=False, **kwargs):
+    """
+    Append the usage of a history to the ledger once it ends.
+    """
+    from core.models.usage_ledger import UsageLedgerEntry
+    if raw or not instance.end_date:
+        return
+    try:
+        with transaction.atomic():
+            UsageLedgerEntry.record(instance)
+    except Exception:
+        logger.exception(
+            "Could not record usage for history %s" % instance.id)
+
+post_save.connect(invalidate_allocation_usage, sender=InstanceStatusHistory)
+post_save.connect(update_instance_usage, sender=InstanceStatusHistory)
+post_save.connect(record_usage_ledger, sender=InstanceStatusHistory)
+post_delete.connect(invalidate_allocation_usage, sender=InstanceStatusHistory)
@@ -0,0 +1,104 @@
+"""
+  Denormalized instance usage for atmosphere.
+"""
+from datetime import timedelta
+
+from django.db import models, IntegrityError, transaction
+from django.utils import timezone
+
+from threepio import logger
+
+
+class InstanceUsage(models.Model):
+    """
+    The allocation engine's result for a single instance, saved so that
+    API responses can read usage as a column.
+
+    total_hours -- Hours used (after rules) as of 'updated'
+    burn_rate -- Hours used per hour while the current status lasts
+    Updated when the instance's status history changes, and
+    periodically by the 'rollup_instance_usage' task.
+    """
+    instance = models.OneToOneField("Instance", related_name="usage")
+    total_hours = models.FloatField(default=0)
+    burn_rate = models.FloatField(default=0)
+    updated = models.DateTimeField(default=timezone.now)
+
+    def current_hours(self, now_time=None):
+        if not now_time:
+            now_time = timezone.now()
+        elapsed = max(now_time - self.updated, timedelta(0))
+        hours = self.total_hours +\
+            self.burn_rate * elapsed.total_seconds() / 3600.0
+        return round(hours, 2)
+
+    @classmethod
+    def update_for(cls, instances):
+        """
+        Recalculate (and save) usage for every instance in 'instances'.
+        Returns the number of instances updated.
+        """
+        from core.models.instance import calculate_usage
+        instances = list(instances)
+        if not instances:
+            return 0
+        now_time = timezone.now()
+        usage_map = calculate_usage(instances)
+        existing = {
+            usage.instance_id: usage
+            for usage in cls.objects.filter(instance__in=instances)}
+        new_usage = []
+        for instance in instances:
+            total_hours, burn_rate = usage_map.get(
+                instance.provider_alias, (0.0, 0.0))
+            usage = existing.get(instance.id)
+            if not usage:
+                new_usage.append(cls(
+                    instance=instance, total_hours=total_hours,
+                    burn_rate=burn_rate, updated=now_time))
+                continue
+            cls.objects.filter(id=usage.id).update(
+                total_hours=total_hours, burn_rate=burn_rate,
+                updated=now_time)
+        if new_usage:
+            try:
+                with transaction.atomic():
+                    cls.objects.bulk_create(new_usage)
+            except IntegrityError:
+                # Created by a concurrent update, save them one at a time.
+                for usage in new_usage:
+                    cls.objects.update_or_create(
+                        instance=usage.instance, defaults={
+                            'total_hours': usage.total_hours,
+                            'burn_rate': usage.burn_rate,
+                            'updated': usage.updated})
+        logger.debug("Updated usage for %s instances" % len(instances))
+        return len(instances)
+
+    @classmethod
+    def update_in_batches(cls, queryset, batch_size=500, stdout=None):
+        """
+        Update usage for every instance in 'queryset', 'batch_size'
+        instances at a time. Returns the number of instances updated.
+        """
+        instance_ids = list(queryset.order_by('id').values_list(
+            'id', flat=True))
+        Instance = queryset.model
+        total = 0
+        for idx in xrange(0, len(instance_ids), batch_size):
+            batch = Instance.objects.filter(
+                id__in=instance_ids[idx:idx + batch_size]
+            ).select_related('created_by_identity__created_by')
+            total += cls.update_for(batch)
+            if stdout:
+                stdout.write("Updated usage for %s/%s instances"
+                             % (total, len(instance_ids)))
+        return total
+
+    def __unicode__(self):
+        return "%s: %s hours (+%s/hour since %s)" % (
+            self.instance_id, self.total_hours, self.burn_rate, self.updated)
+
+    class Meta:
+        db_table = "instance_usage"
+        app_label = "core"
@@ -0,0 +1,87 @@
+"""
+  Process-wide caches of small lookup tables (InstanceStatus, StatusType..)
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models.signals import post_save, post_delete
+
+
+class LookupCache(object):
+    """
+    In-process name -> row cache for a small, rarely changing table.
+
+    Every row is loaded on first use and re-read after LOOKUP_CACHE_TTL
+    seconds, or as soon as a row is saved/deleted in this process.
+    Unknown names are created (like get_or_create) and cached once the
+    transaction commits. A TTL of 0 disables the cache (ex: in tests,
+    where rows are rolled back without signals).
+    NOTE: Rows are shared, do not modify them.
+    """
+
+    def __init__(self, model, field='name'):
+        self.model = model
+        self.field = field
+        self._lock = threading.Lock()
+        self._by_name = None
+        self._by_id = None
+        self._expires = 0
+        post_save.connect(self._invalidate, sender=model, weak=False)
+        post_delete.connect(self._invalidate, sender=model, weak=False)
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'LOOKUP_CACHE_TTL', 5 * 60)
+
+    def _load(self):
+        with self._lock:
+            if self._by_name is None or time.time() > self._expires:
+                by_name, by_id = {}, {}
+                # Duplicate names resolve to the oldest row.
+                for row in self.model.objects.order_by('-id'):
+                    by_name[getattr(row, self.field)] = row
+                    by_id[row.id] = row
+                self._by_name, self._by_id = by_name, by_id
+                self._expires = time.time() + self.ttl
+            return self._by_name, self._by_id
+
+    def _store(self, row):
+        with self._lock:
+            if self._by_name is not None:
+                self._by_name.setdefault(getattr(row, self.field), row)
+                self._by_id[row.id] = row
+
+    def get(self, name):
+        """
+        Return the row named 'name', creating it if it does not exist.
+        """
+        if not self.ttl:
+            return self.model.objects.get_or_create(**{self.field: name})[0]
+        by_name, _ = self._load()
+        row = by_name.get(name)
+        if row:
+            return row
+        row, _ = self.model.objects.get_or_create(**{self.field: name})
+        transaction.on_commit(lambda: self._store(row))
+        return row
+
+    def get_by_id(self, row_id):
+        if not self.ttl:
+            return self.model.objects.get(id=row_id)
+        _, by_id = self._load()
+        row = by_id.get(row_id)
+        if row:
+            return row
+        row = self.model.objects.get(id=row_id)
+        self._store(row)
+        return row
+
+    def clear(self):
+        with self._lock:
+            self._by_name = None
+            self._by_id = None
+
+    def _invalidate(self, sender, instance, **kwargs):
+        self.clear()
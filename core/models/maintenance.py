@@ -1,9 +1,16 @@
 import collections
+import os
+import threading
+import time
 
-from django.db import models
+from django.conf import settings
+from django.db import models, transaction
 from django.db.models import Q
+from django.db.models.signals import post_save, post_delete
 from django.utils import timezone
 
+from threepio import logger
+
 from core.models.user import AtmosphereUser as User
 from core.models.provider import Provider
 
@@ -37,6 +44,14 @@ class MaintenanceRecord(models.Model):
             records = records.filter(Q(provider__isnull=True))
         return records
 
+    @classmethod
+    def cached_active(cls, provider=None):
+        """
+        Same records as 'active', served from the in-process cache.
+        Returns a list.
+        """
+        return maintenance_cache.active(provider)
+
     @classmethod
     def disable_login_access(cls, request):
         disable_login = False
@@ -48,7 +63,7 @@ class MaintenanceRecord(models.Model):
         user = User.objects.get(username=username)
         if user.is_staff or user.is_superuser:
             return False
-        records = MaintenanceRecord.active()
+        records = MaintenanceRecord.cached_active()
         for record in records:
             if record.disable_login:
                 disable_login = True
@@ -77,3 +92,109 @@ class MaintenanceRecord(models.Model):
     class Meta:
         db_table = "maintenance_record"
         app_label = "core"
+
+
+MAINTENANCE_CHANNEL = "maintenance_record.invalidate"
+
+
+class MaintenanceCache(object):
+    """
+    In-process cache of every MaintenanceRecord that has not ended yet.
+
+    Records are re-read after MAINTENANCE_CACHE_TTL seconds, or as soon as
+    a record is saved/deleted. Saves in *other* processes are announced on
+    a redis pub/sub channel, each process listens on a daemon thread.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._records = None
+        self._expires = 0
+        self._listener_pid = None
+
+    @property
+    def ttl(self):
+        return getattr(settings, 'MAINTENANCE_CACHE_TTL', 30)
+
+    def records(self):
+        self._start_listener()
+        with self._lock:
+            if self._records is None or time.time() > self._expires:
+                now = timezone.now()
+                self._records = list(MaintenanceRecord.objects.filter(
+                    Q(end_date__gt=now) | Q(end_date__isnull=True)
+                ).select_related('provider'))
+                self._expires = time.time() + self.ttl
+            return self._records
+
+    def active(self, provider=None):
+        if provider is None:
+            provider_ids = set()
+        elif isinstance(provider, collections.Iterable):
+            provider_ids = set(p.id for p in provider)
+        else:
+            provider_ids = set([provider.id])
+        now = timezone.now()
+        return [record for record in self.records()
+                if record.start_date <= now
+                and (not record.end_date or record.end_date > now)
+                and (record.provider_id is None
+                     or record.provider_id in provider_ids)]
+
+    def clear(self):
+        with self._lock:
+            self._records = None
+
+    def invalidate(self):
+        """
+        Clear the cache in this process and every other listening process,
+        once the current transaction commits (a listener clearing earlier
+        would re-read, and cache, the old rows).
+        """
+        self.clear()
+        transaction.on_commit(self._publish_invalidation)
+
+    def _publish_invalidation(self):
+        self.clear()
+        try:
+            from service.cache import redis_connection
+            redis_connection().publish(MAINTENANCE_CHANNEL, "clear")
+        except Exception:
+            logger.warn("Could not publish maintenance cache invalidation, "
+                        "other processes will refresh in %ss" % self.ttl)
+
+    def _start_listener(self):
+        # Forked (gunicorn/celery) workers need their own listener.
+        if self._listener_pid == os.getpid():
+            return
+        self._listener_pid = os.getpid()
+        listener = threading.Thread(
+            target=self._listen, name="maintenance-cache-listener")
+        listener.daemon = True
+        listener.start()
+
+    def _listen(self):
+        from service.cache import redis_connection
+        while True:
+            try:
+                pubsub = redis_connection().pubsub(
+                    ignore_subscribe_messages=True)
+                pubsub.subscribe(MAINTENANCE_CHANNEL)
+                # Anything may have changed while disconnected.
+                self.clear()
+                for message in pubsub.listen():
+                    self.clear()
+            except Exception:
+                logger.warn("Maintenance cache lost its redis subscription, "
+                            "retrying in %ss" % self.ttl)
+                time.sleep(self.ttl)
+
+
+maintenance_cache = MaintenanceCache()
+
+
+def invalidate_maintenance_cache(sender, instance, **kwargs):
+    maintenance_cache.invalidate()
+
+post_save.connect(invalidate_maintenance_cache, sender=MaintenanceRecord)
+post_delete.connect(invalidate_maintenance_cache, sender=MaintenanceRecord)
@@ -10,6 +10,7 @@ from django.core.exceptions import ValidationError
 from django.contrib.postgres.fields import JSONField
 
 from rtwo.models.provider import EucaProvider, OSProvider
+from core.models.lookup_cache import LookupCache
 from core.validators import validate_timezone
 
 from uuid import uuid4
@@ -60,6 +61,9 @@ class ProviderType(models.Model):
         return self.name
 
 
+provider_type_cache = LookupCache(ProviderType)
+
+
 class Provider(models.Model):
 
     """
@@ -149,7 +153,7 @@ class Provider(models.Model):
         return self.virtualization.name
 
     def get_type_name(self):
-        return self.type.name
+        return provider_type_cache.get_by_id(self.type_id).name
 
     def is_active(self):
         if not self.active:
@@ -6,6 +6,8 @@ from django.utils import timezone
 from django.utils.encoding import python_2_unicode_compatible
 import uuid
 
+from core.models.lookup_cache import LookupCache
+
 
 def get_status_type(status="pending"):
     """
@@ -14,8 +16,7 @@ def get_status_type(status="pending"):
     Creates a new StatusType if a name does not exist
     for the give `status`.
     """
-    (status_type, _) = StatusType.objects.get_or_create(name=status)
-    return status_type
+    return status_type_cache.get(status)
 
 
 def get_status_type_id(status="pending"):
@@ -50,3 +51,6 @@ class StatusType(models.Model):
     def __str__(self):
         return "%s" % \
             (self.name,)
+
+
+status_type_cache = LookupCache(StatusType)
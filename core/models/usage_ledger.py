@@ -0,0 +1,245 @@
+"""
+  Append-only allocation source usage for atmosphere.
+"""
+from django.db import models, transaction
+from django.db.models import Max, Q, Sum
+from django.utils import timezone
+
+from threepio import logger
+
+
+INSTANCE_SOURCE_EVENT = 'instance_allocation_source_changed'
+
+
+class AllocationSourceTimeline(object):
+    """
+    The allocation sources an instance was charged to, read from its
+    'instance_allocation_source_changed' events (in a single query).
+    """
+
+    def __init__(self, instance):
+        from core.models.event_table import EventTable
+        self.instance = instance
+        self.events = list(EventTable.objects.filter(
+            name=INSTANCE_SOURCE_EVENT,
+            payload__instance_id=instance.provider_alias
+        ).order_by('timestamp', 'id').values_list('timestamp', 'payload'))
+        self._sources = {}
+
+    def _source(self, payload):
+        from core.models.allocation_source import AllocationSource
+        source_id = payload.get('allocation_source_id')
+        if source_id not in self._sources:
+            self._sources[source_id] = AllocationSource.objects.filter(
+                source_id=source_id).first()
+        return self._sources[source_id]
+
+    def segments(self, since, until):
+        """
+        [(start_date, end_date, allocation_source), ...] covering
+        since-until. allocation_source is None before the first event.
+        """
+        current = None
+        changes = []
+        for timestamp, payload in self.events:
+            if timestamp <= since:
+                current = payload
+            elif timestamp < until:
+                changes.append((timestamp, payload))
+        segments = []
+        start_date = since
+        for timestamp, payload in changes:
+            segments.append((start_date, timestamp,
+                             self._source(current) if current else None))
+            start_date, current = timestamp, payload
+        segments.append((start_date, until,
+                         self._source(current) if current else None))
+        return segments
+
+
+class UsageLedgerEntry(models.Model):
+    """
+    CPU time used by an instance, charged to the allocation source it was
+    using between start_date and end_date.
+
+    Entries are only appended: when a history ends (See
+    InstanceStatusHistory post_save) and when an instance changes
+    allocation source (See listen_for_instance_usage_changes). Time not
+    yet recorded (ex: the current status) is calculated when read.
+    Rebuild with './manage.py rebuild_usage_ledger'
+    """
+    user = models.ForeignKey("AtmosphereUser", related_name="usage_ledger")
+    allocation_source = models.ForeignKey(
+        "AllocationSource", related_name="usage_ledger")
+    instance = models.ForeignKey("Instance", related_name="usage_ledger")
+    # No database constraint: instance_status_history may be partitioned
+    # (See 'manage.py partition_tables')
+    history = models.ForeignKey(
+        "InstanceStatusHistory", null=True, blank=True, db_constraint=False,
+        on_delete=models.SET_NULL, related_name="usage_ledger")
+    start_date = models.DateTimeField()
+    end_date = models.DateTimeField()
+    cpu = models.IntegerField()
+    cpu_seconds = models.FloatField()
+    created = models.DateTimeField(default=timezone.now)
+
+    def cpu_seconds_between(self, start_date, end_date):
+        start_date = max(self.start_date, start_date)
+        end_date = min(self.end_date, end_date)
+        if end_date <= start_date:
+            return 0.0
+        return (end_date - start_date).total_seconds() * self.cpu
+
+    @classmethod
+    def recorded_until(cls, history):
+        last_date = cls.objects.filter(history=history).aggregate(
+            last_date=Max('end_date'))['last_date']
+        if not last_date:
+            return history.start_date
+        return max(last_date, history.start_date)
+
+    @classmethod
+    def unrecorded(cls, history, until=None, sources=None):
+        """
+        Return the (unsaved) entries of 'history' from where the ledger
+        stops up to 'until' (Default: history.end_date, or now)
+        sources -- The AllocationSourceTimeline of the history's instance
+        """
+        if not history.is_active():
+            return []
+        cpu = history.size.cpu if history.size else 0
+        if cpu <= 0:
+            # 'Unknown Size' has a cpu of -1
+            return []
+        if not until:
+            until = history.end_date or timezone.now()
+        elif history.end_date:
+            until = min(until, history.end_date)
+        since = cls.recorded_until(history)
+        if since >= until:
+            return []
+        instance = history.instance
+        if not sources:
+            sources = AllocationSourceTimeline(instance)
+        return [cls(user_id=instance.created_by_id,
+                    allocation_source=allocation_source,
+                    instance=instance, history=history,
+                    start_date=start_date, end_date=end_date, cpu=cpu,
+                    cpu_seconds=(end_date - start_date).total_seconds() * cpu)
+                for start_date, end_date, allocation_source
+                in sources.segments(since, until) if allocation_source]
+
+    @classmethod
+    def record(cls, history, until=None, sources=None):
+        """
+        Append the entries of 'history' up to 'until'
+        (Default: history.end_date). Returns the new entries.
+        """
+        from core.models.instance_history import InstanceStatusHistory
+        if not until and not history.end_date:
+            return []
+        with transaction.atomic():
+            # Serializes the writers of 'history' (ex: the history ending
+            # while its instance changes allocation source), so the
+            # same interval is not appended twice.
+            list(InstanceStatusHistory.objects.select_for_update().filter(
+                id=history.id).values_list('id', flat=True))
+            entries = cls.unrecorded(history, until, sources)
+            if entries:
+                cls.objects.bulk_create(entries)
+        return entries
+
+    @classmethod
+    def usage_for(cls, username, start_date, end_date,
+                  allocation_source_name=None):
+        """
+        Returns (CPU hours used, burn rate) by 'username' between
+        start_date and end_date.
+        burn rate -- Number of active instances charged at end_date
+        """
+        from core.models.instance_history import InstanceStatusHistory
+        entries = cls.objects.filter(
+            user__username=username,
+            start_date__lt=end_date, end_date__gt=start_date)
+        if allocation_source_name:
+            entries = entries.filter(
+                allocation_source__name=allocation_source_name)
+        cpu_seconds = entries.filter(
+            start_date__gte=start_date, end_date__lte=end_date
+        ).aggregate(total=Sum('cpu_seconds'))['total'] or 0.0
+        # Entries crossing the window only count the time inside it
+        for entry in entries.filter(
+                Q(start_date__lt=start_date) | Q(end_date__gt=end_date)):
+            cpu_seconds += entry.cpu_seconds_between(start_date, end_date)
+        # The current status of running instances is not recorded yet
+        burn_rate = 0
+        open_histories = InstanceStatusHistory.objects.filter(
+            instance__created_by__username=username,
+            status__name='active', end_date=None,
+            start_date__lt=end_date).select_related(
+                'instance', 'status', 'size')
+        for history in open_histories:
+            for entry in cls.unrecorded(history, until=end_date):
+                if allocation_source_name and \
+                        entry.allocation_source.name != allocation_source_name:
+                    continue
+                cpu_seconds += entry.cpu_seconds_between(start_date, end_date)
+                if entry.end_date == end_date:
+                    burn_rate += 1
+        return round(cpu_seconds / 3600.0, 2), burn_rate
+
+    @classmethod
+    def rebuild(cls, start_date, end_date, usernames=None, batch_size=500,
+                stdout=None):
+        """
+        Replay the active histories overlapping start_date-end_date (and the
+        allocation source events of their instances) into the ledger.
+        Histories are replayed in full, running ones up to end_date
+        (the rest is calculated when read).
+        Returns the number of entries written.
+        """
+        from core.models.instance_history import InstanceStatusHistory
+        end_date = min(end_date, timezone.now())
+        histories = InstanceStatusHistory.objects.filter(
+            Q(end_date__isnull=True) | Q(end_date__gt=start_date),
+            start_date__lt=end_date, status__name='active')
+        if usernames:
+            histories = histories.filter(
+                instance__created_by__username__in=usernames)
+        history_ids = list(histories.order_by(
+            'instance_id', 'id').values_list('id', flat=True))
+        total = 0
+        for idx in xrange(0, len(history_ids), batch_size):
+            batch = InstanceStatusHistory.objects.filter(
+                id__in=history_ids[idx:idx + batch_size]
+            ).select_related('instance', 'status', 'size')
+            timelines = {}
+            with transaction.atomic():
+                cls.objects.filter(history__in=batch).delete()
+                for history in batch:
+                    sources = timelines.get(history.instance_id)
+                    if not sources:
+                        sources = timelines[history.instance_id] = \
+                            AllocationSourceTimeline(history.instance)
+                    until = end_date if not history.end_date else None
+                    total += len(cls.record(history, until, sources))
+            if stdout:
+                stdout.write("Replayed %s/%s histories"
+                             % (min(idx + batch_size, len(history_ids)),
+                                len(history_ids)))
+        logger.info("Rebuilt %s usage ledger entries from %s to %s"
+                    % (total, start_date, end_date))
+        return total
+
+    def __unicode__(self):
+        return "%s on %s (%s): %s CPU seconds (FROM:%s TO:%s)" % (
+            self.instance_id, self.allocation_source_id, self.user_id,
+            self.cpu_seconds, self.start_date, self.end_date)
+
+    class Meta:
+        db_table = "usage_ledger"
+        app_label = "core"
+        index_together = [
+            ("user", "allocation_source", "start_date"),
+            ("user", "start_date"),
+        ]
@@ -1,5 +1,4 @@
 import uuid
-import inspect
 
 from django.contrib.auth.models import AbstractUser
 from django.conf import settings
@@ -28,26 +27,16 @@ class AtmosphereUser(AbstractUser):
         identity_member = identity.identity_memberships.all()[0]
         return identity_member.quota
 
-    def is_valid(self):
+    def is_valid(self, force=False):
         """
         Call validation plugin to determine user validity
+        Results are cached, see core.validation
+        force=True -- Skip the cache
         """
-        _is_valid = False
+        from core.validation import validate_user
         #FIXME: Improvement for later: This pattern is probably better served in a Manager, to be called by this function..
         for ValidationPlugin in load_validation_plugins():
-            plugin = ValidationPlugin()
-            try:
-                inspect.getcallargs(
-                    getattr(plugin,'validate_user'),
-                    user=self)
-            except AttributeError:
-                logger.info("Validation plugin %s does not have a 'validate_user' method"
-                            % ValidationPlugin)
-            except TypeError:
-                logger.info("Validation plugin %s does not accept (self, user)"
-                            % ValidationPlugin)
-            _is_valid = plugin.validate_user(user=self)
-            if _is_valid:
+            if validate_user(ValidationPlugin, self, force=force):
                 return True
         return False
 
@@ -139,8 +128,19 @@ def get_or_create_user_profile(sender, instance, created, **kwargs):
     if prof[1] is True:
         logger.debug("Creating User Profile for %s" % instance)
 
+
+
+def invalidate_user_validation(sender, instance, created, **kwargs):
+    """
+    A disabled account is re-validated (See core.validation)
+    """
+    from core.validation import invalidate_validation
+    if created or not instance.is_enabled:
+        invalidate_validation(instance)
+
 # Instantiate the hooks:
 post_save.connect(get_or_create_user_profile, sender=AtmosphereUser)
+post_save.connect(invalidate_user_validation, sender=AtmosphereUser)
 
 # USER METHODS HERE
 
@@ -5,7 +5,7 @@ def load_plugin(plugin_path):
     return import_string(plugin_path)
 
 def load_validation_plugins():
-    from atmosphere import settings
+    from django.conf import settings
     validation_classes = []
     available_plugins = [] \
         if not hasattr(settings, 'VALIDATION_PLUGINS') \
@@ -35,6 +35,15 @@ def send_email(subject, body, from_email, to, cc=None,
         return False
 
 
+@task(name="refresh_user_validation")
+def refresh_user_validation(plugin_path, username):
+    """
+    Refresh a stale validation result, see core.validation
+    """
+    from core.validation import refresh_validation_for
+    return refresh_validation_for(plugin_path, username)
+
+
 @task(name="close_request")
 def close_request(request):
     """
@@ -51,3 +60,35 @@ def set_request_as_failed(request):
     """
     request.status = get_status_type(status="failed")
     request.save()
+
+
+@task(name="update_instance_usage")
+def update_instance_usage(instance_ids):
+    """
+    Recalculate the InstanceUsage of 'instance_ids' after a status change
+    """
+    from core.models.instance import Instance
+    from core.models.instance_usage import InstanceUsage
+    instances = Instance.objects.filter(id__in=instance_ids).select_related(
+        'created_by_identity__created_by')
+    return InstanceUsage.update_for(instances)
+
+
+@task(name="dispatch_events")
+def dispatch_events(entity_id):
+    """
+    Run the queued EventTable listeners of 'entity_id', see service.event_bus
+    """
+    from service.event_bus import dispatch_entity
+    return dispatch_entity(entity_id)
+
+
+@task(name="redispatch_events")
+def redispatch_events():
+    """
+    Re-publish 'dispatch_events' for deliveries that are overdue
+    """
+    from service.event_bus import redispatch_pending
+    entity_ids = redispatch_pending()
+    if entity_ids:
+        celery_logger.info("Re-dispatched events for %s" % list(entity_ids))
@@ -0,0 +1,73 @@
+"""
+test the EventTable event bus
+"""
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import mock
+
+from core.models import EventDelivery, EventTable
+from service.event_bus import dispatch_entity
+
+
+calls = []
+
+
+def listen_cheaply(sender, instance, **kwargs):
+    calls.append(('cheap', instance.id))
+
+
+def listen_slowly(sender, instance, **kwargs):
+    calls.append(('slow', instance.id))
+    if instance.payload.get('fail'):
+        raise ValueError("Failed on purpose")
+
+
+LISTENERS = [('test_event', listen_cheaply), ('test_event', listen_slowly)]
+
+
+@override_settings(EVENT_BUS_ASYNC=True,
+                   EVENT_BUS_SYNC_LISTENERS=['listen_cheaply'],
+                   EVENT_BUS_MAX_ATTEMPTS=2, EVENT_BUS_RETRY_DELAY=0)
+@mock.patch('core.models.event_table.EVENT_LISTENERS', LISTENERS)
+@mock.patch('service.event_bus.SingleFlightLock')
+@mock.patch('service.event_bus.publish')
+class TestEventBus(TestCase):
+
+    def setUp(self):
+        del calls[:]
+
+    def _create_event(self, **payload):
+        return EventTable.create_event('test_event', payload, 'entity')
+
+    def test_slow_listeners_are_queued(self, publish, lock):
+        event = self._create_event()
+        self.assertEquals(calls, [('cheap', event.id)])
+        delivery = EventDelivery.objects.get(event=event)
+        self.assertEquals(delivery.listener, 'listen_slowly')
+        self.assertEquals(delivery.status, EventDelivery.PENDING)
+
+    def test_deliveries_run_in_order(self, publish, lock):
+        lock.return_value.pop_rerun.return_value = None
+        first = self._create_event()
+        second = self._create_event()
+        del calls[:]
+        self.assertEquals(dispatch_entity('entity'), 2)
+        self.assertEquals(calls, [('slow', first.id), ('slow', second.id)])
+        self.assertFalse(EventDelivery.objects.filter(
+            status=EventDelivery.PENDING).exists())
+
+    def test_failed_delivery_is_retried_then_dead(self, publish, lock):
+        lock.return_value.pop_rerun.return_value = None
+        failing = self._create_event(fail=True)
+        self._create_event()
+        del calls[:]
+        # The next event waits for the failed one to be retried
+        self.assertEquals(dispatch_entity('entity'), 0)
+        self.assertEquals(calls, [('slow', failing.id)])
+        self.assertTrue(publish.called)
+        # The second failure is final
+        self.assertEquals(dispatch_entity('entity'), 1)
+        self.assertEquals(
+            EventDelivery.objects.get(event=failing).status,
+            EventDelivery.DEAD)
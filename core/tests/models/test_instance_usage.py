@@ -0,0 +1,63 @@
+"""
+test the denormalized instance usage
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+import mock
+
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.models import Instance, InstanceSource, InstanceUsage
+
+
+class TestInstanceUsage(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        user = UserFactory.create()
+        provider = ProviderFactory.create()
+        identity = IdentityFactory.create(
+            provider=provider, created_by=user)
+        source = InstanceSource.objects.create(
+            provider=provider, identifier='machine-usage')
+        self.instances = [
+            Instance.objects.create(
+                name='usage-%s' % idx, provider_alias='usage-alias-%s' % idx,
+                source=source, created_by=user, created_by_identity=identity,
+                start_date=self.now - timedelta(hours=10))
+            for idx in xrange(2)]
+
+    def test_current_hours_extrapolates_burn_rate(self):
+        usage = InstanceUsage(total_hours=10, burn_rate=2,
+                              updated=self.now - timedelta(minutes=90))
+        self.assertEquals(usage.current_hours(self.now), 13.0)
+
+    def test_current_hours_never_goes_back_in_time(self):
+        usage = InstanceUsage(total_hours=10, burn_rate=2, updated=self.now)
+        self.assertEquals(
+            usage.current_hours(self.now - timedelta(hours=1)), 10.0)
+
+    @mock.patch('core.models.instance.calculate_usage')
+    def test_update_for_creates_then_updates(self, calculate_usage):
+        calculate_usage.return_value = {
+            'usage-alias-0': (5.0, 1.0), 'usage-alias-1': (2.5, 0.0)}
+        self.assertEquals(InstanceUsage.update_for(self.instances), 2)
+        self.assertEquals(calculate_usage.call_count, 1)
+        usage = InstanceUsage.objects.get(instance=self.instances[0])
+        self.assertEquals((usage.total_hours, usage.burn_rate), (5.0, 1.0))
+
+        calculate_usage.return_value = {'usage-alias-0': (6.0, 0.0)}
+        InstanceUsage.update_for(self.instances)
+        self.assertEquals(InstanceUsage.objects.count(), 2)
+        usage = InstanceUsage.objects.get(instance=self.instances[0])
+        self.assertEquals((usage.total_hours, usage.burn_rate), (6.0, 0.0))
+        # Instances missing from the engine's result used nothing
+        usage = InstanceUsage.objects.get(instance=self.instances[1])
+        self.assertEquals((usage.total_hours, usage.burn_rate), (0.0, 0.0))
+
+    @mock.patch('core.models.instance.calculate_usage')
+    def test_update_for_nothing(self, calculate_usage):
+        self.assertEquals(InstanceUsage.update_for([]), 0)
+        self.assertFalse(calculate_usage.called)
@@ -0,0 +1,66 @@
+"""
+test the lookup table cache
+"""
+from django.test import TestCase
+from django.test.utils import override_settings
+
+import mock
+
+from core.models import StatusType
+from core.models.status_type import status_type_cache
+
+
+@override_settings(LOOKUP_CACHE_TTL=300)
+class TestLookupCache(TestCase):
+
+    def setUp(self):
+        # Rows rolled back by earlier tests never invalidated the cache
+        status_type_cache.clear()
+        self.addCleanup(status_type_cache.clear)
+        self.pending = StatusType.objects.create(name='cached-pending')
+        self.on_commit = []
+        patcher = mock.patch(
+            'core.models.lookup_cache.transaction.on_commit',
+            side_effect=self.on_commit.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _commit(self):
+        for callback in self.on_commit:
+            callback()
+        del self.on_commit[:]
+
+    def test_cached_lookup_issues_no_query(self):
+        self.assertEquals(
+            status_type_cache.get('cached-pending'), self.pending)
+        with self.assertNumQueries(0):
+            self.assertEquals(
+                status_type_cache.get('cached-pending'), self.pending)
+            self.assertEquals(
+                status_type_cache.get_by_id(self.pending.id), self.pending)
+
+    def test_saving_a_row_clears_the_cache(self):
+        status_type_cache.get('cached-pending')
+        self.pending.description = 'changed'
+        self.pending.save()
+        with self.assertNumQueries(1):
+            row = status_type_cache.get('cached-pending')
+        self.assertEquals(row.description, 'changed')
+
+    def test_deleting_a_row_clears_the_cache(self):
+        status_type_cache.get('cached-pending')
+        self.pending.delete()
+        with self.assertNumQueries(1):
+            self.assertIsNone(
+                status_type_cache._load()[0].get('cached-pending'))
+
+    def test_unknown_name_is_created_then_cached(self):
+        status_type_cache.get('cached-pending')
+        row = status_type_cache.get('cached-new')
+        self.assertTrue(
+            StatusType.objects.filter(id=row.id, name='cached-new').exists())
+        self._commit()
+        status_type_cache.get('cached-pending')
+        with self.assertNumQueries(0):
+            self.assertEquals(status_type_cache.get('cached-new'), row)
+            self.assertEquals(status_type_cache.get_by_id(row.id), row)
@@ -0,0 +1,75 @@
+"""
+test the cached maintenance records
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+import mock
+
+from api.tests.factories import ProviderFactory
+from core.models import MaintenanceRecord
+from core.models.maintenance import MAINTENANCE_CHANNEL, maintenance_cache
+
+
+@mock.patch('core.models.maintenance.MaintenanceCache._start_listener')
+@mock.patch('service.cache.redis_connection')
+class TestMaintenanceCache(TestCase):
+
+    def setUp(self):
+        maintenance_cache.clear()
+        self.provider = ProviderFactory.create()
+        self.other_provider = ProviderFactory.create()
+        now_time = timezone.now()
+        self.start_date = now_time - timedelta(hours=1)
+        self.on_commit = []
+        patcher = mock.patch(
+            'core.models.maintenance.transaction.on_commit',
+            side_effect=self.on_commit.append)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def _create_record(self, **kwargs):
+        return MaintenanceRecord.objects.create(
+            start_date=self.start_date, title="Maintenance",
+            message="Maintenance", **kwargs)
+
+    def _commit(self):
+        for callback in self.on_commit:
+            callback()
+        del self.on_commit[:]
+
+    def test_cached_active_matches_active(self, redis_connection,
+                                          start_listener):
+        everywhere = self._create_record()
+        on_provider = self._create_record(provider=self.provider)
+        self._create_record(provider=self.other_provider)
+        self._create_record(end_date=self.start_date)
+        self._commit()
+        self.assertEquals(MaintenanceRecord.cached_active(), [everywhere])
+        self.assertEquals(
+            set(MaintenanceRecord.cached_active(self.provider)),
+            set([everywhere, on_provider]))
+        self.assertEquals(
+            set(MaintenanceRecord.cached_active(self.provider)),
+            set(MaintenanceRecord.active(self.provider)))
+
+    def test_records_are_cached(self, redis_connection, start_listener):
+        self.assertEquals(MaintenanceRecord.cached_active(), [])
+        with self.assertNumQueries(0):
+            self.assertEquals(MaintenanceRecord.cached_active(), [])
+
+    def test_saving_invalidates_after_commit(self, redis_connection,
+                                             start_listener):
+        self.assertEquals(MaintenanceRecord.cached_active(), [])
+        record = self._create_record()
+        publish = redis_connection.return_value.publish
+        self.assertFalse(publish.called)
+        self._commit()
+        publish.assert_called_once_with(MAINTENANCE_CHANNEL, "clear")
+        self.assertEquals(MaintenanceRecord.cached_active(), [record])
+
+        record.delete()
+        self._commit()
+        self.assertEquals(MaintenanceRecord.cached_active(), [])
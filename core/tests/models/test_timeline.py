@@ -0,0 +1,69 @@
+"""
+test instance history timelines
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.utils import timezone
+
+from core.models import (
+    Instance, InstanceStatus, InstanceStatusHistory, Timeline)
+
+
+class TestTimeline(TestCase):
+
+    def setUp(self):
+        self.start = timezone.now() - timedelta(days=10)
+        self.instance = Instance(provider_alias='timeline-test',
+                                 start_date=self.start)
+        self.active = InstanceStatus(name='active')
+        self.suspended = InstanceStatus(name='suspended')
+
+    def _history(self, status, start_days, end_days=None):
+        return InstanceStatusHistory(
+            status=status,
+            start_date=self.start + timedelta(days=start_days),
+            end_date=self.start + timedelta(days=end_days)
+            if end_days is not None else None)
+
+    def test_linked_histories(self):
+        first = self._history(self.active, 0, 2)
+        second = self._history(self.suspended, 2, 5)
+        last = self._history(self.active, 5)
+        timeline = Timeline(self.instance, [first, second, last])
+        self.assertEquals(timeline.first, first)
+        self.assertEquals(timeline.last, last)
+        self.assertEquals(first.next(), second)
+        self.assertEquals(last.previous(), second)
+        self.assertRaises(LookupError, first.previous)
+        self.assertRaises(LookupError, last.next)
+        self.assertEquals(timeline.gaps(), [])
+        self.assertEquals(timeline.overlaps(), [])
+        self.assertEquals(timeline.open_histories(), [last])
+
+    def test_gaps_and_overlaps(self):
+        first = self._history(self.active, 0, 1)
+        second = self._history(self.suspended, 2)
+        last = self._history(self.active, 5, 6)
+        timeline = Timeline(self.instance, [first, second, last])
+        self.assertEquals(timeline.gaps(), [(first, second)])
+        self.assertEquals(timeline.overlaps(), [(second, last)])
+
+    def test_between(self):
+        first = self._history(self.active, 0, 2)
+        second = self._history(self.suspended, 2, 5)
+        last = self._history(self.active, 5)
+        timeline = Timeline(self.instance, [first, second, last])
+        self.assertEquals(
+            timeline.between(self.start + timedelta(days=2),
+                             self.start + timedelta(days=5)),
+            [second])
+        self.assertEquals(
+            timeline.between(start_date=self.start + timedelta(days=3)),
+            [second, last])
+
+    def test_empty_timeline(self):
+        timeline = Timeline(self.instance, [])
+        self.assertFalse(timeline)
+        self.assertEquals(timeline.first, None)
+        self.assertEquals(timeline.last, None)
@@ -0,0 +1,81 @@
+"""
+test the usage ledger
+"""
+from datetime import timedelta
+
+from django.test import TestCase
+from django.test.utils import override_settings
+from django.utils import timezone
+
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.models import (
+    AllocationSource, EventTable, Instance, InstanceSource, InstanceStatus,
+    InstanceStatusHistory, Size, UsageLedgerEntry)
+from core.models.allocation_source import total_usage
+
+
+@override_settings(USE_USAGE_LEDGER=True)
+class TestUsageLedger(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = UserFactory.create()
+        provider = ProviderFactory.create()
+        identity = IdentityFactory.create(
+            provider=provider, created_by=self.user)
+        size = Size.objects.create(
+            alias='1', name='tiny', provider=provider,
+            cpu=1, mem=1024, disk=0, root=10)
+        self.first_source = AllocationSource.objects.create(
+            name='first', source_id='1', compute_allowed=100)
+        self.second_source = AllocationSource.objects.create(
+            name='second', source_id='2', compute_allowed=100)
+        source = InstanceSource.objects.create(
+            provider=provider, identifier='machine-ledger')
+        self.instance = Instance.objects.create(
+            name='ledger', provider_alias='ledger-alias', source=source,
+            created_by=self.user, created_by_identity=identity,
+            start_date=self._hours_ago(10))
+        self.history = InstanceStatusHistory.objects.create(
+            instance=self.instance, size=size,
+            status=InstanceStatus.objects.create(name='active'),
+            start_date=self._hours_ago(10))
+        self._change_source(self.first_source, 10)
+        self._change_source(self.second_source, 4)
+
+    def _hours_ago(self, hours):
+        return self.now - timedelta(hours=hours)
+
+    def _change_source(self, allocation_source, hours_ago):
+        EventTable.objects.create(
+            name='instance_allocation_source_changed',
+            entity_id=self.user.username,
+            payload={'allocation_source_id': allocation_source.source_id,
+                     'instance_id': self.instance.provider_alias},
+            timestamp=self._hours_ago(hours_ago))
+
+    def _usage(self, allocation_source):
+        return total_usage(
+            self.user.username, self._hours_ago(24),
+            allocation_source_name=allocation_source.name,
+            end_date=self.now, burn_rate=True)
+
+    def test_source_change_is_recorded(self):
+        entry = UsageLedgerEntry.objects.get()
+        self.assertEquals(entry.allocation_source, self.first_source)
+        self.assertEquals(entry.cpu_seconds, 6 * 3600.0)
+        self.assertEquals(self._usage(self.first_source), [6.0, 0])
+        # The running status is counted without being recorded
+        self.assertEquals(self._usage(self.second_source), [4.0, 1])
+
+    def test_history_end_is_recorded(self):
+        self.history.end_date = self._hours_ago(2)
+        self.history.save()
+        self.assertEquals(UsageLedgerEntry.objects.count(), 2)
+        self.assertEquals(self._usage(self.second_source), [2.0, 0])
+
+    def test_rebuild(self):
+        UsageLedgerEntry.objects.all().delete()
+        UsageLedgerEntry.rebuild(self._hours_ago(24), self._hours_ago(1))
+        self.assertEquals(self._usage(self.first_source), [6.0, 0])
+        self.assertEquals(self._usage(self.second_source), [4.0, 1])
@@ -0,0 +1,71 @@
+"""
+test the read replica router
+"""
+from django.conf import settings
+from django.test import SimpleTestCase
+from django.test.utils import override_settings
+
+import mock
+
+from atmosphere.db_router import ReplicaRouter, use_primary, use_replica
+
+
+REPLICA_DATABASES = dict(settings.DATABASES, replica=dict(
+    settings.DATABASES['default'], TEST={'MIRROR': 'default'}))
+
+
+@override_settings(DATABASES=REPLICA_DATABASES, REPLICA_DATABASE='replica',
+                   REPLICA_MAX_LAG=60)
+@mock.patch('atmosphere.db_router.replica_lag', return_value=0.0)
+class ReplicaRouterTests(SimpleTestCase):
+
+    def setUp(self):
+        self.router = ReplicaRouter()
+
+    def read(self):
+        return self.router.db_for_read(None)
+
+    def test_reads_default_outside_of_block(self, replica_lag):
+        self.assertEqual(self.read(), 'default')
+
+    def test_reads_replica_inside_block(self, replica_lag):
+        with use_replica():
+            self.assertEqual(self.read(), 'replica')
+        self.assertEqual(self.read(), 'default')
+
+    def test_decorator(self, replica_lag):
+        @use_replica()
+        def report():
+            return self.read()
+        self.assertEqual(report(), 'replica')
+        self.assertEqual(self.read(), 'default')
+
+    def test_reads_own_writes(self, replica_lag):
+        with use_replica():
+            self.assertEqual(self.router.db_for_write(None), 'default')
+            self.assertEqual(self.read(), 'default')
+        with use_replica():
+            self.assertEqual(self.read(), 'replica')
+
+    def test_use_primary(self, replica_lag):
+        with use_replica():
+            with use_primary():
+                self.assertEqual(self.read(), 'default')
+            self.assertEqual(self.read(), 'replica')
+
+    def test_lagging_replica(self, replica_lag):
+        replica_lag.return_value = 120.0
+        with use_replica():
+            self.assertEqual(self.read(), 'default')
+        replica_lag.return_value = None
+        with use_replica():
+            self.assertEqual(self.read(), 'default')
+
+    def test_unconfigured_replica(self, replica_lag):
+        with override_settings(REPLICA_DATABASE='missing'):
+            with use_replica():
+                self.assertEqual(self.read(), 'default')
+
+    def test_migrates_default_only(self, replica_lag):
+        self.assertTrue(self.router.allow_migrate('default', 'core'))
+        self.assertFalse(self.router.allow_migrate('replica', 'core'))
@@ -0,0 +1,88 @@
+"""
+test the export_instance_metrics command
+"""
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.management.commands.export_instance_metrics import CSV_HEADER
+from core.models import (
+    Instance, InstanceSource, InstanceStatus, InstanceStatusHistory, Size)
+
+
+class TestExportInstanceMetrics(TestCase):
+
+    def setUp(self):
+        self.now = timezone.now()
+        self.user = UserFactory.create()
+        provider = ProviderFactory.create(location='Tucson, AZ')
+        self.identity = IdentityFactory.create(
+            provider=provider, created_by=self.user)
+        self.source = InstanceSource.objects.create(
+            provider=provider, identifier='machine-export')
+        self.tiny = Size.objects.create(
+            alias='1', name='tiny', provider=provider,
+            cpu=1, mem=1024, disk=0, root=10)
+        self.large = Size.objects.create(
+            alias='3', name='m1."large"', provider=provider,
+            cpu=4, mem=8192, disk=40, root=20)
+        active = InstanceStatus.objects.create(name='active')
+        suspended = InstanceStatus.objects.create(name='suspended')
+        deploy_error = InstanceStatus.objects.create(name='deploy_error')
+
+        # Active, then a day with no history, then suspended on a new size
+        self.gap = self._instance('export-gap', 10)
+        self._history(self.gap, active, self.tiny, 10, 9)
+        self._history(self.gap, suspended, self.large, 8)
+        # Never reported a status
+        self.no_history = self._instance('export-none', 6)
+        self.recent = self._instance('export-recent', 1)
+        self._history(self.recent, deploy_error, self.tiny, 1)
+
+    def _days_ago(self, days):
+        return self.now - timedelta(days=days)
+
+    def _instance(self, alias, days_ago):
+        return Instance.objects.create(
+            name=alias, provider_alias=alias, source=self.source,
+            created_by=self.user, created_by_identity=self.identity,
+            start_date=self._days_ago(days_ago))
+
+    def _history(self, instance, status, size, start_days, end_days=None):
+        return InstanceStatusHistory.objects.create(
+            instance=instance, status=status, size=size,
+            start_date=self._days_ago(start_days),
+            end_date=self._days_ago(end_days)
+            if end_days is not None else None)
+
+    def _export(self, **options):
+        output = StringIO()
+        call_command('export_instance_metrics', stdout=output, **options)
+        header, rows = output.getvalue().split("\n", 1)
+        self.assertEquals(header, CSV_HEADER)
+        # csv.writer ends every row with \r\n
+        rows = rows.split("\r\n")
+        self.assertEquals(rows.pop(), "")
+        return rows
+
+    def _prefix(self, instance):
+        return '%s,%s,%s,"Tucson, AZ",%s,Deleted Image,N/A,' % (
+            instance.id, instance.provider_alias, self.user.username,
+            instance.start_date.strftime("%x %X"))
+
+    def test_one_row_per_instance(self):
+        self.assertEquals(self._export(), [
+            # The latest history's size, quoted by csv.writer
+            self._prefix(self.gap) +
+            '"m1.""large""",3,4,8192,40,0,1,0,0,0',
+            self._prefix(self.no_history) + ',,,,,0,0,0,0,1',
+            self._prefix(self.recent) + 'tiny,1,1,1024,0,0,0,1,0,0'])
+
+    def test_since(self):
+        since = self._days_ago(3).strftime("%Y-%m-%dT%H:%M:%S%z")
+        self.assertEquals(self._export(since=since), [
+            self._prefix(self.recent) + 'tiny,1,1,1024,0,0,0,1,0,0'])
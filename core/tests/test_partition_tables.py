@@ -0,0 +1,108 @@
+"""
+test converting the history and event tables to partitioned tables
+"""
+from datetime import timedelta
+from StringIO import StringIO
+
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from api.tests.factories import UserFactory, IdentityFactory, ProviderFactory
+from core.models import (
+    AllocationSource, EventTable, Instance, InstanceSource, InstanceStatus,
+    InstanceStatusHistory, Size)
+from service.allocation_logic import create_report
+from service.monitoring import _core_instances_for
+
+
+class TestPartitionTables(TestCase):
+
+    def setUp(self):
+        if connection.vendor != 'postgresql' or \
+                connection.pg_version < 110000:
+            self.skipTest("Partitioning requires PostgreSQL 11+")
+        self.now = timezone.now()
+        self.user = UserFactory.create()
+        provider = ProviderFactory.create()
+        self.identity = IdentityFactory.create(
+            provider=provider, created_by=self.user)
+        size = Size.objects.create(
+            alias='1', name='tiny', provider=provider,
+            cpu=1, mem=1024, disk=0, root=10)
+        source = InstanceSource.objects.create(
+            provider=provider, identifier='machine-partition')
+        self.instance = Instance.objects.create(
+            name='partition', provider_alias='partition-alias',
+            source=source, created_by=self.user,
+            created_by_identity=self.identity,
+            start_date=self._days_ago(40))
+        self.active = InstanceStatus.objects.create(name='active')
+        self.suspended = InstanceStatus.objects.create(name='suspended')
+        # Two histories in different months
+        self.first = InstanceStatusHistory.objects.create(
+            instance=self.instance, size=size, status=self.active,
+            start_date=self._days_ago(40), end_date=self._days_ago(5))
+        self.last = InstanceStatusHistory.objects.create(
+            instance=self.instance, size=size, status=self.suspended,
+            start_date=self._days_ago(5))
+        allocation_source = AllocationSource.objects.create(
+            name='partitioned', source_id='1', compute_allowed=100)
+        EventTable.objects.create(
+            name='instance_allocation_source_changed',
+            entity_id=self.user.username,
+            payload={'allocation_source_id': allocation_source.source_id,
+                     'instance_id': self.instance.provider_alias,
+                     'username': self.user.username},
+            timestamp=self._days_ago(20))
+
+    def _days_ago(self, days):
+        return self.now - timedelta(days=days)
+
+    def _convert(self):
+        with connection.cursor() as cursor:
+            # The tables can not be altered with deferred checks pending
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+        call_command('partition_tables', convert=True, stdout=StringIO())
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT relname FROM pg_class WHERE relkind = 'p'"
+                " AND relname IN ('instance_status_history', 'event_table')")
+            self.assertEquals(
+                sorted(row[0] for row in cursor.fetchall()),
+                ['event_table', 'instance_status_history'])
+
+    def _report(self):
+        return [(row['instance_status_history_id'], row['allocation_source'],
+                 row['applicable_duration'])
+                for row in create_report(
+                    self._days_ago(30), self.now,
+                    user_id=self.user.username)]
+
+    def test_save_and_update_by_id(self):
+        self._convert()
+        history = InstanceStatusHistory.objects.create(
+            instance=self.instance, size=self.last.size, status=self.active,
+            start_date=self.now)
+        self.last.end_date = self.now
+        self.last.save()
+        self.assertEquals(
+            InstanceStatusHistory.objects.get(id=self.last.id).end_date,
+            self.now)
+        self.assertEquals(
+            list(self.instance.instancestatushistory_set.order_by(
+                'start_date').values_list('id', flat=True)),
+            [self.first.id, self.last.id, history.id])
+
+    def test_queries_are_unchanged(self):
+        instances = list(_core_instances_for(
+            self.identity, self._days_ago(30)))
+        report = self._report()
+        self.assertEquals(instances, [self.instance])
+        self.assertEquals(len(report), 3)
+        self._convert()
+        self.assertEquals(
+            list(_core_instances_for(self.identity, self._days_ago(30))),
+            instances)
+        self.assertEquals(self._report(), report)
@@ -0,0 +1,169 @@
+"""
+Cached results of settings.VALIDATION_PLUGINS, see AtmosphereUser.is_valid
+
+Validation plugins may call a remote service (the TAS API, LDAP, ...)
+so each plugin's answer is cached per user in redis (shared by the web
+and celery processes):
+* A valid result is fresh for 'cache_ttl' seconds. Once stale it is still
+  returned (until VALIDATION_CACHE_STALE_TTL passes) while a celery task
+  refreshes it in the background.
+* An invalid result is cached for 'negative_cache_ttl' seconds, and is
+  never served stale.
+* A plugin error is not cached (the next call asks the plugin again).
+Plugins set 'cache_ttl'/'negative_cache_ttl' as class attributes,
+settings.VALIDATION_CACHE_TTLS overrides them by plugin path.
+Entries of a user are dropped when the user is deactivated or its
+allocation sources change (See invalidate_validation).
+"""
+import cPickle as pickle
+import inspect
+import time
+
+from django.conf import settings
+
+import redis
+
+from threepio import logger
+
+from core.plugins import load_plugin, load_validation_plugins
+from service.cache import redis_connection
+
+
+VALIDATION_KEY = "validation.{0}.{1}"
+REFRESH_KEY = "validation.{0}.{1}.refreshing"
+
+
+def get_plugin_path(plugin_class):
+    return "%s.%s" % (plugin_class.__module__, plugin_class.__name__)
+
+
+def get_validation_ttls(plugin_class):
+    """
+    Return (ttl, negative_ttl) for 'plugin_class'
+    """
+    overrides = getattr(settings, 'VALIDATION_CACHE_TTLS', {}).get(
+        get_plugin_path(plugin_class), {})
+    ttl = overrides.get('ttl', getattr(
+        plugin_class, 'cache_ttl',
+        getattr(settings, 'VALIDATION_CACHE_TTL', 0)))
+    negative_ttl = overrides.get('negative_ttl', getattr(
+        plugin_class, 'negative_cache_ttl',
+        getattr(settings, 'VALIDATION_CACHE_NEGATIVE_TTL', 0)))
+    return (ttl, negative_ttl)
+
+
+def run_validation_plugin(plugin_class, user):
+    plugin = plugin_class()
+    try:
+        inspect.getcallargs(
+            getattr(plugin, 'validate_user'),
+            user=user)
+    except AttributeError:
+        logger.info("Validation plugin %s does not have a 'validate_user' method"
+                    % plugin_class)
+    except TypeError:
+        logger.info("Validation plugin %s does not accept (self, user)"
+                    % plugin_class)
+    return plugin.validate_user(user=user)
+
+
+def _get_entry(key):
+    try:
+        data = redis_connection().get(key)
+    except redis.exceptions.ConnectionError:
+        logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                     "Somebody should turn it on!")
+        return None
+    return pickle.loads(data) if data else None
+
+
+def refresh_validation(plugin_class, user):
+    """
+    Run 'plugin_class' for 'user' and cache the result.
+    If the plugin fails, the cache is left as is and False is returned.
+    """
+    plugin_path = get_plugin_path(plugin_class)
+    key = VALIDATION_KEY.format(plugin_path, user.username)
+    try:
+        is_valid = bool(run_validation_plugin(plugin_class, user))
+    except Exception:
+        logger.exception("Validation plugin %s failed for user %s"
+                         % (plugin_path, user))
+        is_valid = None
+    ttl, negative_ttl = get_validation_ttls(plugin_class)
+    try:
+        r = redis_connection()
+        if is_valid and ttl:
+            stale_ttl = getattr(settings, 'VALIDATION_CACHE_STALE_TTL', 0)
+            r.set(key, pickle.dumps((is_valid, time.time() + ttl)),
+                  ex=ttl + stale_ttl)
+        elif is_valid is False and negative_ttl:
+            r.set(key, pickle.dumps((is_valid, time.time() + negative_ttl)),
+                  ex=negative_ttl)
+        elif is_valid is not None:
+            r.delete(key)
+        r.delete(REFRESH_KEY.format(plugin_path, user.username))
+    except redis.exceptions.ConnectionError:
+        logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                     "Somebody should turn it on!")
+    return bool(is_valid)
+
+
+def _schedule_refresh(plugin_path, username):
+    from core.tasks import refresh_user_validation
+    refresh_key = REFRESH_KEY.format(plugin_path, username)
+    try:
+        # Only one refresh per (plugin, user) at a time.
+        if not redis_connection().set(refresh_key, 1, nx=True, ex=5 * 60):
+            return
+    except redis.exceptions.ConnectionError:
+        return
+    try:
+        refresh_user_validation.apply_async(args=[plugin_path, username])
+    except Exception:
+        logger.exception("Could not schedule a validation refresh for %s"
+                         % username)
+        redis_connection().delete(refresh_key)
+
+
+def validate_user(plugin_class, user, force=False):
+    """
+    Return the (cached) result of 'plugin_class' for 'user'
+    force=True -- Ignore the cache and ask the plugin.
+    """
+    ttl, negative_ttl = get_validation_ttls(plugin_class)
+    if force or not (ttl or negative_ttl):
+        return refresh_validation(plugin_class, user)
+    plugin_path = get_plugin_path(plugin_class)
+    entry = _get_entry(VALIDATION_KEY.format(plugin_path, user.username))
+    if not entry:
+        return refresh_validation(plugin_class, user)
+    is_valid, fresh_until = entry
+    if time.time() > fresh_until:
+        _schedule_refresh(plugin_path, user.username)
+    return is_valid
+
+
+def invalidate_validation(user):
+    """
+    Drop the cached results of 'user', the next is_valid asks the plugins.
+    """
+    keys = [VALIDATION_KEY.format(get_plugin_path(plugin_class),
+                                  user.username)
+            for plugin_class in load_validation_plugins()]
+    if not keys:
+        return
+    try:
+        redis_connection().delete(*keys)
+    except redis.exceptions.ConnectionError:
+        logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                     "Could not invalidate the validation of %s" % user)
+
+
+def refresh_validation_for(plugin_path, username):
+    """
+    Used by the 'refresh_user_validation' task.
+    """
+    from core.models import AtmosphereUser
+    user = AtmosphereUser.objects.get(username=username)
+    return refresh_validation(load_plugin(plugin_path), user)
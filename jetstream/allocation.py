@@ -2,7 +2,7 @@ import logging
 
 from django.conf import settings
 
-from .exceptions import TASAPIException
+from .exceptions import TASAPIException, NoTaccUserForXsedeException
 from .api import tacc_api_post, tacc_api_get
 from core.models.allocation_source import AllocationSource, UserAllocationSource
 
@@ -40,7 +40,7 @@ class TASAPIDriver(object):
         resp, data = tacc_api_get(url_match)
         try:
             if data['status'] != 'success':
-                raise TASAPIException(
+                raise NoTaccUserForXsedeException(
                     "NO valid username found for %s" % xsede_username)
             tacc_username = data['result']
             return tacc_username
@@ -10,6 +10,13 @@ class TASAPIException(Exception):
     """
     pass
 
+
+class NoTaccUserForXsedeException(TASAPIException):
+    """
+    TAS answered, but knows no TACC user for the XSEDE username
+    """
+    pass
+
 class TASPluginException(Exception):
     """
     This exception is raised when something has changed with the Jetstream
@@ -1,10 +1,15 @@
 from jetstream.allocation import TASAPIDriver
-from jetstream.exceptions import TASAPIException
+from jetstream.exceptions import (
+    NoTaccUserForXsedeException, TASAPIException)
 
 from atmosphere.plugins.auth.validation import ValidationPlugin
 from threepio import logger
 
 class XsedeProjectRequired(ValidationPlugin):
+    # Each validation makes two TAS API calls, see core.validation
+    cache_ttl = 60 * 60
+    negative_cache_ttl = 5 * 60
+
     def validate_user(self, user):
         """
         Validates an account based on the business logic assigned by jetstream.
@@ -19,9 +24,15 @@ class XsedeProjectRequired(ValidationPlugin):
             if not project_allocations:
                 return False
             return True
+        except NoTaccUserForXsedeException:
+            # TAS answered: Not an XSEDE user (cached as invalid)
+            logger.info("User %s has no TACC username" % user)
+            return False
         except TASAPIException:
+            # TAS could not answer (5xx, malformed response..): Not cached,
+            # the next call asks TAS again
             logger.exception("Could not validate user: %s" % user)
-            return False
+            raise
 
 
 def assign_allocation(username):
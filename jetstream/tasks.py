@@ -6,6 +6,7 @@ from django.db.models import Q
 from django.utils import timezone
 
 from celery.decorators import task
+from atmosphere.db_router import use_replica
 from core.models.allocation_source import total_usage
 from core.models.allocation_source import (
     UserAllocationSource, AllocationSourceSnapshot,
@@ -134,7 +135,9 @@ def update_snapshot():
             # determine end date and start date using last snapshot
             start_date = user.date_joined
             # calculate compute used and burn rate for the user and allocation source combo
-            compute_used, burn_rate = total_usage(user.username,start_date,allocation_source_name=source.name,end_date=end_date,burn_rate=True)
+            # Read from the replica, the events below are written to 'default'
+            with use_replica():
+                compute_used, burn_rate = total_usage(user.username,start_date,allocation_source_name=source.name,end_date=end_date,burn_rate=True)
 
             allocation_source_total_compute[source.name] = allocation_source_total_compute.get(source.name,0) + compute_used
             allocation_source_total_burn_rate[source.name] = allocation_source_total_burn_rate.get(source.name,0) + burn_rate
@@ -70,3 +70,135 @@ class TestJetstream(TestCase):
         self.assertEquals(len(projects), len(result))
         self.assertEquals(projects[0], result[0])
         self.assertEquals(projects[-1], result[-1])
+
+
+class StubTASServer(object):
+    """
+    A local stand-in for the TAS API.
+    'users' maps xsede username -> (tacc username, [resource names])
+    Every request path is recorded in 'requests'.
+    """
+
+    def __init__(self, users=None):
+        import threading
+        from BaseHTTPServer import BaseHTTPRequestHandler, HTTPServer
+        self.users = users or {}
+        self.requests = []
+        # Answer every request with a 500 (ex: a TAS outage)
+        self.failing = False
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                stub.requests.append(self.path)
+                status, body = stub.respond(self.path)
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.end_headers()
+                self.wfile.write(json.dumps(body))
+
+            def log_message(self, *args):
+                pass
+
+        self.server = HTTPServer(('127.0.0.1', 0), Handler)
+        self.url = 'http://127.0.0.1:%s' % self.server.server_port
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.daemon = True
+
+    def respond(self, path):
+        if self.failing:
+            return 500, {'status': 'error', 'result': None}
+        parts = path.strip('/').split('/')
+        if parts[:3] == ['v1', 'users', 'xsede']:
+            user = self.users.get(parts[3])
+            if not user:
+                return 200, {'status': 'error', 'result': None}
+            return 200, {'status': 'success', 'result': user[0]}
+        if parts[:3] == ['v1', 'projects', 'username']:
+            for tacc_username, resources in self.users.values():
+                if tacc_username != parts[3]:
+                    continue
+                allocations = [{'id': idx, 'resource': resource}
+                               for idx, resource in enumerate(resources)]
+                return 200, {'status': 'success', 'result': [
+                    {'id': 1, 'allocations': allocations}]}
+            return 200, {'status': 'success', 'result': []}
+        return 404, {'status': 'error', 'result': None}
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class TestValidationCache(TestCase):
+    """Tests for cached XsedeProjectRequired validation"""
+
+    def setUp(self):
+        from django.test.utils import override_settings
+        from core.models import AtmosphereUser
+        self.tas = StubTASServer(users={
+            'valid_user': ('tg000001', ['Jetstream']),
+            'other_user': ('tg000002', ['Stampede']),
+        }).start()
+        self.settings_override = override_settings(
+            TACC_API_URL=self.tas.url,
+            TACC_API_USER='stub',
+            TACC_API_PASS='stub',
+            VALIDATION_PLUGINS=[
+                'jetstream.plugins.auth.validation.XsedeProjectRequired'])
+        self.settings_override.enable()
+        # Creating a user drops its cached validation
+        self.valid_user = AtmosphereUser.objects.create(
+            username='valid_user')
+        self.invalid_user = AtmosphereUser.objects.create(
+            username='other_user')
+
+    def tearDown(self):
+        self.settings_override.disable()
+        self.tas.stop()
+
+    def test_valid_result_is_cached(self):
+        self.assertTrue(self.valid_user.is_valid())
+        self.assertEquals(len(self.tas.requests), 2)
+        self.assertTrue(self.valid_user.is_valid())
+        self.assertEquals(len(self.tas.requests), 2)
+
+    def test_invalid_result_is_cached(self):
+        self.assertFalse(self.invalid_user.is_valid())
+        requests_made = len(self.tas.requests)
+        self.assertFalse(self.invalid_user.is_valid())
+        self.assertEquals(len(self.tas.requests), requests_made)
+
+    def test_unknown_user_is_cached(self):
+        from core.models import AtmosphereUser
+        unknown_user = AtmosphereUser.objects.create(username='not_xsede')
+        self.assertFalse(unknown_user.is_valid())
+        self.assertEquals(len(self.tas.requests), 1)
+        self.assertFalse(unknown_user.is_valid())
+        self.assertEquals(len(self.tas.requests), 1)
+
+    def test_force_skips_the_cache(self):
+        self.assertTrue(self.valid_user.is_valid())
+        self.assertTrue(self.valid_user.is_valid(force=True))
+        self.assertEquals(len(self.tas.requests), 4)
+
+    def test_errors_are_not_cached(self):
+        self.tas.failing = True
+        self.assertFalse(self.valid_user.is_valid())
+        self.tas.failing = False
+        self.assertTrue(self.valid_user.is_valid())
+
+    def test_removing_an_allocation_source_invalidates(self):
+        from core.models import AllocationSource, UserAllocationSource
+        source = AllocationSource.objects.create(
+            name='TG-000001', source_id='1', compute_allowed=1000)
+        self.assertTrue(self.valid_user.is_valid())
+        requests_made = len(self.tas.requests)
+        UserAllocationSource.objects.create(
+            user=self.valid_user, allocation_source=source).delete()
+        self.assertTrue(self.valid_user.is_valid())
+        self.assertEquals(len(self.tas.requests), requests_made + 2)
@@ -2,11 +2,14 @@ from dateutil.parser import parse
 import pytz
 import datetime
 from django.db.models.query import Q
+from atmosphere.db_router import use_replica
 from core.models.event_table import EventTable
 from core.models.instance import Instance
+from core.models.instance_history import timelines_for
 from core.models.allocation_source import UserAllocationSource, AllocationSource
 
 
+@use_replica()
 def create_report(report_start_date, report_end_date, user_id=None, allocation_source_name=None):
     if not report_start_date or not report_end_date:
         raise Exception("start date and end date missing for allocation calculation function")
@@ -55,7 +58,7 @@ def filter_events_and_instances(report_start_date, report_end_date, username=Non
         Q(
             Q(start_date__lte=report_start_date) & Q(Q(end_date__isnull=True) | Q(end_date__gte=report_end_date))
         )
-    )
+    ).select_related('created_by')
     if username:
         from core.models.user import AtmosphereUser
         user_id_int = AtmosphereUser.objects.get(username=username)
@@ -75,13 +78,11 @@ def group_events_by_instances(events):
 
 def get_all_histories_for_instance(instances, report_start_date, report_end_date):
     histories = {}
+    # All histories are loaded at once
+    timelines = timelines_for(instances)
     for instance in instances:
-        histories[instance.provider_alias] = instance.instancestatushistory_set.filter(
-                ~Q(start_date__gte=report_end_date) & 
-                ~Q(
-                    Q(end_date__isnull=False) & Q(end_date__lte=report_start_date)
-                  )
-            )
+        histories[instance.provider_alias] = timelines[instance.id].between(
+            report_start_date, report_end_date)
 
     return histories
 
@@ -0,0 +1,116 @@
+"""
+Bulk changes of the allocation source used by instances.
+"""
+from uuid import uuid4
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.utils import timezone
+
+from threepio import logger
+
+from core.models.allocation_source import (
+    AllocationSource, InstanceAllocationSourceSnapshot)
+from core.models.event_table import EventTable
+from core.models.instance import Instance
+
+
+INSTANCE_SOURCE_EVENT = "instance_allocation_source_changed"
+# Run by upsert_instance_snapshots, not once per event
+SNAPSHOT_LISTENER = "listen_for_instance_allocation_changes"
+
+
+def _instances_for(user, instance_ids):
+    """
+    Return the instances of 'user' named by 'instance_ids' (provider_alias)
+    in a single query, raise ValueError if any are missing.
+    """
+    instances = Instance.objects.all() if user.is_staff \
+        else Instance.objects.filter(created_by=user)
+    instances = list(instances.filter(
+        provider_alias__in=instance_ids, end_date__isnull=True))
+    missing = set(instance_ids) - set(
+        instance.provider_alias for instance in instances)
+    if missing:
+        raise ValueError(
+            "Instances %s do not exist or are not owned by %s"
+            % (", ".join(sorted(missing)), user.username))
+    return instances
+
+
+def upsert_instance_snapshots(instances, allocation_source, now_time=None):
+    """
+    Point the InstanceAllocationSourceSnapshot of every instance to
+    'allocation_source' (a single statement on PostgreSQL 9.5+)
+    """
+    if not instances:
+        return
+    if not now_time:
+        now_time = timezone.now()
+    instance_ids = [instance.id for instance in instances]
+    if connection.vendor == 'postgresql' and connection.pg_version >= 90500:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "INSERT INTO %s (instance_id, allocation_source_id, updated)"
+                " SELECT unnest(%%s::int[]), %%s, %%s"
+                " ON CONFLICT (instance_id) DO UPDATE"
+                " SET allocation_source_id = EXCLUDED.allocation_source_id,"
+                " updated = EXCLUDED.updated"
+                % InstanceAllocationSourceSnapshot._meta.db_table,
+                [instance_ids, allocation_source.id, now_time])
+        return
+    snapshots = InstanceAllocationSourceSnapshot.objects.filter(
+        instance__id__in=instance_ids)
+    existing = set(snapshots.values_list('instance_id', flat=True))
+    snapshots.update(allocation_source=allocation_source, updated=now_time)
+    InstanceAllocationSourceSnapshot.objects.bulk_create([
+        InstanceAllocationSourceSnapshot(
+            instance=instance, allocation_source=allocation_source)
+        for instance in instances if instance.id not in existing])
+
+
+def change_allocation_sources(user, instance_ids, allocation_source_id):
+    """
+    Change the allocation source of many instances at once: one
+    'instance_allocation_source_changed' event per instance, created
+    with bulk_create, and one snapshot upsert.
+
+    instance_ids -- provider_alias of each instance (owned by 'user')
+    allocation_source_id -- source_id of an allocation source of 'user'
+    Returns the new events, raises ValueError on invalid input.
+    """
+    from service.event_bus import publish_event
+    if not settings.USE_ALLOCATION_SOURCE:
+        return []
+    instance_ids = set(instance_ids)
+    if not instance_ids:
+        raise ValueError("At least one instance is required")
+    sources = AllocationSource.objects.all() if user.is_staff \
+        else AllocationSource.for_user(user)
+    allocation_source = sources.filter(
+        source_id=allocation_source_id).first()
+    if not allocation_source:
+        raise ValueError("AllocationSource with source_id=%s DoesNotExist"
+                         % allocation_source_id)
+    instances = _instances_for(user, instance_ids)
+    now_time = timezone.now()
+    events = [
+        EventTable(
+            uuid=uuid4(), name=INSTANCE_SOURCE_EVENT,
+            entity_id=instance.provider_alias, timestamp=now_time,
+            payload={'allocation_source_id': allocation_source.source_id,
+                     'instance_id': instance.provider_alias,
+                     'username': user.username})
+        for instance in instances]
+    with transaction.atomic():
+        EventTable.objects.bulk_create(events)
+        upsert_instance_snapshots(instances, allocation_source, now_time)
+        # bulk_create sends no post_save (and sets no ids), the remaining
+        # listeners (ex: the usage ledger) are published here.
+        events = list(EventTable.objects.filter(
+            uuid__in=[event.uuid for event in events]))
+        for event in events:
+            publish_event(event, skip=[SNAPSHOT_LISTENER])
+    logger.info("User %s changed the allocation source of %s instances to %s"
+                % (user.username, len(instances), allocation_source))
+    return events
@@ -19,6 +19,7 @@ VOLUMES_KEY_PROVIDER = "volumes.{0}"
 VOLUMES_KEY_IDENTITY = "volumes.{0}.{1}"
 MACHINES_KEY_PROVIDER = "machines.{0}"
 MACHINES_KEY_IDENTITY = "machines.{0}.{1}"
+ALLOCATION_USAGE_KEY = "allocation_usage.{0}"
 
 
 def _get_cached_admin_driver(provider, force=True):
@@ -175,3 +176,46 @@ def invalidate_cached_machines(provider=None, identity=None):
         key = MACHINES_KEY_IDENTITY.format(identity.created_by.username,
                                            identity.id)
     _invalidate(key)
+
+
+def cache_allocation_usage(identity, usage, updated=None):
+    """
+    Store the result of 'identity.get_allocation_usage()'
+    Returns (usage, updated)
+    """
+    if not updated:
+        updated = timezone.now()
+    key = ALLOCATION_USAGE_KEY.format(identity.id)
+    try:
+        redis_connection().set(
+            key, pickle.dumps((usage, updated)),
+            ex=getattr(settings, 'ALLOCATION_USAGE_CACHE_TTL', 15 * 60))
+    except redis.exceptions.ConnectionError:
+        logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                     "Somebody should turn it on!")
+    return (usage, updated)
+
+
+def get_cached_allocation_usage(identity, force=False):
+    """
+    Return (usage, updated) for 'identity', running the allocation
+    engine only if no snapshot exists (or force=True)
+    """
+    data = None
+    if not force:
+        try:
+            data = redis_connection().get(
+                ALLOCATION_USAGE_KEY.format(identity.id))
+        except redis.exceptions.ConnectionError:
+            logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                         "Somebody should turn it on!")
+    if data:
+        return pickle.loads(data)
+    return cache_allocation_usage(identity, identity.get_allocation_usage())
+
+
+def invalidate_allocation_usage(identity_id):
+    try:
+        _invalidate(ALLOCATION_USAGE_KEY.format(identity_id))
+    except redis.exceptions.ConnectionError:
+        pass
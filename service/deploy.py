@@ -4,6 +4,7 @@ Deploy methods for Atmosphere
 import os
 import re
 import subprocess
+import threading
 import time
 
 from django.template import Context
@@ -93,6 +94,99 @@ class LoggedScriptDeployment(ScriptDeployment):
         return node
 
 
+class DeploymentContext(object):
+    """
+    The ansible configuration shared by every deployment in this process:
+    * check_ansible/configure_ansible results
+    * the group_vars_map
+    * the playbook files in each playbooks directory
+    Loaded once, and re-loaded only when the modification time of
+    a watched file or directory changes.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._mtimes = {}
+        self.ansible_exists = False
+        self.group_vars_map = {}
+        self.playbooks = {}
+        # Setup time statistics (seconds)
+        self.setup_count = 0
+        self.setup_total = 0.0
+        self.reload_count = 0
+
+    def _watched_paths(self):
+        return [settings.ANSIBLE_PLAYBOOKS_DIR,
+                settings.ANSIBLE_ROLES_PATH,
+                settings.ANSIBLE_GROUP_VARS_DIR,
+                settings.ANSIBLE_HOST_FILE,
+                settings.ANSIBLE_CONFIG_FILE]
+
+    def _mtime(self, path):
+        try:
+            return os.stat(path).st_mtime
+        except (OSError, TypeError):
+            return None
+
+    def _is_stale(self):
+        if not self._mtimes:
+            return True
+        return any(self._mtime(path) != mtime
+                   for path, mtime in self._mtimes.items())
+
+    def _reload(self):
+        self.ansible_exists = check_ansible()
+        self.group_vars_map = {}
+        self.playbooks = {}
+        if self.ansible_exists:
+            configure_ansible()
+            self.group_vars_map = {
+                filename: os.path.join(
+                    settings.ANSIBLE_GROUP_VARS_DIR, filename)
+                for filename in os.listdir(settings.ANSIBLE_GROUP_VARS_DIR)}
+        self._mtimes = {path: self._mtime(path)
+                        for path in self._watched_paths()}
+        self.reload_count += 1
+
+    def load(self):
+        """
+        Return the context, re-loading it first if any file has changed.
+        """
+        with self._lock:
+            if self._is_stale():
+                self._reload()
+        return self
+
+    def list_playbooks(self, playbook_dir):
+        """
+        Cached 'os.listdir' of a playbooks directory.
+        """
+        with self._lock:
+            mtime = self._mtime(playbook_dir)
+            if playbook_dir not in self._mtimes \
+                    or self._mtimes[playbook_dir] != mtime:
+                self.playbooks[playbook_dir] = sorted(os.listdir(playbook_dir))
+                self._mtimes[playbook_dir] = mtime
+            return self.playbooks[playbook_dir]
+
+    def record_setup(self, seconds):
+        self.setup_count += 1
+        self.setup_total += seconds
+
+    @property
+    def average_setup_time(self):
+        if not self.setup_count:
+            return 0.0
+        return self.setup_total / self.setup_count
+
+
+_deployment_context = DeploymentContext()
+
+
+def get_deployment_context():
+    return _deployment_context.load()
+
+
 def ansible_deployment(
     instance_ip, username, instance_id, playbooks_dir,
     limit_playbooks=[], limit_hosts={}, extra_vars={},
@@ -100,7 +194,9 @@ def ansible_deployment(
     """
     Use service.ansible to deploy to an instance.
     """
-    if not check_ansible():
+    setup_start = time.time()
+    context = get_deployment_context()
+    if not context.ansible_exists:
         return []
     logger = create_instance_logger(
         deploy_logger,
@@ -108,7 +204,6 @@ def ansible_deployment(
         username,
         instance_id)
     hostname = build_host_name(instance_id, instance_ip)
-    configure_ansible()
     if not limit_hosts:
         limit_hosts = {"hostname": hostname, "ip": instance_ip}
     host_file = settings.ANSIBLE_HOST_FILE
@@ -121,6 +216,11 @@ def ansible_deployment(
     extra_vars.update({
         "ATMOUSERNAME": username,
     })
+    setup_time = time.time() - setup_start
+    context.record_setup(setup_time)
+    logger.debug("Deployment setup took %.4fs (average: %.4fs over %s deploys)"
+                 % (setup_time, context.average_setup_time,
+                    context.setup_count))
     pbs = execute_playbooks(
         playbooks_dir, host_file, extra_vars, limit_hosts,
         logger=logger, limit_playbooks=limit_playbooks)
@@ -129,6 +229,46 @@ def ansible_deployment(
     return pbs
 
 
+def ansible_batch_deployment(
+    hosts, playbooks_dir, limit_playbooks=[], extra_vars={}, forks=None):
+    """
+    Use service.ansible to deploy to many instances with a single run of
+    the playbooks.
+    'hosts' is a list of dicts: {'instance_id': ..., 'ip': ..., 'username': ...}
+    Variables specific to an instance (ATMOUSERNAME, TIMEZONE) are set as
+    host variables, 'extra_vars' are shared by every host.
+
+    Returns a dict of instance_id -> error message ('' on success)
+    """
+    if not get_deployment_context().ansible_exists:
+        return {host['instance_id']: '' for host in hosts}
+    host_vars = {}
+    for host in hosts:
+        host['hostname'] = build_host_name(host['instance_id'], host['ip'])
+        instance_vars = {
+            "ATMOUSERNAME": host['username'],
+        }
+        identity = Identity.find_instance(host['instance_id'])
+        if identity:
+            instance_vars["TIMEZONE"] = identity.provider.timezone
+        host_vars[host['hostname']] = instance_vars
+        host_vars[host['ip']] = instance_vars
+    # NOTE: subspace passes 'hostname' to inventory.subset(),
+    # so an ansible host pattern ('a:b:c') can be used to limit the run.
+    limit_hosts = {
+        "hostname": ":".join(host['hostname'] for host in hosts)}
+    if not forks:
+        forks = getattr(settings, 'ANSIBLE_BATCH_FORKS', 20)
+    pbs = execute_playbooks(
+        playbooks_dir, settings.ANSIBLE_HOST_FILE, dict(extra_vars),
+        limit_hosts, logger=deploy_logger,
+        limit_playbooks=limit_playbooks, host_vars=host_vars, forks=forks)
+    return {
+        host['instance_id']: get_playbook_errors(
+            pbs, host['ip'], host['hostname'])
+        for host in hosts}
+
+
 def ready_to_deploy(instance_ip, username, instance_id):
     """
     Use service.ansible to deploy to an instance.
@@ -158,6 +298,22 @@ def instance_deploy(instance_ip, username, instance_id,
         extra_vars=extra_vars)
 
 
+def instance_deploy_batch(hosts, limit_playbooks=[], forks=None):
+    """
+    Use service.ansible to deploy to many instances at once.
+    See 'ansible_batch_deployment' for the format of 'hosts'
+    """
+    extra_vars = {
+        "VNCLICENSE": secrets.ATMOSPHERE_VNC_LICENSE,
+    }
+    playbooks_dir = settings.ANSIBLE_PLAYBOOKS_DIR
+    playbooks_dir = os.path.join(playbooks_dir, 'instance_deploy')
+
+    return ansible_batch_deployment(
+        hosts, playbooks_dir, limit_playbooks=limit_playbooks,
+        extra_vars=extra_vars, forks=forks)
+
+
 def user_deploy(instance_ip, username, instance_id):
     """
     Use service.ansible to deploy to an instance.
@@ -218,23 +374,38 @@ def _get_user_keys(username):
 
 def execute_playbooks(playbook_dir, host_file, extra_vars, my_limit,
                       logger=None, limit_playbooks=None,
-                      runner_strategy='all', **runner_opts):
+                      runner_strategy='all', host_vars=None, **runner_opts):
     # Force requirement of a logger for 2.0 playbook runs
     if not logger:
         logger = deploy_logger
     if runner_strategy == 'single':
         return _one_runner_one_playbook_execution(
             playbook_dir, host_file, extra_vars, my_limit,
-            logger=logger, limit_playbooks=limit_playbooks, **runner_opts)
+            logger=logger, limit_playbooks=limit_playbooks,
+            host_vars=host_vars, **runner_opts)
     else:
         return _one_runner_all_playbook_execution(
             playbook_dir, host_file, extra_vars, my_limit,
-            logger=logger, limit_playbooks=limit_playbooks, **runner_opts)
+            logger=logger, limit_playbooks=limit_playbooks,
+            host_vars=host_vars, **runner_opts)
+
+
+def _set_host_vars(runner, host_vars):
+    """
+    Add variables specific to each host in the runner's inventory.
+    'host_vars' is a dict of hostname -> {variable: value}
+    """
+    if not host_vars:
+        return
+    for host in runner.inventory.get_hosts():
+        for key, value in host_vars.get(host.name, {}).items():
+            runner.variable_manager.set_host_variable(host, key, value)
 
 
 def _one_runner_all_playbook_execution(
         playbook_dir, host_file, extra_vars, my_limit,
-        logger=None, limit_playbooks=None, **runner_opts):
+        logger=None, limit_playbooks=None, host_vars=None, **runner_opts):
+    context = get_deployment_context()
     runner = Runner.factory(
             host_file,
             playbook_dir,
@@ -243,19 +414,18 @@ def _one_runner_all_playbook_execution(
             logger=logger,
             limit_playbooks=limit_playbooks,
             # Use atmosphere settings
-            group_vars_map={
-                filename: os.path.join(
-                    settings.ANSIBLE_GROUP_VARS_DIR, filename)
-                for filename in os.listdir(settings.ANSIBLE_GROUP_VARS_DIR)},
+            group_vars_map=context.group_vars_map,
             private_key_file=settings.ATMOSPHERE_PRIVATE_KEYFILE,
             **runner_opts)
+    _set_host_vars(runner, host_vars)
     runner.run()
     return runner
 
 
 def _one_runner_one_playbook_execution(
         playbook_dir, host_file, extra_vars, my_limit,
-        logger=None, limit_playbooks=None, **runner_opts):
+        logger=None, limit_playbooks=None, host_vars=None, **runner_opts):
+    context = get_deployment_context()
     runners = [Runner.factory(
             host_file,
             os.path.join(playbook_dir, playbook_path),
@@ -264,15 +434,14 @@ def _one_runner_one_playbook_execution(
             logger=logger,
             limit_playbooks=limit_playbooks,
             # Use atmosphere settings
-            group_vars_map={
-                filename: os.path.join(
-                    settings.ANSIBLE_GROUP_VARS_DIR, filename)
-                for filename in os.listdir(settings.ANSIBLE_GROUP_VARS_DIR)},
+            group_vars_map=context.group_vars_map,
             private_key_file=settings.ATMOSPHERE_PRIVATE_KEYFILE,
             **runner_opts)
-        for playbook_path in os.listdir(playbook_dir)
+        for playbook_path in context.list_playbooks(playbook_dir)
         if not limit_playbooks or playbook_path in limit_playbooks]
-    [runner.run() for runner in runners]
+    for runner in runners:
+        _set_host_vars(runner, host_vars)
+        runner.run()
     return runners
 
 
@@ -399,6 +568,16 @@ def execution_has_failures(pbs, hostname):
 def raise_playbook_errors(pbs, instance_ip, hostname, allow_failures=False):
     """
     """
+    error_message = get_playbook_errors(
+        pbs, instance_ip, hostname, allow_failures=allow_failures)
+    if error_message:
+        raise AnsibleDeployException(error_message)
+
+
+def get_playbook_errors(pbs, instance_ip, hostname, allow_failures=False):
+    """
+    Return the error message for a single host, '' if the host succeeded.
+    """
     if not type(pbs) == list:
         pbs = [pbs]
     error_message = ""
@@ -418,8 +597,8 @@ def raise_playbook_errors(pbs, instance_ip, hostname, allow_failures=False):
                 error_message += playbook_error_message(
                     pb.stats.failures[instance_ip], "Failures")
     if error_message:
-        msg = error_message[:-2] + str(pb.stats.processed_playbooks.get(hostname,{}))
-        raise AnsibleDeployException(msg)
+        return error_message[:-2] + str(pb.stats.processed_playbooks.get(hostname,{}))
+    return ''
 
 
 def sync_instance():
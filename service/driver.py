@@ -151,7 +151,7 @@ def get_esh_map(core_provider):
     initialize the provider/identity/driver from 'the map'
     """
     try:
-        provider_name = core_provider.type.name.lower()
+        provider_name = core_provider.get_type_name().lower()
         return ESH_MAP[provider_name]
     except Exception as e:
         logger.exception(e)
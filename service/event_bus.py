@@ -0,0 +1,176 @@
+"""
+Event bus for the EventTable listeners (See core.models.event_table)
+
+Saving an event runs the listeners in EVENT_BUS_SYNC_LISTENERS (cheap
+snapshot upserts) inline and persists an EventDelivery for every other
+listener. Deliveries are run by the 'dispatch_events' task:
+* One entity_id at a time (a SingleFlightLock per entity_id), in the order
+  the events were created.
+* A failed delivery is retried after EVENT_BUS_RETRY_DELAY seconds
+  (doubled on each attempt), later events of the entity wait for it.
+* After EVENT_BUS_MAX_ATTEMPTS the delivery is 'dead' (kept, with its
+  error, see EventDelivery.requeue_dead) and the entity moves on.
+"""
+from datetime import timedelta
+import traceback
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+import redis
+
+from threepio import celery_logger, logger
+
+from core.models.event_table import (
+    EventDelivery, EventTable, get_listener, listeners_for)
+from service.locks import SingleFlightLock
+
+
+DISPATCH_TASK = "dispatch_events"
+
+
+def _run_listener(listener, event):
+    return listener(sender=EventTable, instance=event, created=True, raw=False)
+
+
+def publish_event(event, skip=()):
+    """
+    Run (or queue) the listeners of a newly created 'event'
+    skip -- Names of listeners that should not run
+    """
+    is_async = getattr(settings, 'EVENT_BUS_ASYNC', True)
+    sync_listeners = getattr(settings, 'EVENT_BUS_SYNC_LISTENERS', [])
+    deliveries = []
+    for listener in listeners_for(event.name):
+        if listener.__name__ in skip:
+            continue
+        if not is_async or listener.__name__ in sync_listeners:
+            _run_listener(listener, event)
+        else:
+            deliveries.append(
+                EventDelivery(event=event, listener=listener.__name__))
+    if deliveries:
+        EventDelivery.objects.bulk_create(deliveries)
+        entity_id = event.entity_id
+        transaction.on_commit(lambda: publish(entity_id))
+    return deliveries
+
+
+def publish(entity_id, eta=None):
+    from core.tasks import dispatch_events
+    dispatch_events.apply_async(args=[entity_id], eta=eta)
+
+
+def _retry_delay(attempts):
+    delay = getattr(settings, 'EVENT_BUS_RETRY_DELAY', 60)
+    return timedelta(seconds=delay * 2 ** (attempts - 1))
+
+
+def deliver(delivery):
+    """
+    Run the listener of 'delivery'. Returns True if it succeeded.
+    """
+    listener = get_listener(delivery.listener)
+    delivery.attempts += 1
+    try:
+        if not listener:
+            raise LookupError("Unknown listener %s" % delivery.listener)
+        with transaction.atomic():
+            _run_listener(listener, delivery.event)
+    except Exception:
+        delivery.error = traceback.format_exc()
+        max_attempts = getattr(settings, 'EVENT_BUS_MAX_ATTEMPTS', 5)
+        if not listener or delivery.attempts >= max_attempts:
+            delivery.status = EventDelivery.DEAD
+            logger.error("Event %s: %s failed %s times and is dead:\n%s"
+                         % (delivery.event_id, delivery.listener,
+                            delivery.attempts, delivery.error))
+        else:
+            delivery.next_attempt = timezone.now() + \
+                _retry_delay(delivery.attempts)
+            logger.warn("Event %s: %s failed, retrying at %s"
+                        % (delivery.event_id, delivery.listener,
+                           delivery.next_attempt))
+        delivery.save()
+        return False
+    delivery.status = EventDelivery.DELIVERED
+    delivery.error = ''
+    delivery.save()
+    return True
+
+
+def _deliver_pending(entity_id):
+    """
+    Deliver the pending deliveries of 'entity_id' in order, stopping at
+    the first one that has to wait.
+    Returns (number delivered, time of the next attempt or None)
+    """
+    delivered = 0
+    deliveries = EventDelivery.objects.filter(
+        event__entity_id=entity_id, status=EventDelivery.PENDING
+    ).select_related('event').order_by('event__id', 'id')
+    for delivery in deliveries:
+        if delivery.next_attempt > timezone.now():
+            return delivered, delivery.next_attempt
+        if deliver(delivery):
+            delivered += 1
+        elif delivery.status == EventDelivery.PENDING:
+            return delivered, delivery.next_attempt
+    return delivered, None
+
+
+def dispatch_entity(entity_id):
+    """
+    Deliver the pending events of 'entity_id' (See 'dispatch_events')
+    Returns the number of deliveries that succeeded.
+    """
+    lease = getattr(settings, 'EVENT_BUS_LOCK_LEASE', 10 * 60)
+    lock = SingleFlightLock(DISPATCH_TASK, entity_id, lease=lease)
+    try:
+        if not lock.acquire():
+            # Picked up by the run holding the lock, once it completes.
+            lock.request_rerun([entity_id], {})
+            return 0
+    except redis.exceptions.ConnectionError:
+        celery_logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                            "Dispatching events of %s without a lock."
+                            % entity_id)
+        lock = None
+    rerun = None
+    try:
+        if lock:
+            # A slow listener (ex: an email) must not lose the lock
+            with lock.keep_alive():
+                delivered, retry_at = _deliver_pending(entity_id)
+        else:
+            delivered, retry_at = _deliver_pending(entity_id)
+    finally:
+        if lock:
+            try:
+                if lock.release():
+                    rerun = lock.pop_rerun()
+            except redis.exceptions.ConnectionError:
+                pass
+    if retry_at:
+        publish(entity_id, eta=retry_at)
+    elif rerun:
+        publish(entity_id)
+    return delivered
+
+
+def redispatch_pending(grace=None):
+    """
+    Publish every entity_id with deliveries that should have run by now
+    (ex: the broker lost the message). Returns the entity_ids published.
+    """
+    if grace is None:
+        grace = timedelta(
+            seconds=getattr(settings, 'EVENT_BUS_LOCK_LEASE', 10 * 60))
+    entity_ids = set(EventDelivery.objects.filter(
+        status=EventDelivery.PENDING,
+        next_attempt__lt=timezone.now() - grace
+    ).values_list('event__entity_id', flat=True).distinct())
+    for entity_id in entity_ids:
+        publish(entity_id)
+    return entity_ids
@@ -0,0 +1,245 @@
+"""
+Single-flight locks for periodic celery fan-out.
+
+A periodic task (monitor_instances, ...) publishes one '*_for' subtask
+per provider. The lock, keyed by (task name, provider), is taken when the
+subtask is published and released when it finishes, so a slow provider
+never has more than one run queued or executing at a time.
+
+If the lock is already held the new run is either skipped, or 'coalesced'
+into a single follow-up run that is published when the current one ends.
+Leases expire so a lost worker can not hold a lock forever, a run that is
+still working extends its lease (See SingleFlightLock.keep_alive).
+
+Each acquire stores a unique token: only the holder of that token can
+extend or release the lock. The token is passed to the '*_for' task in
+the SINGLE_FLIGHT_TOKEN kwarg, a direct (synchronous) call has no token
+and leaves the lock alone.
+"""
+from contextlib import contextmanager
+from functools import wraps
+import cPickle as pickle
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.utils import timezone
+
+import redis
+
+from threepio import celery_logger
+
+from service.cache import redis_connection
+
+
+LOCK_KEY = "single_flight.{0}.{1}"
+RERUN_KEY = "single_flight.{0}.{1}.rerun"
+DURATIONS_KEY = "single_flight.durations"
+SINGLE_FLIGHT_TOKEN = "single_flight_token"
+
+# Compare-and-delete/expire: only the holder of the token (ARGV[1])
+RELEASE_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('DEL', KEYS[1])
+end
+return 0
+"""
+EXTEND_SCRIPT = """
+if redis.call('GET', KEYS[1]) == ARGV[1] then
+    return redis.call('EXPIRE', KEYS[1], ARGV[2])
+end
+return 0
+"""
+
+
+def get_lease(task_name):
+    """
+    Return the lease (in seconds) for locks on 'task_name'
+    """
+    leases = getattr(settings, 'SINGLE_FLIGHT_LEASES', {})
+    return leases.get(
+        task_name, getattr(settings, 'SINGLE_FLIGHT_DEFAULT_LEASE', 60 * 60))
+
+
+class SingleFlightLock(object):
+
+    def __init__(self, task_name, provider_key, lease=None, token=None):
+        self.task_name = task_name
+        self.provider_key = provider_key
+        self.key = LOCK_KEY.format(task_name, provider_key)
+        self.rerun_key = RERUN_KEY.format(task_name, provider_key)
+        self.lease = lease or get_lease(task_name)
+        # Set by acquire(), or passed along by the process that acquired
+        self.token = token
+
+    def acquire(self):
+        """
+        Returns True if the lock was free (and is now held)
+        """
+        token = "%s|%s" % (timezone.now().isoformat(), uuid.uuid4().hex)
+        r = redis_connection()
+        if not r.set(self.key, token, nx=True, ex=self.lease):
+            return False
+        self.token = token
+        return True
+
+    def release(self):
+        """
+        Release the lock, if it is still held with our token.
+        Returns True if it was.
+        """
+        if not self.token:
+            return False
+        token, self.token = self.token, None
+        return bool(redis_connection().eval(
+            RELEASE_SCRIPT, 1, self.key, token))
+
+    def extend(self):
+        """
+        Restart the lease, if the lock is still held with our token.
+        """
+        if not self.token:
+            return False
+        return bool(redis_connection().eval(
+            EXTEND_SCRIPT, 1, self.key, self.token, int(self.lease)))
+
+    @contextmanager
+    def keep_alive(self):
+        """
+        Extend the lease every third of it while the block runs
+        """
+        stopped = threading.Event()
+
+        def _extend():
+            while not stopped.wait(self.lease / 3.0):
+                try:
+                    if not self.extend():
+                        return
+                except redis.exceptions.ConnectionError:
+                    pass
+        thread = None
+        if self.token:
+            thread = threading.Thread(target=_extend)
+            thread.daemon = True
+            thread.start()
+        try:
+            yield self
+        finally:
+            stopped.set()
+            if thread:
+                thread.join()
+
+    def held_since(self):
+        token = redis_connection().get(self.key)
+        return token.split('|')[0] if token else None
+
+    def request_rerun(self, args, kwargs):
+        """
+        Remember the most recent arguments, the run that holds the lock
+        will publish exactly one follow-up run when it completes.
+        """
+        redis_connection().set(
+            self.rerun_key, pickle.dumps((args, kwargs)), ex=self.lease)
+
+    def pop_rerun(self):
+        r = redis_connection()
+        pipe = r.pipeline()
+        pipe.get(self.rerun_key)
+        pipe.delete(self.rerun_key)
+        data = pipe.execute()[0]
+        if not data:
+            return None
+        return pickle.loads(data)
+
+    def record_duration(self, seconds):
+        field = "%s.%s" % (self.task_name, self.provider_key)
+        redis_connection().hset(DURATIONS_KEY, field, "%.3f" % seconds)
+
+
+def get_recorded_durations():
+    """
+    Return a dict of '<task_name>.<provider>' -> duration (seconds)
+    of the last completed run.
+    """
+    durations = redis_connection().hgetall(DURATIONS_KEY)
+    return {key: float(value) for key, value in durations.items()}
+
+
+def publish_single_flight(task, provider_key, args=None, kwargs=None,
+                          coalesce=False):
+    """
+    Publish 'task' for 'provider_key' unless a previous run is still
+    queued or executing.
+    coalesce=True -- Instead of skipping, schedule one follow-up run.
+    Returns True if the task was published.
+    """
+    args = args or []
+    kwargs = kwargs or {}
+    lock = SingleFlightLock(task.name, provider_key)
+    try:
+        acquired = lock.acquire()
+    except redis.exceptions.ConnectionError:
+        celery_logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                            "Publishing %s without a lock." % task.name)
+        acquired = True
+    if not acquired:
+        if coalesce:
+            lock.request_rerun(args, kwargs)
+        celery_logger.info(
+            "SINGLE FLIGHT: %s for %s is still running (since %s) -- %s"
+            % (task.name, provider_key, lock.held_since(),
+               "Coalesced" if coalesce else "Skipped"))
+        return False
+    task_kwargs = dict(kwargs)
+    if lock.token:
+        task_kwargs[SINGLE_FLIGHT_TOKEN] = lock.token
+    try:
+        task.apply_async(args=args, kwargs=task_kwargs)
+    except Exception:
+        lock.release()
+        raise
+    return True
+
+
+def single_flight(task_name, provider_key_for=None):
+    """
+    Decorate the '*_for' task published by 'publish_single_flight'.
+    When the task body completes the duration is recorded, the lock is
+    released and any coalesced run is published.
+
+    NOTE: Place this decorator *below* @task(..) and @provider_throttle(..)
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            from celery.task import current
+            token = kwargs.pop(SINGLE_FLIGHT_TOKEN, None)
+            if provider_key_for:
+                provider_key = provider_key_for(*args, **kwargs)
+            elif args:
+                provider_key = args[0]
+            else:
+                provider_key = kwargs.get('provider_id')
+            lock = SingleFlightLock(task_name, provider_key, token=token)
+            start = time.time()
+            try:
+                with lock.keep_alive():
+                    return func(*args, **kwargs)
+            finally:
+                duration = time.time() - start
+                celery_logger.info("SINGLE FLIGHT: %s for %s took %.1fs"
+                                   % (task_name, provider_key, duration))
+                try:
+                    lock.record_duration(duration)
+                    # A direct call (no token) does not own the lock
+                    if token and lock.release():
+                        rerun = lock.pop_rerun()
+                        if rerun:
+                            publish_single_flight(
+                                current, provider_key,
+                                args=rerun[0], kwargs=rerun[1])
+                except redis.exceptions.ConnectionError:
+                    pass
+        return wrapper
+    return decorator
@@ -0,0 +1,195 @@
+"""
+Bulk synchronization of machine (image) membership for a provider.
+
+The per-image approach (one ProviderMachine query, one glance call and
+one Credential query per image, one ApplicationMembership count per
+group) does not scale to providers with thousands of images.
+MachineMembershipSync loads everything it needs up-front in a handful of
+queries, fetches glance image members concurrently, and applies the
+resulting ApplicationMembership changes with bulk_create/bulk delete.
+"""
+from collections import defaultdict
+from multiprocessing.pool import ThreadPool
+
+from django.conf import settings
+
+from threepio import celery_logger
+
+from core.models import (
+    ApplicationMembership, Credential, Identity, IdentityMembership,
+    ProviderMachine)
+from core.models.machine import get_or_create_provider_machine
+from core.query import only_current_source
+
+
+class MachineMembershipSync(object):
+
+    def __init__(self, provider, account_driver, workers=None):
+        self.provider = provider
+        self.account_driver = account_driver
+        self.workers = workers or getattr(
+            settings, 'MACHINE_MEMBERSHIP_SYNC_WORKERS', 8)
+        self.machines = {}
+        self.tenant_identities = defaultdict(set)
+        self.identity_groups = defaultdict(set)
+        self.application_groups = defaultdict(set)
+        self.to_create = set()
+        self.to_clear = set()
+        self._identities = {}
+        self._loaded_applications = set()
+
+    def load(self):
+        """
+        Load all machines, credentials, identity memberships and
+        application memberships for the provider (one query each).
+        """
+        machines = ProviderMachine.objects.filter(
+            only_current_source(), instance_source__provider=self.provider
+        ).select_related(
+            'instance_source', 'application_version__application')
+        self.machines = {
+            machine.instance_source.identifier: machine
+            for machine in machines}
+        # NOTE: Not limited to this provider while replicating clouds
+        # (See get_shared_identities)
+        credentials = Credential.objects.filter(
+            key='ex_tenant_name').values_list('value', 'identity_id')
+        for tenant_name, identity_id in credentials:
+            self.tenant_identities[tenant_name].add(identity_id)
+        memberships = IdentityMembership.objects.values_list(
+            'identity_id', 'member_id')
+        for identity_id, group_id in memberships:
+            self.identity_groups[identity_id].add(group_id)
+        self.load_application_groups(
+            machine.application_version.application_id
+            for machine in self.machines.values())
+        return self
+
+    def load_application_groups(self, application_ids):
+        """
+        Load the memberships of applications not seen yet (one query)
+        """
+        application_ids = set(application_ids) - self._loaded_applications
+        if not application_ids:
+            return
+        self._loaded_applications |= application_ids
+        app_memberships = ApplicationMembership.objects.filter(
+            application_id__in=application_ids
+        ).values_list('application_id', 'group_id')
+        for application_id, group_id in app_memberships:
+            self.application_groups[application_id].add(group_id)
+
+    def get_machine(self, cloud_machine, create=False):
+        """
+        Return the ProviderMachine for 'cloud_machine' from the loaded set.
+        create=True -- Fall back to get_or_create_provider_machine
+        """
+        machine = self.machines.get(cloud_machine.id)
+        if machine or not create:
+            return machine
+        machine = get_or_create_provider_machine(
+            cloud_machine.id, cloud_machine.name, self.provider.uuid)
+        self.machines[cloud_machine.id] = machine
+        # May be a new version of an existing application
+        self.load_application_groups(
+            [machine.application_version.application_id])
+        return machine
+
+    def _image_members(self, image_id):
+        try:
+            members = self.account_driver.image_manager.shared_images_for(
+                image_id=image_id)
+            return image_id, [member.member_id for member in members]
+        except Exception:
+            celery_logger.exception(
+                "Could not list members of image %s" % image_id)
+            return image_id, None
+
+    def fetch_members(self, image_ids):
+        """
+        Concurrently list the glance members of each image.
+        Returns a dict of image_id -> [tenant_id, ...]
+        (Images whose members could not be listed are left out)
+        """
+        if not image_ids:
+            return {}
+        pool = ThreadPool(min(self.workers, len(image_ids)))
+        try:
+            results = pool.map(self._image_members, image_ids)
+        finally:
+            pool.close()
+            pool.join()
+        return {image_id: members for image_id, members in results
+                if members is not None}
+
+    def identity_ids_for(self, tenant_ids, tenant_id_name_map):
+        identity_ids = set()
+        for tenant_id in tenant_ids:
+            tenant_name = tenant_id_name_map.get(tenant_id)
+            if not tenant_name:
+                celery_logger.warn("TENANT ID: %s NOT FOUND" % tenant_id)
+                continue
+            identity_ids |= self.tenant_identities.get(tenant_name, set())
+        return identity_ids
+
+    def identities_for(self, identity_ids):
+        """
+        Return Identity objects, loading any unseen ids in a single query.
+        """
+        missing = set(identity_ids) - set(self._identities)
+        if missing:
+            for identity in Identity.objects.filter(
+                    id__in=missing).select_related('provider'):
+                self._identities[identity.id] = identity
+        return [self._identities[identity_id]
+                for identity_id in identity_ids
+                if identity_id in self._identities]
+
+    def add_members(self, application, identity_ids):
+        """
+        Every group holding one of 'identity_ids' should be a member
+        of 'application'.
+        """
+        current = self.application_groups[application.id]
+        for identity_id in identity_ids:
+            for group_id in self.identity_groups.get(identity_id, ()):
+                if group_id not in current:
+                    self.to_create.add((application.id, group_id))
+
+    def remove_all_members(self, application):
+        if self.application_groups[application.id]:
+            self.to_clear.add(application.id)
+
+    def apply(self, dry_run=False):
+        """
+        Write the membership changes, returns (created, deleted)
+        """
+        to_create = set(
+            (app_id, group_id) for app_id, group_id in self.to_create
+            if app_id not in self.to_clear)
+        deleted = sum(len(self.application_groups[app_id])
+                      for app_id in self.to_clear)
+        celery_logger.info(
+            "Machine membership sync for %s: %s memberships to add, "
+            "%s to remove" % (self.provider, len(to_create), deleted))
+        if dry_run:
+            return (len(to_create), deleted)
+        if to_create:
+            # Memberships written since load() (ex: by another sync)
+            to_create -= set(ApplicationMembership.objects.filter(
+                application_id__in=set(
+                    app_id for app_id, group_id in to_create)
+            ).values_list('application_id', 'group_id'))
+            ApplicationMembership.objects.bulk_create([
+                ApplicationMembership(application_id=app_id, group_id=group_id)
+                for app_id, group_id in to_create])
+        if self.to_clear:
+            ApplicationMembership.objects.filter(
+                application_id__in=self.to_clear).delete()
+        for app_id, group_id in to_create:
+            self.application_groups[app_id].add(group_id)
+        for app_id in self.to_clear:
+            self.application_groups[app_id] = set()
+        self.to_create = set()
+        self.to_clear = set()
+        return (len(to_create), deleted)
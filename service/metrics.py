@@ -0,0 +1,134 @@
+"""
+Instance size metrics for a provider over a window of time.
+
+Each metric is a single GROUP BY over the instance status histories that
+overlap the window, results are optionally cached (in redis) per
+(provider, window).
+"""
+from collections import OrderedDict
+from datetime import timedelta
+import cPickle as pickle
+
+from django.conf import settings
+from django.db.models import (
+    Case, Count, DateTimeField, DurationField, ExpressionWrapper, F, Q, Sum,
+    Value, When)
+from django.db.models.functions import Coalesce, Greatest, Least
+from django.utils import timezone
+
+import redis
+
+from threepio import logger
+
+from core.models import InstanceStatusHistory, Size
+from service.cache import redis_connection
+
+
+SIZE_METRICS_KEY = "metrics.instance_sizes.{0}.{1}.{2}"
+
+
+def _window_histories(provider_id, start_date, end_date):
+    return InstanceStatusHistory.objects.filter(
+        Q(end_date__gt=start_date) | Q(end_date__isnull=True),
+        start_date__lt=end_date,
+        instance__source__provider__id=provider_id)
+
+
+def calculate_size_metrics(provider_id, start_date, end_date):
+    """
+    For every size of the provider (smallest first):
+    instances -- Instances that used the size during the window
+    active -- Instances that were 'active' in the size during the window
+    active_hours -- Hours spent 'active' in the size during the window
+    cpu_hours -- active_hours * size.cpu
+    """
+    start_value = Value(start_date, output_field=DateTimeField())
+    end_value = Value(end_date, output_field=DateTimeField())
+    # The part of each history inside the window
+    window_time = ExpressionWrapper(
+        Least(Coalesce('end_date', end_value), end_value)
+        - Greatest(F('start_date'), start_value),
+        output_field=DurationField())
+    rows = _window_histories(provider_id, start_date, end_date)\
+        .order_by().values('size').annotate(
+            instances=Count('instance', distinct=True),
+            active=Count(Case(When(status__name='active', then='instance')),
+                         distinct=True),
+            active_time=Sum(Case(When(status__name='active', then=window_time),
+                                 output_field=DurationField())))
+    by_size = {row['size']: row for row in rows}
+    metrics = []
+    for size in Size.objects.filter(
+            provider__id=provider_id).order_by('cpu', 'mem', 'id'):
+        row = by_size.get(size.id, {})
+        active_time = row.get('active_time') or timedelta(0)
+        active_hours = round(active_time.total_seconds() / 3600.0, 2)
+        metrics.append({
+            'id': size.id,
+            'name': size.name,
+            'alias': size.alias,
+            'cpu': size.cpu,
+            'mem': size.mem,
+            'disk': size.disk,
+            'instances': row.get('instances', 0),
+            'active': row.get('active', 0),
+            'active_hours': active_hours,
+            'cpu_hours': round(active_hours * size.cpu, 2),
+        })
+    return metrics
+
+
+def get_size_metrics(provider_id, start_date, end_date=None, use_cache=True):
+    """
+    Return calculate_size_metrics for the window, cached for
+    SIZE_METRICS_CACHE_TTL seconds. Windows that ended more than
+    SIZE_METRICS_CACHE_TTL seconds ago no longer change (new histories
+    start 'now'), they are kept for SIZE_METRICS_HISTORIC_CACHE_TTL seconds.
+    end_date -- Default: now
+    """
+    now_time = timezone.now()
+    ttl = getattr(settings, 'SIZE_METRICS_CACHE_TTL', 15 * 60)
+    is_historic = end_date is not None and \
+        end_date <= now_time - timedelta(seconds=ttl)
+    if is_historic:
+        key = SIZE_METRICS_KEY.format(
+            provider_id, start_date.isoformat(), end_date.isoformat())
+        ttl = getattr(settings, 'SIZE_METRICS_HISTORIC_CACHE_TTL',
+                      24 * 60 * 60)
+    else:
+        # Recent windows share a key per minute (and end 'now' by default)
+        key = SIZE_METRICS_KEY.format(
+            provider_id, start_date.strftime("%Y-%m-%dT%H:%M"),
+            end_date.strftime("%Y-%m-%dT%H:%M") if end_date else "now")
+        if end_date is None:
+            end_date = now_time
+    if use_cache:
+        try:
+            data = redis_connection().get(key)
+            if data:
+                return pickle.loads(data)
+        except redis.exceptions.ConnectionError:
+            logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                         "Somebody should turn it on!")
+            use_cache = False
+    metrics = calculate_size_metrics(provider_id, start_date, end_date)
+    if use_cache:
+        try:
+            redis_connection().set(key, pickle.dumps(metrics), ex=ttl)
+        except redis.exceptions.ConnectionError:
+            pass
+    return metrics
+
+
+def instance_size_distribution(provider_id, days_ago, now_time=None):
+    """
+    {size name: number of instances} over the last 'days_ago' days,
+    as printed by scripts/metrics/instance_size_distribution.py
+    """
+    end_date = now_time
+    if not now_time:
+        now_time = timezone.now()
+    start_date = now_time - timedelta(days=days_ago)
+    return OrderedDict(
+        (metric['name'], metric['instances'])
+        for metric in get_size_metrics(provider_id, start_date, end_date))
@@ -18,7 +18,8 @@ from core.models.instance import (
 )
 from core.models.size import convert_esh_size
 from allocation.models import Allocation, AllocationResult
-from service.cache import get_cached_instances, get_cached_driver
+from service.cache import (
+    get_cached_instances, get_cached_driver, cache_allocation_usage)
 from service.instance import suspend_instance, stop_instance, destroy_instance, shelve_instance, offload_instance
 from allocation.engine import calculate_allocation
 from django.conf import settings
@@ -167,6 +168,10 @@ def user_over_allocation_enforcement(
             "Total Runtime could NOT be calculated. Returning.." %
             (username, ))
         return allocation_result
+    if not start_date and not end_date:
+        # Refresh the snapshot served by the identity API
+        cache_allocation_usage(
+            identity, identity.get_allocation_usage(allocation_result))
     user = User.objects.get(username=username)
     allocation = get_allocation(username, identity.uuid)
     if not allocation:
@@ -1,24 +1,109 @@
 """
 Provide pluggable machine search for Atmosphere.
 
+Applications are matched against a weighted full-text index
+(the 'search_vector' tsvector column on 'application', GIN indexed):
+  A -- Application name
+  B -- Tag names and descriptions
+  C -- Application description and version change logs
+  D -- Id, creator, machine identifiers and provider locations
+The index is kept up to date by ApplicationVisibility.rebuild_for.
+Every word of the query must match the start of an indexed word,
+results are ordered by rank.
 """
 from abc import ABCMeta, abstractmethod
 import operator
+import re
 
+from django.conf import settings
+from django.db import connection
 from django.db.models import Q
 
 from core.models.machine import compare_core_machines, filter_core_machine,\
     ProviderMachine
 from core.models.provider import Provider
 from core.models.application import Application
-from core.query import only_current_source
+from core.query import only_current_apps, only_current_source
 from functools import reduce
 
 
+SEARCH_WEIGHTS = "ABCD"
+
+
 def search(providers, identity, query):
     return reduce(operator.or_, [p.search(identity, query) for p in providers])
 
 
+def _search_config():
+    return getattr(settings, 'SEARCH_TEXT_CONFIG', 'english')
+
+
+def _use_full_text():
+    return connection.vendor == 'postgresql'
+
+
+def update_search_vectors(documents):
+    """
+    Update the search_vector of applications.
+    documents -- {application_id: {weight: text, ...}, ...}
+    """
+    if not documents or not _use_full_text():
+        return
+    vector = " || ".join(
+        "setweight(to_tsvector(%%s, %%s), '%s')" % weight
+        for weight in SEARCH_WEIGHTS)
+    sql = "UPDATE application SET search_vector = %s WHERE id = %%s" % vector
+    config = _search_config()
+    params = []
+    for application_id, document in documents.items():
+        row = []
+        for weight in SEARCH_WEIGHTS:
+            row.extend([config, document.get(weight) or ''])
+        row.append(application_id)
+        params.append(row)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, params)
+
+
+def search_terms(query):
+    return re.findall(r'\w+', query or '', re.UNICODE)
+
+
+def prefix_tsquery(query):
+    """
+    'ubuntu 14' -> 'ubuntu:* & 14:*'
+    """
+    return " & ".join("%s:*" % term for term in search_terms(query))
+
+
+def search_queryset(queryset, query, prefix=''):
+    """
+    Filter 'queryset' to the applications matching 'query', best first.
+    prefix -- The path from queryset's model to Application
+              (ex: 'application_version__application__')
+    """
+    terms = search_terms(query)
+    if not terms:
+        return queryset.none()
+    if not _use_full_text():
+        for term in terms:
+            queryset = queryset.filter(
+                **{prefix + 'search_text__icontains': term})
+        return queryset
+    if prefix:
+        # Join application so that it can be referenced below.
+        queryset = queryset.filter(**{prefix + 'id__isnull': False})
+    tsquery = "to_tsquery(%s, %s)"
+    params = [_search_config(), prefix_tsquery(query)]
+    return queryset.extra(
+        select={'search_rank':
+                "ts_rank(application.search_vector, %s)" % tsquery},
+        select_params=params,
+        where=["application.search_vector @@ %s" % tsquery],
+        params=params,
+        order_by=['-search_rank'])
+
+
 class BaseSearchProvider():
 
     """
@@ -42,21 +127,15 @@ class CoreSearchProvider(BaseSearchProvider):
 
     @classmethod
     def search(cls, identity, query):
-        return ProviderMachine.objects.filter(
+        machines = ProviderMachine.objects.filter(
             # Privately owned OR public machines
-            Q(application__private=True,
+            Q(application_version__application__private=True,
               instance_source__created_by_identity=identity)
-            | Q(application__private=False, instance_source__provider=identity.provider),
-            # AND query matches on:
-            # app tag name OR
-            # app tag desc OR
-            # app name OR
-            # app desc
-            Q(application__tags__name__icontains=query)
-            | Q(application__tags__description__icontains=query)
-            | Q(application__name__icontains=query)
-            | Q(application__description__icontains=query),
-            *only_current_source())
+            | Q(application_version__application__private=False,
+                instance_source__provider=identity.provider),
+            only_current_source())
+        return search_queryset(
+            machines, query, prefix='application_version__application__')
 
 
 class CoreApplicationSearch(BaseSearchProvider):
@@ -81,15 +160,6 @@ class CoreApplicationSearch(BaseSearchProvider):
                 private=False,
                 # Providermachine's provider is active
                 versions__machines__instance_source__provider__in=active_providers)
-        # AND query matches on:
-        query_match = base_apps.filter(
-            # app tag name
-            Q(tags__name__icontains=query)
-            # OR app tag desc
-            | Q(tags__description__icontains=query)
-            # OR app name
-            | Q(name__icontains=query)
-            # OR app desc
-            | Q(description__icontains=query),
-            *only_current_source())
-        return query_match.distinct()
+        base_apps = base_apps.filter(only_current_apps())
+        return search_queryset(
+            Application.objects.filter(id__in=base_apps.values('id')), query)
@@ -4,6 +4,7 @@ NOTE: At this point create options do not have a hard-set requirement for 'CoreI
 Delete/remove operations do. This should be investigated further..
 """
 from operator import attrgetter
+import cPickle as pickle
 import sys
 import re
 import time
@@ -13,6 +14,8 @@ from django.utils.timezone import datetime, timedelta
 from celery.decorators import task
 from celery.task import current
 from celery.result import allow_join_result
+from celery.exceptions import Ignore
+from celery import signature
 
 from rtwo.exceptions import LibcloudDeploymentError
 
@@ -31,15 +34,19 @@ from core.models.profile import UserProfile
 
 from service.deploy import (
     inject_env_script, check_process, wrap_script,
-    instance_deploy, user_deploy,
+    instance_deploy, instance_deploy_batch, user_deploy,
     build_host_name,
     ready_to_deploy as ansible_ready_to_deploy,
     run_utility_playbooks, execution_has_failures, execution_has_unreachable
     )
+from service.cache import redis_connection
 from service.driver import get_driver, get_account_driver
 from service.exceptions import AnsibleDeployException
 from service.instance import _update_instance_metadata
 from service.networking import _generate_ssh_kwargs
+from service.throttle import (
+    provider_throttle, provider_for_identity, provider_for_uuid)
+from service.locks import publish_single_flight, single_flight
 
 
 def _update_status_log(instance, status_update):
@@ -202,7 +209,7 @@ def current_openstack_identities():
         provider__type__name__iexact='openstack',
         provider__active=True)
     key_sorter = lambda ident: attrgetter(
-        ident.provider.type.name,
+        ident.provider.get_type_name(),
         ident.created_by.username)
     identities = sorted(
         identities,
@@ -243,6 +250,8 @@ def _remove_network(
 
 
 @task(name="clear_empty_ips_for")
+@provider_throttle(provider_key_for=provider_for_identity)
+@single_flight("clear_empty_ips_for")
 def clear_empty_ips_for(core_identity_uuid, username=None):
     """
     RETURN: (number_ips_removed, delete_network_called)
@@ -304,8 +313,9 @@ def clear_empty_ips():
     for core_identity in identities:
         try:
             # TODO: Add some
-            clear_empty_ips_for.apply_async(args=[core_identity.uuid,
-                                                  core_identity.created_by])
+            publish_single_flight(
+                clear_empty_ips_for, core_identity.uuid,
+                args=[core_identity.uuid, core_identity.created_by])
         except Exception as exc:
             celery_logger.exception(exc)
     celery_logger.debug("clear_empty_ips task finished at %s." % datetime.now())
@@ -696,9 +706,14 @@ def get_chain_from_active_with_ip(
         driverCls, provider, identity, instance.id,
         {'tmp_status': 'deploying'})
 
-    deploy_task = _deploy_instance.si(
-        driverCls, provider, identity, instance.id,
-        username, None, redeploy)
+    if getattr(settings, 'ANSIBLE_BATCH_DEPLOY', False):
+        deploy_task = _deploy_instance_batched.si(
+            driverCls, provider, identity, instance.id,
+            username, None, redeploy)
+    else:
+        deploy_task = _deploy_instance.si(
+            driverCls, provider, identity, instance.id,
+            username, None, redeploy)
     deploy_user_task = _deploy_instance_for_user.si(
         driverCls, provider, identity, instance.id,
         username, None, redeploy)
@@ -1141,6 +1156,109 @@ def _deploy_instance(driverCls, provider, identity, instance_id,
         _deploy_instance.retry(exc=exc)
 
 
+DEPLOY_BATCH_KEY = "deploy_batch.instance_deploy"
+DEPLOY_BATCH_SCHEDULED_KEY = "deploy_batch.instance_deploy.scheduled"
+
+
+def _schedule_deploy_batch(window=None):
+    """
+    Publish 'deploy_instance_batch' unless a run is already scheduled.
+    """
+    if window is None:
+        window = getattr(settings, 'ANSIBLE_BATCH_WINDOW', 15)
+    r = redis_connection()
+    if r.set(DEPLOY_BATCH_SCHEDULED_KEY, 1, nx=True, ex=window + 60):
+        deploy_instance_batch.apply_async(countdown=window)
+
+
+@task(name="_deploy_instance_batched",
+      default_retry_delay=124,
+      max_retries=10
+      )
+def _deploy_instance_batched(driverCls, provider, identity, instance_id,
+                    username=None, password=None, token=None, redeploy=False,
+                    **celery_task_args):
+    """
+    Batching alternative to '_deploy_instance' (settings.ANSIBLE_BATCH_DEPLOY)
+    The instance is added to the next batch of 'instance_deploy' playbook
+    runs. The callbacks/errbacks of this task (the rest of the deploy chain)
+    are continued by 'deploy_instance_batch' once the playbooks complete.
+    """
+    try:
+        celery_logger.debug("_deploy_instance_batched task started at %s." % datetime.now())
+        driver = get_driver(driverCls, provider, identity)
+        instance = driver.get_instance(instance_id)
+        if not instance:
+            celery_logger.debug("Instance has been teminated: %s." % instance_id)
+            return
+        entry = {
+            'task_args': (driverCls, provider, identity, instance_id,
+                          username, password, token, redeploy),
+            'ip': instance.ip,
+            'username': identity.user.username,
+            'callbacks': current.request.callbacks or [],
+            'errbacks': current.request.errbacks or [],
+        }
+        redis_connection().rpush(DEPLOY_BATCH_KEY, pickle.dumps(entry))
+        _schedule_deploy_batch()
+        _update_status_log(instance, "Ansible batch queued for %s." % instance.ip)
+    except (BaseException, Exception) as exc:
+        celery_logger.exception(exc)
+        _deploy_instance_batched.retry(exc=exc)
+    # Do NOT call the callbacks, 'deploy_instance_batch' is responsible.
+    raise Ignore()
+
+
+@task(name="deploy_instance_batch",
+      time_limit=32 * 60,  # 32 minute hard-set time limit.
+      ignore_result=True)
+def deploy_instance_batch():
+    """
+    Run the 'instance_deploy' playbooks once for every instance collected
+    by '_deploy_instance_batched' (up to settings.ANSIBLE_BATCH_MAX_SIZE)
+    * Succeeded - continue the instance's deploy chain.
+    * Failed    - fall back to '_deploy_instance' for that instance, with
+                  the same links, so the usual retry policy applies.
+    """
+    max_size = getattr(settings, 'ANSIBLE_BATCH_MAX_SIZE', 50)
+    r = redis_connection()
+    pipe = r.pipeline()
+    pipe.lrange(DEPLOY_BATCH_KEY, 0, max_size - 1)
+    pipe.ltrim(DEPLOY_BATCH_KEY, max_size, -1)
+    pipe.delete(DEPLOY_BATCH_SCHEDULED_KEY)
+    pipe.llen(DEPLOY_BATCH_KEY)
+    entries, _, _, remaining = pipe.execute()
+    if remaining:
+        _schedule_deploy_batch(window=0)
+    entries = [pickle.loads(entry) for entry in entries]
+    if not entries:
+        return
+    celery_logger.info("deploy_instance_batch started for %s instances at %s."
+                       % (len(entries), datetime.now()))
+    hosts = [{'instance_id': entry['task_args'][3],
+              'ip': entry['ip'],
+              'username': entry['username']} for entry in entries]
+    try:
+        results = instance_deploy_batch(hosts)
+    except (BaseException, Exception) as exc:
+        celery_logger.exception(exc)
+        results = {host['instance_id']: str(exc) for host in hosts}
+    for entry in entries:
+        instance_id = entry['task_args'][3]
+        error_message = results.get(instance_id)
+        if not error_message:
+            for callback in entry['callbacks']:
+                signature(callback).apply_async((None,))
+            continue
+        celery_logger.warn("Batch deploy failed for %s: %s -- "
+                           "Deploying individually." % (instance_id, error_message))
+        _deploy_instance.apply_async(
+            args=entry['task_args'],
+            link=[signature(cb) for cb in entry['callbacks']],
+            link_error=[signature(eb) for eb in entry['errbacks']])
+    celery_logger.info("deploy_instance_batch finished at %s." % datetime.now())
+
+
 def _parse_steps_output(msd):
     output = ""
     length = len(msd.steps)
@@ -1439,55 +1557,62 @@ def check_image_membership():
 
 
 @task(name="update_membership_for")
+@provider_throttle(provider_key_for=provider_for_uuid)
+@single_flight("update_membership_for")
 def update_membership_for(provider_uuid):
-    from core.models import Provider, ProviderMachine
+    from core.models import Provider
+    from service.machine_membership import MachineMembershipSync
+    from service.tasks.monitoring import tenant_id_to_name_map
     provider = Provider.objects.get(uuid=provider_uuid)
     if not provider.is_active():
         return
-    if provider.type.name.lower() == 'openstack':
+    if provider.get_type_name().lower() == 'openstack':
         acct_driver = get_account_driver(provider)
     else:
         celery_logger.warn("Encountered unknown ProviderType:%s, expected"
-                    " [Openstack] " % (provider.type.name,))
+                    " [Openstack] " % (provider.get_type_name(),))
         return
     if not acct_driver:
         raise Exception("Encountered error creating driver -- check 'get_account_driver'")
     images = acct_driver.list_all_images()
-    changes = 0
+    membership_sync = MachineMembershipSync(provider, acct_driver).load()
+    private_images = []
     for img in images:
-        pm = ProviderMachine.objects.filter(instance_source__identifier=img.id,
-                                            instance_source__provider=provider)
-        if not pm or len(pm) > 1:
-            celery_logger.debug("pm filter is bad!")
-            celery_logger.debug(pm)
-            return
-        else:
-            pm = pm[0]
-        app_manager = pm.application_version.application.applicationmembership_set
-        if img.get('visibility','') is not 'public':
-            # Lookup members
-            image_members = acct_driver.image_manager.shared_images_for(
-                image_id=img.id)
-            # add machine to each member
-            #(Who owns the cred:ex_project_name) in MachineMembership
-            # for member in image_members:
+        pm = membership_sync.get_machine(img)
+        if not pm:
+            celery_logger.debug("No ProviderMachine found for image %s"
+                                % img.id)
+            continue
+        application = pm.application_version.application
+        if img.get('visibility', '') != 'public':
+            private_images.append((img.id, application))
         else:
-            members = app_manager.all()
-            # if MachineMembership exists, remove it (No longer private)
-            if members:
+            # if ApplicationMembership exists, remove it (No longer private)
+            if membership_sync.application_groups[application.id]:
                 celery_logger.info("Application for PM:%s used to be private."
-                            " %s Users membership has been revoked. "
-                            % (img.id, len(members)))
-                changes += len(members)
-                members.delete()
-    celery_logger.info("Total Updates to machine membership:%s" % changes)
+                                   " Users membership will be revoked."
+                                   % (img.id,))
+            membership_sync.remove_all_members(application)
+    # Lookup members of every private image (concurrently)
+    # add each member (Who owns the cred:ex_tenant_name) to the Application
+    tenant_id_name_map = tenant_id_to_name_map(acct_driver)
+    image_members = membership_sync.fetch_members(
+        [image_id for image_id, _ in private_images])
+    for image_id, application in private_images:
+        identity_ids = membership_sync.identity_ids_for(
+            image_members.get(image_id, []), tenant_id_name_map)
+        membership_sync.add_members(application, identity_ids)
+    created, deleted = membership_sync.apply()
+    celery_logger.info("Total Updates to machine membership:%s"
+                       % (created + deleted))
 
 
 @task(name="update_membership")
 def update_membership():
     from core.models.provider import Provider as CoreProvider
     for provider in CoreProvider.objects.all():
-        update_membership_for.apply_async(args=[provider.uuid])
+        publish_single_flight(
+            update_membership_for, provider.uuid, args=[provider.uuid])
 
 
 def test_active_instances(instances):
@@ -16,7 +16,7 @@ from core.email import \
 from core.models.machine_request import MachineRequest
 from core.models.export_request import ExportRequest
 from core.models.identity import Identity
-from core.models.status_type import StatusType
+from core.models.status_type import get_status_type
 
 from service.driver import get_admin_driver, get_esh_driver, get_account_driver
 from service.deploy import freeze_instance, sync_instance
@@ -95,7 +95,7 @@ def start_machine_imaging(machine_request, delay=False):
     delay - If true, wait until task is completed before returning
     """
 
-    new_status, _ = StatusType.objects.get_or_create(name="started")
+    new_status = get_status_type("started")
     machine_request.status = new_status
     machine_request.save()
     
@@ -252,7 +252,7 @@ def machine_request_error(task_uuid, machine_request_id):
 def imaging_complete(machine_request_id):
     machine_request = MachineRequest.objects.get(id=machine_request_id)
     machine_request.old_status = 'completed'
-    new_status, _ = StatusType.objects.get_or_create(name="completed")
+    new_status = get_status_type("completed")
     machine_request.status = new_status
     machine_request.end_date = timezone.now()
     machine_request.save()
@@ -273,7 +273,7 @@ def process_request(new_image_id, machine_request_id):
     Finally, update the metadata on the provider.
     """
     machine_request = MachineRequest.objects.get(id=machine_request_id)
-    new_status, _ = StatusType.objects.get_or_create(name="processing")
+    new_status = get_status_type("processing")
     machine_request.status = new_status
     machine_request.old_status = 'processing - %s' % new_image_id
     # HACK - TODO - replace with proper `default` in model
@@ -290,7 +290,7 @@ def process_request(new_image_id, machine_request_id):
 @task(name='validate_new_image', queue="imaging", ignore_result=False)
 def validate_new_image(image_id, machine_request_id):
     machine_request = MachineRequest.objects.get(id=machine_request_id)
-    new_status, _ = StatusType.objects.get_or_create(name="validating")
+    new_status = get_status_type("validating")
     machine_request.status = new_status
     machine_request.old_status = 'validating'
     machine_request.save()
@@ -29,6 +29,9 @@ from service.monitoring import (
 from service.monitoring import user_over_allocation_enforcement
 from service.driver import get_account_driver
 from service.cache import get_cached_driver
+from service.machine_membership import MachineMembershipSync
+from service.throttle import provider_throttle
+from service.locks import publish_single_flight, single_flight
 from rtwo.exceptions import GlanceConflict, GlanceForbidden
 
 from threepio import celery_logger
@@ -81,10 +84,12 @@ def prune_machines():
     that exist in the DB but can no longer be found.
     """
     for p in Provider.get_active():
-        prune_machines_for.apply_async(args=[p.id])
+        publish_single_flight(prune_machines_for, p.id, args=[p.id])
 
 
 @task(name="prune_machines_for")
+@provider_throttle()
+@single_flight("prune_machines_for")
 def prune_machines_for(
         provider_id, print_logs=False, dry_run=False, forced_removal=False):
     """
@@ -147,10 +152,12 @@ def monitor_machines():
     Update machines by querying the Cloud for each active provider.
     """
     for p in Provider.get_active():
-        monitor_machines_for.apply_async(args=[p.id])
+        publish_single_flight(monitor_machines_for, p.id, args=[p.id])
 
 
 @task(name="monitor_machines_for")
+@provider_throttle()
+@single_flight("monitor_machines_for")
 def monitor_machines_for(provider_id, print_logs=False, dry_run=False):
     """
     Run the set of tasks related to monitoring machines for a provider.
@@ -171,7 +178,10 @@ def monitor_machines_for(provider_id, print_logs=False, dry_run=False):
         console_handler = _init_stdout_logging()
 
     #STEP 1: get the apps
-    new_public_apps, private_apps = get_public_and_private_apps(provider)
+    account_driver = get_account_driver(provider)
+    membership_sync = MachineMembershipSync(provider, account_driver).load()
+    new_public_apps, private_apps = get_public_and_private_apps(
+        provider, membership_sync=membership_sync)
 
     #STEP 2: Find conflicts and report them.
     intersection = set(private_apps.keys()) & set(new_public_apps)
@@ -194,7 +204,8 @@ def monitor_machines_for(provider_id, print_logs=False, dry_run=False):
             if app in intersection:
                 celery_logger.error("Skipped private app: %s <%s>" % (app, app.id))
                 continue
-            make_machines_private(app, membership, account_drivers, provider_tenant_mapping, image_maps, dry_run=dry_run)
+            make_machines_private(app, membership, account_drivers, provider_tenant_mapping, image_maps, dry_run=dry_run, membership_sync=membership_sync)
+        membership_sync.apply(dry_run=dry_run)
     else:  # settings.ENFORCING = False
         celery_logger.warn("Settings.ENFORCING is set to False -- So we assume this is a development build and *NO* changes should be made to glance as a result of an 'information mismatch'")
 
@@ -202,7 +213,7 @@ def monitor_machines_for(provider_id, print_logs=False, dry_run=False):
         _exit_stdout_logging(console_handler)
     return
 
-def get_public_and_private_apps(provider):
+def get_public_and_private_apps(provider, membership_sync=None):
     """
     INPUT: Provider provider
     OUTPUT: 2-tuple (
@@ -212,10 +223,13 @@ def get_public_and_private_apps(provider):
     account_driver = get_account_driver(provider)
     all_projects_map = tenant_id_to_name_map(account_driver)
     cloud_machines = account_driver.list_all_images()
+    if not membership_sync:
+        membership_sync = MachineMembershipSync(
+            provider, account_driver).load()
 
-    db_machines = ProviderMachine.objects.filter(only_current_source(), instance_source__provider=provider)
     new_public_apps = []
     private_apps = {}
+    private_images = []
     # ASSERT: All non-end-dated machines in the DB can be found in the cloud
     # if you do not believe this is the case, you should call 'prune_machines_for'
     for cloud_machine in cloud_machines:
@@ -223,7 +237,7 @@ def get_public_and_private_apps(provider):
         if any(cloud_machine.name.startswith(prefix) for prefix in ['eri-','eki-', 'ChromoSnapShot']):
             #celery_logger.debug("Skipping cloud machine %s" % cloud_machine)
             continue
-        db_machine = get_or_create_provider_machine(cloud_machine.id, cloud_machine.name, provider.uuid)
+        db_machine = membership_sync.get_machine(cloud_machine, create=True)
         db_version = db_machine.application_version
         db_application = db_version.application
 
@@ -233,11 +247,23 @@ def get_public_and_private_apps(provider):
             #Else the db app is public and no changes are necessary.
         else:
             # cloud machine is private
-            membership = get_shared_identities(account_driver, cloud_machine, all_projects_map)
-            all_members = private_apps.get(db_application, [])
-            all_members.extend(membership)
-            #Distinct list..
-            private_apps[db_application] = all_members
+            private_images.append((cloud_machine.id, db_application))
+
+    # Look up the membership of every private image at once
+    image_members = membership_sync.fetch_members(
+        [image_id for image_id, _ in private_images])
+    image_identities = {
+        image_id: membership_sync.identity_ids_for(
+            image_members.get(image_id, []), all_projects_map)
+        for image_id, _ in private_images}
+    membership_sync.identities_for(
+        set().union(*image_identities.values()) if image_identities else [])
+    for image_id, db_application in private_images:
+        membership = membership_sync.identities_for(image_identities[image_id])
+        all_members = private_apps.get(db_application, [])
+        all_members.extend(membership)
+        #Distinct list..
+        private_apps[db_application] = all_members
     return new_public_apps, private_apps
 
 
@@ -283,11 +309,13 @@ def remove_machine(db_machine, now_time=None, dry_run=False):
     return True
 
 
-def make_machines_private(application, identities, account_drivers={}, provider_tenant_mapping={}, image_maps={}, dry_run=False):
+def make_machines_private(application, identities, account_drivers={}, provider_tenant_mapping={}, image_maps={}, dry_run=False, membership_sync=None):
     """
     This method is called when the DB has marked the Machine/Application as PUBLIC
     But the CLOUD states that the machine is really private.
     GOAL: All versions and machines will be listed as PRIVATE on the cloud and include AS MANY identities as exist.
+    If 'membership_sync' is included, ApplicationMemberships are collected
+    and written when 'membership_sync.apply()' is called.
     """
     for version in application.active_versions():
         for machine in version.active_machines():
@@ -302,7 +330,10 @@ def make_machines_private(application, identities, account_drivers={}, provider_
             for identity in identities:
                 if identity.provider == provider:
                     _share_image(account_driver, cloud_machine, identity, current_tenants, dry_run=dry_run)
-                    add_application_membership(application, identity, dry_run=dry_run)
+                    if membership_sync:
+                        membership_sync.add_members(application, [identity.id])
+                    else:
+                        add_application_membership(application, identity, dry_run=dry_run)
     # All the cloud work has been completed, so "lock down" the application.
     if not application.private:
         application.private = True
@@ -448,7 +479,7 @@ def monitor_instances():
     Update instances for each active provider.
     """
     for p in Provider.get_active():
-        monitor_instances_for.apply_async(args=[p.id])
+        publish_single_flight(monitor_instances_for, p.id, args=[p.id])
 
 
 @task(name="enforce_allocation_overage")
@@ -465,10 +496,55 @@ def monitor_instance_allocations():
     Update instances for each active provider.
     """
     for p in Provider.get_active():
-        monitor_instances_for.apply_async(args=[p.id], kwargs={'check_allocations':True})
+        publish_single_flight(monitor_instances_for, p.id, args=[p.id],
+                              kwargs={'check_allocations': True},
+                              coalesce=True)
+
+
+@task(name="rollup_instance_usage")
+def rollup_instance_usage():
+    """
+    Recalculate the InstanceUsage of every running instance (and every
+    instance end-dated since the last rollup) to correct any drift
+    between status changes.
+    """
+    from core.models.instance import Instance
+    from core.models.instance_usage import InstanceUsage
+    since = timezone.now() - getattr(
+        settings, 'INSTANCE_USAGE_ROLLUP_LOOKBACK', timedelta(hours=2))
+    instances = Instance.objects.filter(
+        Q(end_date__isnull=True) | Q(end_date__gt=since))
+    total = InstanceUsage.update_in_batches(
+        instances, getattr(settings, 'INSTANCE_USAGE_BATCH_SIZE', 500))
+    celery_logger.info("Rolled up usage for %s instances" % total)
+    return total
+
+
+@task(name="rebuild_application_visibility")
+def rebuild_application_visibility():
+    """
+    Rebuild ApplicationVisibility for every application, picking up
+    start/end dates that have passed since the last change.
+    """
+    from core.models.application_visibility import ApplicationVisibility
+    total = ApplicationVisibility.rebuild_all()
+    celery_logger.info("Rebuilt visibility for %s applications" % total)
+    return total
+
+
+@task(name="refresh_application_metrics")
+def refresh_application_metrics():
+    """
+    Save the launch metrics of every application version
+    (See ApplicationVersion.get_metrics)
+    """
+    from core.models.application_metrics import ApplicationVersionMetric
+    return ApplicationVersionMetric.refresh_all()
 
 
 @task(name="monitor_instances_for")
+@provider_throttle()
+@single_flight("monitor_instances_for")
 def monitor_instances_for(provider_id, users=None,
                           print_logs=False, check_allocations=False, start_date=None, end_date=None):
     """
@@ -480,7 +556,7 @@ def monitor_instances_for(provider_id, users=None,
     provider = Provider.objects.get(id=provider_id)
 
     # For now, lets just ignore everything that isn't openstack.
-    if 'openstack' not in provider.type.name.lower():
+    if 'openstack' not in provider.get_type_name().lower():
         return
 
     instance_map = _get_instance_owner_map(provider, users=users)
@@ -534,9 +610,11 @@ def monitor_volumes():
     Update volumes for each active provider.
     """
     for p in Provider.get_active():
-        monitor_volumes_for.apply_async(args=[p.id])
+        publish_single_flight(monitor_volumes_for, p.id, args=[p.id])
 
 @task(name="monitor_volumes_for")
+@provider_throttle()
+@single_flight("monitor_volumes_for")
 def monitor_volumes_for(provider_id, print_logs=False):
     """
     Run the set of tasks related to monitoring sizes for a provider.
@@ -590,10 +668,12 @@ def monitor_sizes():
     Update sizes for each active provider.
     """
     for p in Provider.get_active():
-        monitor_sizes_for.apply_async(args=[p.id])
+        publish_single_flight(monitor_sizes_for, p.id, args=[p.id])
 
 
 @task(name="monitor_sizes_for")
+@provider_throttle()
+@single_flight("monitor_sizes_for")
 def monitor_sizes_for(provider_id, print_logs=False):
     """
     Run the set of tasks related to monitoring sizes for a provider.
@@ -0,0 +1,177 @@
+"""
+Per-provider concurrency limits for cloud-API-heavy celery tasks.
+
+Each provider has a bucket of tokens (settings.PROVIDER_TASK_CONCURRENCY).
+A throttled task must take a token before it runs and gives it back when
+it completes. If no token is available the task is re-published with a
+countdown instead of blocking a worker, so user-facing tasks waiting in
+the same queues are never stuck behind a sweep of periodic work.
+Tasks called directly (not from a worker) are never re-published, they
+run unthrottled instead.
+"""
+from functools import wraps
+import time
+import uuid
+
+from django.conf import settings
+
+import redis
+
+from threepio import celery_logger
+
+from service.cache import redis_connection
+
+
+THROTTLE_KEY = "throttle.{0}.{1}.tokens"
+# Kombu's redis transport stores each priority step in its own list.
+PRIORITY_SEP = "\x06\x16"
+
+# KEYS[1] -- The bucket: a sorted set of token -> lease expiry
+# ARGV -- now, limit, token, lease expiry, lease (seconds)
+ACQUIRE_SCRIPT = """
+redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', ARGV[1])
+if redis.call('ZCARD', KEYS[1]) >= tonumber(ARGV[2]) then
+    return 0
+end
+redis.call('ZADD', KEYS[1], ARGV[4], ARGV[3])
+redis.call('EXPIRE', KEYS[1], ARGV[5])
+return 1
+"""
+
+
+def get_provider_concurrency(provider_key):
+    """
+    Return the number of tokens in the bucket for 'provider_key'
+    """
+    overrides = getattr(settings, 'PROVIDER_TASK_CONCURRENCY_OVERRIDES', {})
+    if str(provider_key) in overrides:
+        return overrides[str(provider_key)]
+    return getattr(settings, 'PROVIDER_TASK_CONCURRENCY', 4)
+
+
+class ProviderThrottle(object):
+    """
+    A redis-backed token bucket shared by every worker.
+    Each token is held under its own lease: a token held by a worker that
+    died is returned once its lease expires, even while other tasks keep
+    asking for tokens.
+    """
+
+    def __init__(self, provider_key, bucket="cloud_api",
+                 limit=None, lease=None):
+        self.provider_key = provider_key
+        self.key = THROTTLE_KEY.format(bucket, provider_key)
+        self.limit = limit or get_provider_concurrency(provider_key)
+        self.lease = lease or getattr(
+            settings, 'PROVIDER_TASK_LEASE', 30 * 60)
+        self.token = None
+
+    def acquire(self):
+        token = uuid.uuid4().hex
+        now = time.time()
+        try:
+            acquired = redis_connection().eval(
+                ACQUIRE_SCRIPT, 1, self.key,
+                now, self.limit, token, now + self.lease, int(self.lease))
+        except redis.exceptions.ConnectionError:
+            celery_logger.error("EXTERNAL SERVICE redis-server IS NOT RUNNING! "
+                                "Provider throttling has been disabled.")
+            return True
+        if not acquired:
+            return False
+        self.token = token
+        return True
+
+    def release(self):
+        if not self.token:
+            return
+        token, self.token = self.token, None
+        try:
+            # Only our own token, if the lease expired it is already gone.
+            redis_connection().zrem(self.key, token)
+        except redis.exceptions.ConnectionError:
+            pass
+
+    def in_use(self):
+        return redis_connection().zcount(self.key, time.time(), '+inf')
+
+
+def provider_throttle(provider_key_for=None, bucket="cloud_api",
+                      countdown=60):
+    """
+    Decorate a celery task so that, at most, PROVIDER_TASK_CONCURRENCY
+    copies of it (and any other task sharing 'bucket') run against a
+    single provider at once.
+
+    'provider_key_for' maps the task's args/kwargs to a provider key,
+    by default the first positional argument (or 'provider_id') is used.
+
+    NOTE: Place this decorator *below* @task(..) so it wraps the task body.
+    """
+    def decorator(func):
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            from celery.task import current
+            if provider_key_for:
+                provider_key = provider_key_for(*args, **kwargs)
+            elif args:
+                provider_key = args[0]
+            else:
+                provider_key = kwargs.get('provider_id')
+            throttle = ProviderThrottle(provider_key, bucket=bucket)
+            if not throttle.acquire():
+                request = getattr(current, 'request', None)
+                if not getattr(request, 'id', None):
+                    # Called directly (or eagerly): there is no message
+                    # to re-publish and the caller waits for the result.
+                    celery_logger.warn(
+                        "THROTTLE: Provider %s has no %s tokens available. "
+                        "Running %s unthrottled, it was not called as a "
+                        "task" % (provider_key, bucket, func.__name__))
+                    return func(*args, **kwargs)
+                celery_logger.info(
+                    "THROTTLE: Provider %s has no %s tokens available. "
+                    "Re-scheduling %s in %s seconds"
+                    % (provider_key, bucket, func.__name__, countdown))
+                current.apply_async(
+                    args=args, kwargs=kwargs, countdown=countdown)
+                return None
+            try:
+                return func(*args, **kwargs)
+            finally:
+                throttle.release()
+        return wrapper
+    return decorator
+
+
+def get_queue_depths(queue_names=None):
+    """
+    Return a dict of queue name -> {'total': N, 'priority': {step: N}}
+    for every queue in settings.CELERY_QUEUES (or 'queue_names').
+    """
+    if not queue_names:
+        queue_names = [queue.name for queue in settings.CELERY_QUEUES]
+    steps = getattr(settings, 'BROKER_TRANSPORT_OPTIONS', {}).get(
+        'priority_steps', [0])
+    r = redis_connection()
+    depths = {}
+    for name in queue_names:
+        pipe = r.pipeline()
+        for step in steps:
+            pipe.llen(name if not step else "%s%s%s" % (name, PRIORITY_SEP, step))
+        lengths = pipe.execute()
+        depths[name] = {
+            'total': sum(lengths),
+            'priority': dict(zip(steps, lengths)),
+        }
+    return depths
+
+
+def provider_for_uuid(provider_uuid, *args, **kwargs):
+    from core.models import Provider
+    return Provider.objects.get(uuid=provider_uuid).id
+
+
+def provider_for_identity(core_identity_uuid, *args, **kwargs):
+    from core.models import Identity
+    return Identity.objects.get(uuid=core_identity_uuid).provider_id